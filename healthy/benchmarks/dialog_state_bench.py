@@ -0,0 +1,144 @@
+"""
+Размер состояния диалогов на чат: объекты привычек в dialog_data (как было)
+против id с версией (dialog_state) для 10k одновременных диалогов админов
+и пользователей. Меряется сериализованный размер (формат DatabaseStorage),
+память под десериализованное состояние и стоимость восстановления объектов
+из кэша каталога при рендере.
+
+    python -m benchmarks.dialog_state_bench --chats 10000 --admin-share 0.5
+"""
+import argparse
+import asyncio
+import gc
+import statistics
+import time as t
+import tracemalloc
+
+from core.cache.catalog import HabitCatalogCache
+from core.cache.profiles import UserProfileCache
+from core.database.dto import HabitDomain, HintDomain, InfoDomain
+from core.gateways.cached import CachedUserGateway
+from core.gateways.loaders import UpdateLoaders
+from services.telegram.dialog_state import load_habit, load_habits, store_id, store_ids
+from services.telegram.storage import dump_data, load_data
+
+
+def build_catalog(habits: int, blocks: int, text_size: int) -> list[HabitDomain]:
+    description = ("Сделайте паузу и десять глубоких вдохов. " * (text_size // 40 + 1))[:text_size]
+    return [
+        HabitDomain(
+            id=habit_id,
+            name=f"Привычка {habit_id}",
+            cost_per_unit=100.0 + habit_id,
+            info=[
+                InfoDomain(id=habit_id * 100 + i, name=f"Факт {i}", description=description, habit_id=habit_id)
+                for i in range(blocks)
+            ],
+            hints=[
+                HintDomain(id=habit_id * 100 + i, name=f"Совет {i}", description=description, habit_id=habit_id)
+                for i in range(blocks)
+            ],
+        )
+        for habit_id in range(1, habits + 1)
+    ]
+
+
+def legacy_dialog_data(chat_id: int, admin: bool, catalog: list[HabitDomain]) -> dict:
+    if admin:
+        habit = catalog[chat_id % len(catalog)]
+        return {"admin_habits": catalog, "current_habit_id": habit.id, "current_habit": habit, "input_type": "admin_add_info"}
+    return {"habit_id": str(chat_id % 50 + 1), "user_name": "Иван"}
+
+
+def compact_dialog_data(chat_id: int, admin: bool, catalog: list[HabitDomain]) -> dict:
+    dialog_data = {}
+    if admin:
+        store_ids(dialog_data, "admin_habit_ids", (habit.id for habit in catalog))
+        store_id(dialog_data, "current_habit_id", catalog[chat_id % len(catalog)].id)
+        dialog_data["input_type"] = "admin_add_info"
+    else:
+        store_id(dialog_data, "habit_id", chat_id % 50 + 1)
+        dialog_data["user_name"] = "Иван"
+    return dialog_data
+
+
+def context(chat_id: int, dialog_data: dict) -> dict:
+    # Так aiogram_dialog кладет контекст в FSM storage
+    return {"_id": f"stack-{chat_id}", "intents": [f"intent-{chat_id}"], "dialog_data": dialog_data, "widget_data": {}}
+
+
+def measure(name: str, build, chats: int, admin_share: float, catalog: list[HabitDomain]) -> dict:
+    admin_every = round(1 / admin_share) if admin_share else 0
+    states = [context(i, build(i, bool(admin_every) and i % admin_every == 0, catalog)) for i in range(chats)]
+
+    started = t.perf_counter()
+    payloads = [dump_data(state) for state in states]
+    dump_time = t.perf_counter() - started
+    sizes = [len(payload) for payload in payloads]
+    del states
+
+    gc.collect()
+    tracemalloc.start()
+    started = t.perf_counter()
+    loaded = [load_data(payload) for payload in payloads]
+    load_time = t.perf_counter() - started
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del loaded
+
+    return {
+        "name": name,
+        "format": sorted({payload[:1].decode() for payload in payloads}),
+        "stored_mb": sum(sizes) / 2 ** 20,
+        "avg_bytes": statistics.fmean(sizes),
+        "max_bytes": max(sizes),
+        "memory_mb": memory / 2 ** 20,
+        "dump_us": dump_time / chats * 1e6,
+        "load_us": load_time / chats * 1e6,
+    }
+
+
+async def measure_rehydrate(chats: int, catalog: list[HabitDomain]) -> float:
+    """Рендер админского окна: новые загрузчики на апдейт, привычки из прогретого кэша каталога"""
+    habit_catalog = HabitCatalogCache()
+
+    async def load_catalog():
+        return catalog
+
+    await habit_catalog.get_all(load_catalog)
+    gateway = CachedUserGateway(None, habit_catalog, UserProfileCache())
+    dialog_data = compact_dialog_data(0, True, catalog)
+
+    started = t.perf_counter()
+    for _ in range(chats):
+        loaders = UpdateLoaders(gateway)
+        await load_habits(loaders, dialog_data, "admin_habit_ids")
+        await load_habit(loaders, dialog_data, "current_habit_id")
+    return (t.perf_counter() - started) / chats * 1e6
+
+
+def report(result: dict):
+    print(
+        f"{result['name'].ljust(8)} format={','.join(result['format'])} stored={result['stored_mb']:.1f}MB "
+        f"avg={result['avg_bytes']:,.0f}B max={result['max_bytes']:,}B memory={result['memory_mb']:.1f}MB "
+        f"dump={result['dump_us']:.1f}us load={result['load_us']:.1f}us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=10_000)
+    parser.add_argument("--admin-share", type=float, default=0.5, help="share of admin dialogs")
+    parser.add_argument("--habits", type=int, default=30)
+    parser.add_argument("--blocks", type=int, default=5, help="info blocks and hints per habit")
+    parser.add_argument("--text-size", type=int, default=300)
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.habits, args.blocks, args.text_size)
+    report(measure("legacy", legacy_dialog_data, args.chats, args.admin_share, catalog))
+    report(measure("compact", compact_dialog_data, args.chats, args.admin_share, catalog))
+    print(f"rehydrate admin window: {asyncio.run(measure_rehydrate(args.chats, catalog)):.1f}us per render")
+
+
+if __name__ == "__main__":
+    main()
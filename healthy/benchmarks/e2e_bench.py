@@ -0,0 +1,177 @@
+"""
+Сквозной бенчмарк бота: TelegramApp против фейкового Bot API и SQLite
+(по умолчанию временный файл), виртуальные пользователи проходят регистрацию,
+добавление привычек, просмотр списка и статистики, фиксацию рецидивов, а
+админы - правку каталога (benchmarks/scenarios.py). Отчет: p50/p95/p99 по
+состояниям DialogSG, апдейты в секунду и SQL-запросы на апдейт; --json
+сохраняет его для сравнения между версиями, --query-audit включает в боте
+бюджеты SQL на апдейт и вызов шлюза (нарушения - в лог и в отчет).
+
+    python -m benchmarks.e2e_bench --users 200 --admins 5 --sessions 10 --json e2e.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time as t
+
+from config_reader import ChartsConfig, QueryAuditConfig
+from core.database.session_manager import DatabaseManagerBase
+from core.gateways.usergateways import UserGateway
+from core.runtime.event_loop import running_loop_name
+
+from .fake_bot_api import FakeBotAPI
+from .harness import build_app
+from .scenarios import Recorder, ScenarioError, StateSamples, VirtualUser, run_admin, run_user
+
+ADMIN_CHAT_ID = 1
+USER_CHAT_ID = 100_000
+
+
+async def seed_catalog(db_manager: DatabaseManagerBase, habits: int, rng: random.Random):
+    async with db_manager.session() as session:
+        gateway = UserGateway(session)
+        for index in range(habits):
+            await gateway.add_admin_habit(name=f"Каталог {index}", cost_per_unit=rng.randint(50, 500))
+
+
+def _quantiles(values: list[float]) -> tuple[float, float, float]:
+    if len(values) < 2:
+        value = values[0] if values else 0.0
+        return value, value, value
+    quantiles = statistics.quantiles(values, n=100, method="inclusive")
+    return quantiles[49], quantiles[94], quantiles[98]
+
+
+def state_report(samples: StateSamples) -> dict:
+    p50, p95, p99 = _quantiles(samples.latencies)
+    return {
+        "updates": len(samples.latencies),
+        "p50_ms": round(p50 * 1e3, 3),
+        "p95_ms": round(p95 * 1e3, 3),
+        "p99_ms": round(p99 * 1e3, 3),
+        "max_ms": round(max(samples.latencies) * 1e3, 3),
+        "queries_per_update": round(statistics.fmean(samples.queries), 2),
+        "max_queries": max(samples.queries),
+        "objects_per_update": round(statistics.fmean(samples.objects), 2),
+        "n_plus_one_updates": samples.n_plus_one,
+    }
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    work_dir = tempfile.mkdtemp(prefix="bench-e2e-")
+    charts_dir = os.path.join(work_dir, "charts")
+    api = FakeBotAPI(port=args.api_port, latency=args.api_latency)
+    await api.start()
+    admin_ids = list(range(ADMIN_CHAT_ID, ADMIN_CHAT_ID + args.admins))
+    app = await build_app(
+        api.base_url, db_path=args.db or os.path.join(work_dir, "e2e.db"), admin_ids=admin_ids, fsm_storage=args.fsm_storage,
+        charts=ChartsConfig(enabled=args.charts, cache_dir=charts_dir, workers=1),
+        query_audit=QueryAuditConfig(enabled=args.query_audit)
+    )
+    try:
+        await seed_catalog(app.db_manager, args.catalog, rng)
+        recorder = Recorder(app)
+        # StaticPool в :memory: делит одно соединение между сессиями, транзакции
+        # конкурентных апдейтов перемешались бы - пользователи идут по одному
+        semaphore = asyncio.Semaphore(1 if args.db == ":memory:" else args.concurrency)
+
+        async def play(chat_id: int, admin: bool):
+            user = VirtualUser(app, api, recorder, chat_id, random.Random(rng.random()))
+            async with semaphore:
+                try:
+                    await (run_admin if admin else run_user)(user, args.sessions)
+                except ScenarioError as e:
+                    recorder.errors.append(str(e))
+                except Exception as e:
+                    recorder.errors.append(f"{type(e).__name__}: {e}")
+
+        players = [play(chat_id, True) for chat_id in admin_ids]
+        players += [play(USER_CHAT_ID + index, False) for index in range(args.users)]
+        rng.shuffle(players)
+
+        started = t.perf_counter()
+        await asyncio.gather(*players)
+        elapsed = t.perf_counter() - started
+    finally:
+        if app.chart_service:
+            await app.chart_service.stop()
+        await app.bot.session.close()
+        await app.db_manager.dispose()
+        await api.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    queries = [count for samples in recorder.states.values() for count in samples.queries]
+    return {
+        "config": {key: value for key, value in vars(args).items() if key != "json"},
+        "event_loop": running_loop_name(),
+        "updates": recorder.updates,
+        "elapsed_s": round(elapsed, 3),
+        "updates_per_sec": round(recorder.updates / elapsed, 1),
+        "queries_per_update": round(statistics.fmean(queries), 2) if queries else 0.0,
+        "errors": len(recorder.errors),
+        "error_samples": recorder.errors[:10],
+        "query_budget_violations": app.query_auditor.stats.violations if app.query_auditor else None,
+        "states": {state: state_report(samples) for state, samples in sorted(recorder.states.items())},
+        "api_calls": dict(api.calls),
+    }
+
+
+def print_report(result: dict):
+    print(
+        f"{'state'.ljust(34)} {'updates':>8} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8} "
+        f"{'queries':>8} {'objects':>8} {'n+1':>5}"
+    )
+    for state, row in result["states"].items():
+        print(
+            f"{state.ljust(34)} {row['updates']:>8} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+            f"{row['p99_ms']:>8.2f} {row['queries_per_update']:>8.2f} {row['objects_per_update']:>8.2f} "
+            f"{row['n_plus_one_updates']:>5}"
+        )
+    print(
+        f"total: {result['updates']} updates in {result['elapsed_s']:.2f}s, "
+        f"{result['updates_per_sec']:.1f} updates/s, {result['queries_per_update']:.2f} queries/update, "
+        f"loop={result['event_loop']}, errors={result['errors']}"
+    )
+    for error in result["error_samples"]:
+        print(f"  error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--admins", type=int, default=5)
+    parser.add_argument("--sessions", type=int, default=10, help="actions per user after registration")
+    parser.add_argument("--catalog", type=int, default=20, help="habits seeded into the catalog")
+    parser.add_argument("--concurrency", type=int, default=50, help="users playing at the same time")
+    parser.add_argument("--db", help="SQLite path or :memory: (no concurrency), a temporary file by default")
+    parser.add_argument("--fsm-storage", default="memory", choices=("memory", "database"))
+    parser.add_argument("--charts", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--query-audit", action=argparse.BooleanOptionalAction, default=False)
+    parser.add_argument("--api-port", type=int, default=8097)
+    parser.add_argument("--api-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="write the report as JSON to this path, '-' for stdout")
+    args = parser.parse_args()
+
+    # core.gateways.logger_handler настраивает корневой логгер на INFO при импорте
+    logging.getLogger().setLevel(logging.WARNING)
+    result = asyncio.run(run(args))
+    print_report(result)
+    if args.json == "-":
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(result, file, ensure_ascii=False, indent=2)
+    sys.exit(1 if result["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Локальный фейковый Bot API сервер для бенчмарков.
+
+Отвечает на методы, которые использует бот, правдоподобными объектами,
+умеет имитировать задержку и flood control (429 + retry_after) и
+запоминает все вызовы, чтобы проверять лимиты отправки. Для сценариев
+хранит последние inline-клавиатуры каждого чата (keyboard()).
+"""
+import asyncio
+import itertools
+import json
+import random
+import time as t
+from collections import Counter, defaultdict
+from typing import Any, Optional
+
+from aiohttp import web
+
+
+class FakeBotAPI:
+    def __init__(
+            self,
+            host: str = "127.0.0.1",
+            port: int = 8081,
+            latency: float = 0.0,
+            flood_probability: float = 0.0,
+            retry_after: int = 1
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.flood_probability = flood_probability
+        self.retry_after = retry_after
+
+        self.calls: Counter[str] = Counter()
+        self.sent_at: dict[int, list[float]] = defaultdict(list)
+        self.updates: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self.keyboards: dict[int, dict[int, list[tuple[str, str]]]] = defaultdict(dict)
+        self._message_ids = itertools.count(1)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        app.router.add_get("/stats", self._stats)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def max_rate(self, window: float = 1.0) -> int:
+        """Максимальное число sendMessage в любом окне длиной window секунд"""
+        stamps = sorted(stamp for chat in self.sent_at.values() for stamp in chat)
+        best, start = 0, 0
+        for end, stamp in enumerate(stamps):
+            while stamp - stamps[start] >= window:
+                start += 1
+            best = max(best, end - start + 1)
+        return best
+
+    def keyboard(self, chat_id: int) -> tuple[Optional[int], list[tuple[str, str]]]:
+        """Самое новое сообщение чата с клавиатурой: (message_id, [(текст, callback_data)])"""
+        messages = self.keyboards.get(chat_id)
+        if not messages:
+            return None, []
+        message_id = max(messages)
+        return message_id, messages[message_id]
+
+    def _track_keyboard(self, chat_id: int, message_id: int, params: dict[str, Any]):
+        markup = params.get("reply_markup")
+        buttons = []
+        if markup:
+            buttons = [
+                (button["text"], button["callback_data"])
+                for row in json.loads(markup).get("inline_keyboard", [])
+                for button in row if "callback_data" in button
+            ]
+        if buttons:
+            self.keyboards[chat_id][message_id] = buttons
+        else:
+            self.keyboards[chat_id].pop(message_id, None)
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        return self._json(dict(self.calls))
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        self.calls[method] += 1
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method.startswith("send") and random.random() < self.flood_probability:
+            return self._json({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            })
+
+        handler = getattr(self, f"_method_{method}", None)
+        result = handler(params) if handler else True
+        if asyncio.iscoroutine(result):
+            result = await result
+        return self._json({"ok": True, "result": result})
+
+    @staticmethod
+    def _json(payload: dict[str, Any]) -> web.Response:
+        return web.Response(text=json.dumps(payload), content_type="application/json")
+
+    def _message(self, params: dict[str, Any], **extra: Any) -> dict[str, Any]:
+        """Новое сообщение, для edit* - то же сообщение с message_id из запроса"""
+        chat_id = int(params["chat_id"])
+        message_id = int(params["message_id"]) if "message_id" in params else next(self._message_ids)
+        self._track_keyboard(chat_id, message_id, params)
+        return {
+            "message_id": message_id,
+            "date": int(t.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            **extra,
+        }
+
+    def _method_getMe(self, params):
+        return {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+
+    def _method_sendMessage(self, params):
+        self.sent_at[int(params["chat_id"])].append(t.monotonic())
+        return self._message(params, text=params.get("text", ""))
+
+    def _method_editMessageText(self, params):
+        return self._message(params, text=params.get("text", ""))
+
+    def _method_editMessageReplyMarkup(self, params):
+        return self._message(params)
+
+    def _method_editMessageCaption(self, params):
+        return self._message(params, caption=params.get("caption", ""))
+
+    def _photo(self, params):
+        file_id = f"fake-photo-{next(self._message_ids)}"
+        return self._message(params, caption=params.get("caption", ""), photo=[{
+            "file_id": file_id, "file_unique_id": file_id, "width": 800, "height": 400,
+        }])
+
+    def _method_sendPhoto(self, params):
+        self.sent_at[int(params["chat_id"])].append(t.monotonic())
+        return self._photo(params)
+
+    def _method_editMessageMedia(self, params):
+        return self._photo(params)
+
+    def _method_deleteMessage(self, params):
+        self.keyboards[int(params["chat_id"])].pop(int(params["message_id"]), None)
+        return True
+
+    async def _method_getUpdates(self, params):
+        timeout = float(params.get("timeout", 0) or 0)
+        try:
+            first = await asyncio.wait_for(self.updates.get(), timeout=timeout or 0.01)
+        except asyncio.TimeoutError:
+            return []
+        updates = [first]
+        while not self.updates.empty():
+            updates.append(self.updates.get_nowait())
+        return updates
+
+
+async def serve(port: int, latency: float = 0.0):
+    api = FakeBotAPI(port=port, latency=latency)
+    await api.start()
+    await asyncio.Event().wait()
+
+
+def serve_in_process(port: int, latency: float = 0.0):
+    """Точка входа для запуска фейкового API в отдельном процессе"""
+    asyncio.run(serve(port, latency))
@@ -0,0 +1,34 @@
+"""Сборка TelegramApp против фейкового Bot API и SQLite для бенчмарков"""
+import os
+from typing import Optional
+
+from config_reader import Config, DBConfig, TgBot
+from services.telegram.telegram import TelegramApp
+
+BENCH_TOKEN = "123456:AAbenchmark-token"
+
+
+async def build_app(
+        api_server: str,
+        db_path: str = ":memory:",
+        admin_ids: Optional[list[int]] = None,
+        fsm_storage: str = "memory",
+        **sections
+) -> TelegramApp:
+    if db_path != ":memory:" and os.path.exists(db_path):
+        os.remove(db_path)
+
+    config = Config(
+        tg_bot=TgBot(
+            token=BENCH_TOKEN,
+            admin_ids=admin_ids or [],
+            api_server=api_server,
+            fsm_storage=fsm_storage
+        ),
+        db=DBConfig(path=db_path),
+        **sections
+    )
+    app = TelegramApp(config)
+    await app.setup()
+    await app.db_manager.create_tables()
+    return app
@@ -0,0 +1,106 @@
+"""
+Сравнение реализаций event loop на реальном пути апдейта: синтетические
+/start (новые и повторные пользователи) прогоняются через Dispatcher
+(aiogram_dialog, SQLite, исходящие запросы к фейковому Bot API) с
+ограничением конкурентности, как при polling. Каждый цикл - в отдельном
+процессе, фейковый API работает в родительском.
+
+    python -m benchmarks.loop_bench --loops asyncio,uvloop --updates 5000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time as t
+
+
+async def child(args) -> dict:
+    """Прогон на одном цикле, результат - JSON-строка в stdout"""
+    from aiogram.types import Update
+
+    from core.runtime.event_loop import running_loop_name
+    from .harness import build_app
+    from .updates import message_update
+
+    app = await build_app(args.api_url, db_path=args.db)
+    payloads = [message_update(10_000 + i % args.users, "/start") for i in range(args.updates)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def handle(payload: dict):
+        async with semaphore:
+            started = t.perf_counter()
+            await app.dp.feed_update(app.bot, Update.model_validate(payload, context={"bot": app.bot}))
+            latencies.append(t.perf_counter() - started)
+
+    started = t.perf_counter()
+    await asyncio.gather(*(handle(payload) for payload in payloads))
+    elapsed = t.perf_counter() - started
+
+    await app.bot.session.close()
+    await app.db_manager.dispose()
+    return {"loop": running_loop_name(), "elapsed": elapsed, "latencies": latencies}
+
+
+async def run_loop(args, loop: str) -> dict:
+    command = [
+        sys.executable, "-m", "benchmarks.loop_bench", "--child", "--loop", loop,
+        "--api-url", args.api_url, "--db", args.db, "--updates", str(args.updates),
+        "--users", str(args.users), "--concurrency", str(args.concurrency),
+    ]
+    process = await asyncio.create_subprocess_exec(*command, stdout=asyncio.subprocess.PIPE)
+    stdout, _ = await process.communicate()
+    if process.returncode:
+        raise RuntimeError(f"{loop} run failed with code {process.returncode}")
+    return json.loads(stdout.decode().strip().splitlines()[-1])
+
+
+def report(requested: str, result: dict):
+    quantiles = statistics.quantiles(result["latencies"], n=100)
+    print(
+        f"{requested.ljust(8)} loop={result['loop'].ljust(8)} "
+        f"updates/s={len(result['latencies']) / result['elapsed']:,.0f} "
+        f"p50={quantiles[49] * 1e3:.2f}ms p95={quantiles[94] * 1e3:.2f}ms p99={quantiles[98] * 1e3:.2f}ms"
+    )
+
+
+async def run(args):
+    from .fake_bot_api import FakeBotAPI
+
+    api = FakeBotAPI(port=args.api_port, latency=args.api_latency)
+    await api.start()
+    args.api_url = api.base_url
+    try:
+        for loop in args.loops.split(","):
+            report(loop, await run_loop(args, loop))
+    finally:
+        await api.stop()
+        if os.path.exists(args.db):
+            os.remove(args.db)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--loops", default="asyncio,auto", help="comma-separated: auto, uvloop, winloop, asyncio")
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=2500, help="distinct chats, the rest are repeated /start")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--db", default="bench_loop.db")
+    parser.add_argument("--api-port", type=int, default=8096)
+    parser.add_argument("--api-latency", type=float, default=0.0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--loop", default="auto", help=argparse.SUPPRESS)
+    parser.add_argument("--api-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        from core.runtime.event_loop import run as run_on_loop
+        print(json.dumps(run_on_loop(child(args), args.loop)))
+    else:
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
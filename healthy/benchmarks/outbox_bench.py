@@ -0,0 +1,56 @@
+"""
+Нагрузочный прогон MessageOutbox против локального фейкового Bot API.
+
+    python -m benchmarks.outbox_bench --messages 600 --chats 300
+"""
+import argparse
+import asyncio
+import time as t
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from services.telegram.outbox import MessageOutbox
+from .fake_bot_api import FakeBotAPI
+
+
+async def run(args):
+    api = FakeBotAPI(port=args.port, latency=args.latency, flood_probability=args.flood)
+    await api.start()
+    bot = Bot(
+        token="123456:fake",
+        session=AiohttpSession(api=TelegramAPIServer.from_base(api.base_url))
+    )
+    outbox = MessageOutbox(bot, workers=args.workers, global_rate=args.rate)
+
+    try:
+        await outbox.start()
+        started = t.monotonic()
+        outbox.enqueue_many((1000 + i % args.chats, f"message {i}") for i in range(args.messages))
+        await outbox.stop(drain_timeout=None if args.messages == 0 else 600)
+        elapsed = t.monotonic() - started
+    finally:
+        await bot.session.close()
+        await api.stop()
+
+    stats = outbox.stats
+    print(f"sent={stats.sent} retried={stats.retried} dropped={stats.dropped} in {elapsed:.2f}s")
+    print(f"throughput={stats.sent / elapsed:.1f} msg/s, max observed rate={api.max_rate()} msg/s")
+    print(f"latency avg={stats.latency_avg * 1000:.1f}ms max={stats.latency_max * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=600)
+    parser.add_argument("--chats", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=30.0)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--flood", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8081)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Латентность чтения профиля пользователя (get_user_profile) с кэшем профилей и без.
+
+    python -m benchmarks.profile_cache_bench --users 2000 --reads 20000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import time as t
+from types import SimpleNamespace
+
+from core.cache.catalog import HabitCatalogCache
+from core.cache.profiles import UserProfileCache
+from config_reader import DBConfig
+from core.database.session_manager import DatabaseManagerSQLite
+from core.database.structures import Habit, User, UserHabit
+from core.gateways.cached import CachedUserGateway
+from core.gateways.usergateways import UserGateway
+
+
+async def seed(db_manager, users: int, habits_per_user: int):
+    async with db_manager.session() as session:
+        habits = [Habit(name=f"habit-{i}", cost_per_unit=100 + i) for i in range(habits_per_user)]
+        session.add_all(habits)
+        await session.flush()
+        for i in range(users):
+            user = User(tg_id=10_000 + i, username=f"user{i}", first_name="Bench", timezone="Europe/Moscow")
+            session.add(user)
+            await session.flush()
+            session.add_all(UserHabit(user_id=user.id, habit_id=habit.id) for habit in habits)
+
+
+async def measure(db_manager, make_gateway, tg_ids: list[int], reads: int) -> list[float]:
+    latencies = []
+    for _ in range(reads):
+        tg_id = random.choice(tg_ids)
+        started = t.perf_counter()
+        async with db_manager.session() as session:
+            await make_gateway(session).get_user_profile(tg_id)
+        latencies.append(t.perf_counter() - started)
+    return latencies
+
+
+def report(name: str, latencies: list[float]):
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{name.ljust(14)} p50={quantiles[49] * 1e3:.3f}ms p95={quantiles[94] * 1e3:.3f}ms "
+          f"p99={quantiles[98] * 1e3:.3f}ms reads/s={len(latencies) / sum(latencies):,.0f}")
+
+
+async def run(args):
+    logging.getLogger("core.gateways.logger_handler").setLevel(logging.WARNING)
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    db_manager = DatabaseManagerSQLite(SimpleNamespace(db=DBConfig(path=args.db)))
+    await db_manager.create_tables()
+    await seed(db_manager, args.users, args.habits)
+
+    tg_ids = [10_000 + i for i in range(args.users)]
+    catalog = HabitCatalogCache()
+    profiles = UserProfileCache(maxsize=args.cache_size, ttl=args.ttl)
+
+    report("no cache", await measure(db_manager, UserGateway, tg_ids, args.reads))
+    report("profile cache", await measure(
+        db_manager, lambda session: CachedUserGateway(session, catalog, profiles), tg_ids, args.reads
+    ))
+    print(f"cache: {profiles.stats}")
+    await db_manager.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--habits", type=int, default=3)
+    parser.add_argument("--reads", type=int, default=20000)
+    parser.add_argument("--cache-size", type=int, default=10_000)
+    parser.add_argument("--ttl", type=float, default=300.0)
+    parser.add_argument("--db", default="/tmp/profile_cache_bench.db")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Проверка бюджетов SQL для методов UserGateway: каждый вызов идет в своей
+сессии (как в апдейте) внутри audit_queries, отчет - число запросов,
+измененные строки, загруженные ORM-объекты и догрузки связей. Повторы
+одного запроса (N+1) и каскады жадных загрузок считаются нарушениями,
+код выхода 1 - если хоть один бюджет превышен.
+
+    python -m benchmarks.query_budget --habits 8 --catalog 20
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime, time, timedelta
+from types import SimpleNamespace
+
+from config_reader import DBConfig
+from core.database.query_audit import QueryBudget, QueryBudgetExceeded, audit_engine, audit_queries
+from core.database.session_manager import DatabaseManagerSQLite
+from core.database.structures import Hint, Info, Reminder
+from core.gateways.usergateways import UserGateway
+
+TG_ID = 1000
+
+# Запросов на вызов; чтения каталога - привычки плюс selectin info и hints
+BUDGETS = {
+    "create_user": QueryBudget(statements=1),
+    "get_user_by_tg_id": QueryBudget(statements=1),
+    "get_users_by_tg_ids": QueryBudget(statements=1),
+    "get_user_profile": QueryBudget(statements=2),
+    "get_user_habits": QueryBudget(statements=1),
+    "get_all_habits": QueryBudget(statements=3),
+    "get_habit_by_id": QueryBudget(statements=3),
+    "get_habits_by_ids": QueryBudget(statements=3),
+    "get_user_habit_stats": QueryBudget(statements=1),
+    "get_habit_stats": QueryBudget(statements=1),
+    "get_habit_stats_by_ids": QueryBudget(statements=1),
+    "get_relapse_history": QueryBudget(statements=1),
+    "get_relapse_buckets": QueryBudget(statements=1),
+    "get_active_reminders": QueryBudget(statements=1),
+    "get_catalog_version": QueryBudget(statements=1),
+    "add_user_habit": QueryBudget(statements=3, rows=2),
+    "record_relapse": QueryBudget(statements=4, rows=3),
+    "add_admin_habit": QueryBudget(statements=2, rows=2),
+    "add_admin_info": QueryBudget(statements=2, rows=2),
+}
+
+
+async def seed(db_manager, catalog: int, habits: int, relapses: int) -> dict:
+    async with db_manager.session() as session:
+        gateway = UserGateway(session)
+        catalog_ids = []
+        for index in range(catalog):
+            habit = await gateway.add_admin_habit(name=f"habit-{index}", cost_per_unit=100 + index)
+            session.add_all([
+                Info(name="info", description="Описание", habit_id=habit.id),
+                Hint(name="hint", description="Подсказка", habit_id=habit.id),
+            ])
+            catalog_ids.append(habit.id)
+        user = await gateway.create_user(TG_ID, "bench", "Bench", "Europe/Moscow")
+        user_habit_ids = []
+        for habit_id in catalog_ids[:habits]:
+            user_habit = await gateway.add_user_habit(user.id, habit_id)
+            session.add(Reminder(reminder_type="daily", scheduled_time=time(9), user_habit_id=user_habit.id))
+            user_habit_ids.append(user_habit.id)
+        await session.flush()
+        for user_habit_id in user_habit_ids:
+            for _ in range(relapses):
+                await gateway.record_relapse(user_habit_id)
+    return {"user_id": user.id, "catalog_ids": catalog_ids, "user_habit_ids": user_habit_ids}
+
+
+def calls(ids: dict) -> dict:
+    user_habit_id = ids["user_habit_ids"][0]
+    since = datetime.utcnow() - timedelta(days=30)
+    return {
+        "create_user": lambda g: g.create_user(TG_ID, "bench", "Bench", "Asia/Omsk"),
+        "get_user_by_tg_id": lambda g: g.get_user_by_tg_id(TG_ID),
+        "get_users_by_tg_ids": lambda g: g.get_users_by_tg_ids([TG_ID, TG_ID + 1]),
+        "get_user_profile": lambda g: g.get_user_profile(TG_ID),
+        "get_user_habits": lambda g: g.get_user_habits(ids["user_id"]),
+        "get_all_habits": lambda g: g.get_all_habits(),
+        "get_habit_by_id": lambda g: g.get_habit_by_id(ids["catalog_ids"][0]),
+        "get_habits_by_ids": lambda g: g.get_habits_by_ids(ids["catalog_ids"]),
+        "get_user_habit_stats": lambda g: g.get_user_habit_stats(TG_ID),
+        "get_habit_stats": lambda g: g.get_habit_stats(user_habit_id),
+        "get_habit_stats_by_ids": lambda g: g.get_habit_stats_by_ids(ids["user_habit_ids"]),
+        "get_relapse_history": lambda g: g.get_relapse_history(user_habit_id, 20),
+        "get_relapse_buckets": lambda g: g.get_relapse_buckets(user_habit_id, "day", since),
+        "get_active_reminders": lambda g: g.get_active_reminders(0, 100),
+        "get_catalog_version": lambda g: g.get_catalog_version(),
+        "add_user_habit": lambda g: g.add_user_habit(ids["user_id"], ids["catalog_ids"][-1]),
+        "record_relapse": lambda g: g.record_relapse(user_habit_id),
+        "add_admin_habit": lambda g: g.add_admin_habit(name="habit-new", cost_per_unit=10),
+        "add_admin_info": lambda g: g.add_admin_info("info", "Описание", ids["catalog_ids"][0]),
+    }
+
+
+async def run(args) -> int:
+    logging.getLogger().setLevel(logging.WARNING)
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    db_manager = DatabaseManagerSQLite(SimpleNamespace(db=DBConfig(path=args.db)))
+    await db_manager.initialize()
+    await db_manager.migrate()
+    failures = 0
+    try:
+        ids = await seed(db_manager, args.catalog, args.habits, args.relapses)
+        audit_engine(db_manager.engine)
+        print(f"{'method'.ljust(24)} {'stmts':>5} {'budget':>6} {'rows':>5} {'objects':>7}  relationship loads")
+        for name, call in calls(ids).items():
+            budget = BUDGETS[name]
+            problems = []
+            async with db_manager.session() as session:
+                try:
+                    with audit_queries(name, budget) as audit:
+                        await call(UserGateway(session))
+                except QueryBudgetExceeded as e:
+                    problems = e.problems
+            failures += bool(problems)
+            loads = ", ".join(f"{path} x{count}" for path, count in audit.relationship_loads.items()) or "-"
+            print(f"{name.ljust(24)} {audit.count:>5} {budget.statements:>6} {audit.rows:>5} {audit.objects:>7}  {loads}")
+            for problem in problems:
+                print(f"    FAIL {problem}")
+    finally:
+        await db_manager.dispose()
+        if os.path.exists(args.db):
+            os.remove(args.db)
+    print(f"{failures} of {len(BUDGETS)} calls over budget")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--catalog", type=int, default=20, help="habits in the catalog, each with info and a hint")
+    parser.add_argument("--habits", type=int, default=8, help="habits tracked by the user, each with a reminder")
+    parser.add_argument("--relapses", type=int, default=3, help="relapses per tracked habit")
+    parser.add_argument("--db", default="bench_query_budget.db")
+    args = parser.parse_args()
+    sys.exit(1 if asyncio.run(run(args)) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Пропускная способность регистрации (/start -> create_user) на SQLite.
+Половина вызовов - новые пользователи, половина - повторный /start.
+
+    python -m benchmarks.registration_bench --users 5000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time as t
+from types import SimpleNamespace
+
+from config_reader import DBConfig
+from core.database.session_manager import DatabaseManagerSQLite
+from core.gateways.usergateways import UserGateway
+
+
+async def register(db_manager, tg_ids: list[int]) -> float:
+    started = t.perf_counter()
+    for tg_id in tg_ids:
+        async with db_manager.session() as session:
+            user = await UserGateway(session).create_user(tg_id, f"user{tg_id}", "Bench", "Europe/Moscow")
+            assert user.tg_id == tg_id
+    return t.perf_counter() - started
+
+
+async def run(args):
+    logging.getLogger("core.gateways.logger_handler").setLevel(logging.WARNING)
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    db_manager = DatabaseManagerSQLite(SimpleNamespace(db=DBConfig(path=args.db)))
+    await db_manager.create_tables()
+
+    new_ids = list(range(10_000, 10_000 + args.users))
+    elapsed = await register(db_manager, new_ids)
+    print(f"new users    {args.users / elapsed:,.0f} registrations/s")
+
+    random.shuffle(new_ids)
+    elapsed = await register(db_manager, new_ids)
+    print(f"re-register  {args.users / elapsed:,.0f} registrations/s")
+    await db_manager.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--db", default="/tmp/registration_bench.db")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Сценарии виртуальных пользователей для сквозного бенчмарка. Пользователь
+шлет апдейты через dp.feed_update и нажимает кнопки из последней
+клавиатуры, которую бот отправил в фейковый Bot API, поэтому сценарий идет
+по настоящим окнам диалога. Каждый апдейт записывается с состоянием
+DialogSG окна, которому он адресован (для команд - с именем команды).
+"""
+import random
+import time as t
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiogram.types import Update
+
+from core.database.query_audit import audit_engine, audit_queries
+from services.telegram.states import DialogSG
+from services.telegram.telegram import TelegramApp
+
+from .fake_bot_api import FakeBotAPI
+from .updates import callback_update, message_update
+
+TIMEZONES = ("Europe/Moscow", "Asia/Yekaterinburg", "Asia/Omsk", "Asia/Vladivostok")
+N_PLUS_ONE_REPEATS = 3
+
+
+class ScenarioError(Exception):
+    """Бот ответил не тем окном, которого ждал сценарий"""
+
+
+@dataclass
+class StateSamples:
+    latencies: list[float] = field(default_factory=list)
+    queries: list[int] = field(default_factory=list)
+    objects: list[int] = field(default_factory=list)
+    n_plus_one: int = 0  # апдейты, где один запрос повторился N_PLUS_ONE_REPEATS раз и больше
+
+
+class Recorder:
+    """Латентность, SQL-запросы и загруженные ORM-объекты апдейтов по состояниям"""
+    def __init__(self, app: TelegramApp):
+        self.states: dict[str, StateSamples] = defaultdict(StateSamples)
+        self.errors: list[str] = []
+        audit_engine(app.db_manager.engine)
+
+    async def feed(self, app: TelegramApp, state: str, payload: dict[str, Any]):
+        # Область учета живет в контексте задачи апдейта, фоновые задачи наследуют ее
+        with audit_queries(state) as audit:
+            started = t.perf_counter()
+            try:
+                await app.dp.feed_update(app.bot, Update.model_validate(payload, context={"bot": app.bot}))
+            finally:
+                samples = self.states[state]
+                samples.latencies.append(t.perf_counter() - started)
+                samples.queries.append(audit.count)
+                samples.objects.append(audit.objects)
+                samples.n_plus_one += bool(audit.repeated(N_PLUS_ONE_REPEATS))
+
+    @property
+    def updates(self) -> int:
+        return sum(len(samples.latencies) for samples in self.states.values())
+
+
+class VirtualUser:
+    def __init__(self, app: TelegramApp, api: FakeBotAPI, recorder: Recorder, chat_id: int, rng: random.Random):
+        self.app = app
+        self.api = api
+        self.recorder = recorder
+        self.chat_id = chat_id
+        self.rng = rng
+
+    async def send(self, state: str, text: str):
+        await self.recorder.feed(self.app, state, message_update(self.chat_id, text))
+
+    async def click(self, state: DialogSG, label: str, choose: bool = False):
+        """
+        Нажимает кнопку, текст которой начинается с label; choose - случайную
+        из подходящих (элементы списков).
+        """
+        message_id, buttons = self.api.keyboard(self.chat_id)
+        matching = [data for text, data in buttons if text.startswith(label)]
+        if not matching:
+            raise ScenarioError(f"{state.state}: no {label!r} button in {[text for text, _ in buttons]}")
+        data = self.rng.choice(matching) if choose else matching[0]
+        await self.recorder.feed(self.app, state.state, callback_update(self.chat_id, data, message_id))
+
+    def has_button(self, label: str) -> bool:
+        return any(text.startswith(label) for text, _ in self.api.keyboard(self.chat_id)[1])
+
+
+async def register(user: VirtualUser):
+    """/start -> имя -> часовой пояс, заканчивается в MAIN_MENU"""
+    await user.send("/start", "/start")
+    await user.click(DialogSG.INTRO, "Добавить пользователя")
+    await user.send(DialogSG.ADD_NAME.state, f"User{user.chat_id}")
+    await user.click(DialogSG.CONFIRM_TIMEZONE, user.rng.choice(TIMEZONES))
+
+
+async def add_habit(user: VirtualUser):
+    await user.click(DialogSG.MAIN_MENU, "➕ Добавить привычку")
+    catalog = [text for text, _ in user.api.keyboard(user.chat_id)[1] if "₽/день" in text]
+    if not catalog:
+        raise ScenarioError(f"{DialogSG.ADD_HABIT.state}: empty catalog")
+    await user.click(DialogSG.ADD_HABIT, user.rng.choice(catalog))
+    # Уже отслеживаемая привычка оставляет в ADD_HABIT, новая - переводит в USER_HABITS
+    state = DialogSG.USER_HABITS if user.has_button("📌") else DialogSG.ADD_HABIT
+    await user.click(state, "⬅️ Назад")
+
+
+async def browse_habits(user: VirtualUser):
+    """Список -> привычка -> статистика с графиком -> назад в меню"""
+    await user.click(DialogSG.MAIN_MENU, "📋 Мои привычки")
+    await user.click(DialogSG.USER_HABITS, "📌", choose=True)
+    await user.click(DialogSG.HABIT_DETAIL, "📊 Статистика")
+    await user.click(DialogSG.HABIT_STATS, "⬅️ Назад")
+    await user.click(DialogSG.HABIT_DETAIL, "⬅️ Назад")
+    await user.click(DialogSG.USER_HABITS, "⬅️ Назад")
+
+
+async def track_relapse(user: VirtualUser):
+    await user.click(DialogSG.MAIN_MENU, "📋 Мои привычки")
+    await user.click(DialogSG.USER_HABITS, "📌", choose=True)
+    await user.click(DialogSG.HABIT_DETAIL, "📉 Зафиксировать рецидив")
+    await user.click(DialogSG.RELAPSE_TRACKING, "✅ Подтвердить")
+    await user.click(DialogSG.HABIT_DETAIL, "⬅️ Назад")
+    await user.click(DialogSG.USER_HABITS, "⬅️ Назад")
+
+
+async def admin_create_habit(user: VirtualUser, name: str):
+    await user.click(DialogSG.ADMIN, "➕ Добавить новую привычку")
+    await user.send(DialogSG.ADMIN_ADD_HABIT.state, name)
+    await user.send(DialogSG.ADMIN_ADD_HABIT_COST.state, str(user.rng.randint(50, 500)))
+    await user.click(DialogSG.ADMIN_HABIT_MANAGE, "⬅️ Назад")
+
+
+async def admin_add_info(user: VirtualUser):
+    await user.click(DialogSG.ADMIN, "📋 Управление привычками")
+    await user.click(DialogSG.ADMIN_HABIT_MANAGE, "📌", choose=True)
+    await user.click(DialogSG.ADMIN_EDIT_HABIT, "ℹ️ Добавить информацию")
+    await user.send(DialogSG.ADMIN_ADD_INFO.state, "Сделайте паузу и десять глубоких вдохов.")
+    await user.click(DialogSG.ADMIN_EDIT_HABIT, "⬅️ Назад")
+    await user.click(DialogSG.ADMIN_HABIT_MANAGE, "⬅️ Назад")
+
+
+async def run_user(user: VirtualUser, sessions: int):
+    """Регистрация, первая привычка и sessions действий с весами как у живых пользователей"""
+    await register(user)
+    await add_habit(user)
+    actions = (browse_habits, track_relapse, add_habit)
+    for action in user.rng.choices(actions, weights=(6, 3, 1), k=sessions):
+        await action(user)
+
+
+async def run_admin(user: VirtualUser, sessions: int):
+    await user.send("/admin", "/admin")
+    for session in range(sessions):
+        if user.rng.random() < 0.3:
+            await admin_create_habit(user, f"Привычка {user.chat_id}-{session}")
+        else:
+            await admin_add_info(user)
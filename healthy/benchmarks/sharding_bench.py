@@ -0,0 +1,98 @@
+"""
+Масштабирование обработки апдейтов по числу процессов-шардов.
+
+    python -m benchmarks.sharding_bench --updates 3000 --workers 1 2 4
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import time as t
+
+import aiohttp
+from aiogram.types import Update
+
+from config_reader import Config, DBConfig, ShardingConfig, TgBot
+from services.telegram.sharding import ShardSupervisor
+from .fake_bot_api import serve_in_process
+from .harness import BENCH_TOKEN
+from .updates import message_update
+
+
+async def sent_messages(client: aiohttp.ClientSession, api_url: str) -> int:
+    async with client.get(f"{api_url}/stats") as response:
+        return (await response.json()).get("sendMessage", 0)
+
+
+async def wait_for(client, api_url: str, expected: int, timeout: float = 600):
+    deadline = t.monotonic() + timeout
+    while await sent_messages(client, api_url) < expected:
+        if t.monotonic() > deadline:
+            raise TimeoutError(f"Expected {expected} messages")
+        await asyncio.sleep(0.05)
+
+
+async def measure(workers: int, args, client: aiohttp.ClientSession, api_url: str) -> float:
+    config = Config(
+        tg_bot=TgBot(token=BENCH_TOKEN, admin_ids=[], api_server=api_url, fsm_storage="memory"),
+        db=DBConfig(path=args.db),
+        sharding=ShardingConfig(workers=workers)
+    )
+    supervisor = ShardSupervisor(config)
+    await supervisor.prepare_schema()
+    supervisor.start()
+
+    # Прогрев: по апдейту на шард, ждем пока все воркеры ответят
+    baseline = await sent_messages(client, api_url)
+    for chat_id in range(workers):
+        await supervisor.route_wait(Update.model_validate(message_update(chat_id, "/start")))
+    await wait_for(client, api_url, baseline + workers)
+
+    updates = [
+        Update.model_validate(message_update(100_000 + i % args.chats, "/start"))
+        for i in range(args.updates)
+    ]
+    baseline = await sent_messages(client, api_url)
+    started = t.perf_counter()
+    for update in updates:
+        await supervisor.route_wait(update)
+    await wait_for(client, api_url, baseline + len(updates))
+    elapsed = t.perf_counter() - started
+
+    await supervisor.stop()
+    return len(updates) / elapsed
+
+
+async def run(args):
+    api_url = f"http://127.0.0.1:{args.api_port}"
+    api = mp.get_context("spawn").Process(target=serve_in_process, args=(args.api_port,), daemon=True)
+    api.start()
+
+    try:
+        async with aiohttp.ClientSession() as client:
+            for _ in range(100):
+                try:
+                    await sent_messages(client, api_url)
+                    break
+                except aiohttp.ClientConnectorError:
+                    await asyncio.sleep(0.1)
+            base = None
+            for workers in args.workers:
+                rate = await measure(workers, args, client, api_url)
+                base = base or rate
+                print(f"workers={workers}: {rate:,.0f} updates/s (x{rate / base:.2f})")
+    finally:
+        api.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=3000)
+    parser.add_argument("--chats", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--api-port", type=int, default=8082)
+    parser.add_argument("--db", default="/tmp/sharding_bench.db")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
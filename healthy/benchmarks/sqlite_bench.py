@@ -0,0 +1,87 @@
+"""
+Пропускная способность SQLite под конкурентной нагрузкой обработчиков:
+прежняя схема (NullPool, journal_mode=DELETE, synchronous=FULL) против
+пула соединений с WAL и сериализованной записью.
+
+    python -m benchmarks.sqlite_bench --concurrency 32 --operations 5000 --write-ratio 0.2
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time as t
+from dataclasses import replace
+from types import SimpleNamespace
+
+from sqlalchemy.exc import OperationalError
+
+from config_reader import DBConfig
+from core.database.session_manager import DatabaseManagerSQLite
+from core.gateways.usergateways import UserGateway
+
+BASELINE = DBConfig(
+    sqlite_pool_size=0, sqlite_journal_mode="DELETE", sqlite_synchronous="FULL",
+    sqlite_mmap_size=0, sqlite_cache_size=-2000, sqlite_serialize_writes=False
+)
+TUNED = DBConfig()
+
+
+async def seed(db_manager, users: int):
+    async with db_manager.session() as session:
+        gateway = UserGateway(session)
+        habit = await gateway.add_admin_habit("bench", 100)
+        for tg_id in range(users):
+            user = await gateway.create_user(tg_id, f"user{tg_id}", "Bench", "UTC")
+            await gateway.add_user_habit(user.id, habit.id)
+
+
+async def worker(db_manager, operations: list[tuple[bool, int]], errors: dict[str, int]):
+    while operations:
+        is_write, tg_id = operations.pop()
+        try:
+            async with db_manager.session() as session:
+                gateway = UserGateway(session)
+                profile = await gateway.get_user_profile(tg_id)
+                if is_write:
+                    await gateway.record_relapse(profile.habits[0].id)
+        except OperationalError as e:
+            key = "locked" if "locked" in str(e) else "other"
+            errors[key] = errors.get(key, 0) + 1
+
+
+async def measure(name: str, db_config: DBConfig, args):
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    db_manager = DatabaseManagerSQLite(SimpleNamespace(db=db_config))
+    await db_manager.create_tables()
+    await seed(db_manager, args.users)
+
+    operations = [(random.random() < args.write_ratio, random.randrange(args.users)) for _ in range(args.operations)]
+    errors: dict[str, int] = {}
+    started = t.perf_counter()
+    await asyncio.gather(*(worker(db_manager, operations, errors) for _ in range(args.concurrency)))
+    elapsed = t.perf_counter() - started
+
+    print(f"{name.ljust(9)} {args.operations / elapsed:,.0f} ops/s errors={errors or 0}")
+    await db_manager.engine.dispose()
+
+
+async def run(args):
+    logging.disable(logging.ERROR)
+    await measure("nullpool", replace(BASELINE, path=args.db), args)
+    await measure("tuned", replace(TUNED, path=args.db), args)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--operations", type=int, default=5000)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--db", default="/tmp/sqlite_bench.db")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Время старта бота до первого обработанного апдейта. Каждый запуск - новый
+процесс интерпретатора: импорты, TelegramApp.setup(), подготовка схемы и
+/start через dp.feed_update против фейкового Bot API. Схема готовится
+старым способом (create_all при каждом старте) или миграциями; первый
+запуск на пустом файле БД - холодный, остальные - на уже готовой схеме.
+
+    python -m benchmarks.startup_bench --runs 5 --db bench_startup.db
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time as t
+
+PHASES = ("interpreter", "imports", "setup", "schema", "first_update")
+
+
+async def child(args) -> dict:
+    """Один старт бота, замеры пишутся в stdout одной JSON-строкой"""
+    marks = {"started": t.time()}
+
+    from aiogram.types import Update
+    from sqlalchemy import event
+
+    from config_reader import Config, DBConfig, TgBot
+    from services.telegram.telegram import TelegramApp
+    from .harness import BENCH_TOKEN
+    from .updates import message_update
+    marks["imports"] = t.time()
+
+    config = Config(
+        tg_bot=TgBot(token=BENCH_TOKEN, admin_ids=[], api_server=args.api_url, fsm_storage="memory"),
+        db=DBConfig(path=args.db)
+    )
+    app = TelegramApp(config)
+    await app.setup()
+    marks["setup"] = t.time()
+
+    statements = []
+    event.listen(app.db_manager.engine.sync_engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    if args.schema == "migrate":
+        await app.db_manager.migrate()
+    else:
+        await app.db_manager.create_tables()
+    marks["schema"] = t.time()
+    schema_queries = len(statements)
+
+    update = Update.model_validate(message_update(1000, "/start"), context={"bot": app.bot})
+    await app.dp.feed_update(app.bot, update)
+    marks["first_update"] = t.time()
+
+    await app.bot.session.close()
+    await app.db_manager.dispose()
+    return {"marks": marks, "schema_queries": schema_queries}
+
+
+async def start_once(args, schema: str) -> dict:
+    command = [
+        sys.executable, "-m", "benchmarks.startup_bench", "--child",
+        "--schema", schema, "--db", args.db, "--api-url", args.api_url,
+    ]
+    spawned = t.time()
+    process = await asyncio.create_subprocess_exec(*command, stdout=asyncio.subprocess.PIPE)
+    stdout, _ = await process.communicate()
+    if process.returncode:
+        raise RuntimeError(f"startup run failed with code {process.returncode}")
+
+    result = json.loads(stdout.decode().strip().splitlines()[-1])
+    marks = result["marks"]
+    previous, phases = spawned, {}
+    for phase, mark in zip(PHASES, ("started", *PHASES[1:])):
+        phases[phase] = (marks[mark] - previous) * 1000
+        previous = marks[mark]
+    phases["total"] = (marks["first_update"] - spawned) * 1000
+    phases["schema_queries"] = result["schema_queries"]
+    return phases
+
+
+def report(name: str, runs: list[dict]):
+    columns = (*PHASES, "total", "schema_queries")
+    medians = {column: statistics.median(run[column] for run in runs) for column in columns}
+    print(
+        f"{name.ljust(16)} runs={len(runs)} "
+        + " ".join(f"{phase}={medians[phase]:.0f}ms" for phase in PHASES)
+        + f" | time-to-first-update={medians['total']:.0f}ms schema_queries={medians['schema_queries']:.0f}"
+    )
+
+
+async def run(args):
+    from .fake_bot_api import FakeBotAPI
+
+    api = FakeBotAPI(port=args.api_port)
+    await api.start()
+    args.api_url = api.base_url
+    try:
+        for schema in ("create_all", "migrate"):
+            if os.path.exists(args.db):
+                os.remove(args.db)
+            runs = [await start_once(args, schema) for _ in range(args.runs + 1)]
+            report(f"{schema}/cold", runs[:1])
+            report(f"{schema}/warm", runs[1:])
+        print(f"answered /start: {api.calls['sendMessage']}/{2 * (args.runs + 1)}")
+    finally:
+        await api.stop()
+        if os.path.exists(args.db):
+            os.remove(args.db)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="warm starts per schema mode")
+    parser.add_argument("--db", default="bench_startup.db")
+    parser.add_argument("--api-port", type=int, default=8095)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--schema", choices=("create_all", "migrate"), default="migrate", help=argparse.SUPPRESS)
+    parser.add_argument("--api-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child(args))))
+    else:
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
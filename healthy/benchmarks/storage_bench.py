@@ -0,0 +1,85 @@
+"""
+Сравнение пропускной способности get/set у MemoryStorage и DatabaseStorage.
+
+    python -m benchmarks.storage_bench --chats 1000 --ops 20000 --db /tmp/fsm_bench.db
+"""
+import argparse
+import asyncio
+import os
+import random
+import time as t
+from types import SimpleNamespace
+
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from config_reader import DBConfig
+from core.database.session_manager import DatabaseManagerSQLite
+from services.telegram.storage import DatabaseStorage
+
+
+def sample_data(chat_id: int) -> dict:
+    return {
+        "_id": f"stack-{chat_id}",
+        "intents": [f"intent-{chat_id}"],
+        "dialog_data": {"habit_id": chat_id % 50, "user_name": "Иван", "input_type": "admin_edit_habit_name"},
+        "widget_data": {},
+    }
+
+
+async def measure(storage: BaseStorage, keys: list[StorageKey], ops: int) -> dict[str, float]:
+    for key in keys:
+        await storage.set_data(key, sample_data(key.chat_id))
+
+    started = t.perf_counter()
+    for _ in range(ops):
+        key = random.choice(keys)
+        await storage.set_data(key, sample_data(key.chat_id))
+    set_rate = ops / (t.perf_counter() - started)
+
+    started = t.perf_counter()
+    for _ in range(ops):
+        await storage.get_data(random.choice(keys))
+    get_rate = ops / (t.perf_counter() - started)
+
+    started = t.perf_counter()
+    await storage.close()
+    return {"set/s": set_rate, "get/s": get_rate, "close_s": t.perf_counter() - started}
+
+
+async def run(args):
+    keys = [StorageKey(bot_id=1, chat_id=i, user_id=i) for i in range(args.chats)]
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    db_manager = DatabaseManagerSQLite(SimpleNamespace(db=DBConfig(path=args.db)))
+    await db_manager.create_tables()
+
+    results = {
+        "memory": await measure(MemoryStorage(), keys, args.ops),
+        "database": await measure(DatabaseStorage(db_manager, cache_size=args.cache_size), keys, args.ops),
+    }
+
+    # Холодный старт: все чтения идут мимо кэша
+    cold = DatabaseStorage(db_manager, cache_size=args.cache_size)
+    started = t.perf_counter()
+    for key in keys:
+        await cold.get_data(key)
+    results["database_cold_get/s"] = {"get/s": len(keys) / (t.perf_counter() - started)}
+    await db_manager.engine.dispose()
+
+    for name, metrics in results.items():
+        print(name.ljust(22), "  ".join(f"{metric}={value:,.1f}" for metric, value in metrics.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=1000)
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--cache-size", type=int, default=10_000)
+    parser.add_argument("--db", default="/tmp/fsm_bench.db")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Генераторы синтетических апдейтов Telegram в виде JSON-словарей"""
+import itertools
+import time as t
+from typing import Any
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+
+def _user(chat_id: int) -> dict[str, Any]:
+    return {"id": chat_id, "is_bot": False, "first_name": f"User{chat_id}", "username": f"user{chat_id}"}
+
+
+def message_update(chat_id: int, text: str) -> dict[str, Any]:
+    return {
+        "update_id": next(_update_ids),
+        "message": {
+            "message_id": next(_message_ids),
+            "date": int(t.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": _user(chat_id),
+            "text": text,
+            **({"entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]}
+               if text.startswith("/") else {}),
+        },
+    }
+
+
+def callback_update(chat_id: int, data: str, message_id: int = 1) -> dict[str, Any]:
+    return {
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "from": _user(chat_id),
+            "chat_instance": str(chat_id),
+            "data": data,
+            "message": {
+                "message_id": message_id,
+                "date": int(t.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": 1, "is_bot": True, "first_name": "FakeBot"},
+                "text": "...",
+            },
+        },
+    }
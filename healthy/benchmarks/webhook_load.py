@@ -0,0 +1,79 @@
+"""
+Нагрузочный тест webhook-режима: синтетические апдейты POST-ом в локальный сервер.
+
+    python -m benchmarks.webhook_load --updates 2000 --concurrency 64 --workers 16
+"""
+import argparse
+import asyncio
+import statistics
+import time as t
+
+import aiohttp
+
+from config_reader import WebhookConfig
+from .fake_bot_api import FakeBotAPI
+from .harness import build_app
+from .updates import message_update
+
+
+async def run(args):
+    api = FakeBotAPI(port=args.api_port, latency=args.api_latency)
+    await api.start()
+    app = await build_app(
+        api.base_url,
+        db_path=args.db,
+        webhook=WebhookConfig(
+            enabled=True, port=args.port, host="127.0.0.1",
+            workers=args.workers, queue_size=args.queue_size
+        )
+    )
+    server = app.create_webhook_server()
+    await server.start()
+
+    payloads = [message_update(10_000 + i % args.chats, "/start") for i in range(args.updates)]
+    ack_latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    url = f"http://127.0.0.1:{args.port}{app.config.webhook.path}"
+
+    async with aiohttp.ClientSession() as client:
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def post(payload):
+            async with semaphore:
+                started = t.perf_counter()
+                async with client.post(url, json=payload) as response:
+                    ack_latencies.append(t.perf_counter() - started)
+                    statuses[response.status] = statuses.get(response.status, 0) + 1
+
+        started = t.perf_counter()
+        await asyncio.gather(*(post(payload) for payload in payloads))
+        acked = t.perf_counter() - started
+        await server.stop(drain_timeout=600)
+        processed = t.perf_counter() - started
+
+    await app.bot.session.close()
+    await api.stop()
+
+    quantiles = statistics.quantiles(ack_latencies, n=100)
+    print(f"statuses={statuses}")
+    print(f"ack: {len(payloads) / acked:.0f} req/s, p50={quantiles[49] * 1000:.2f}ms p99={quantiles[98] * 1000:.2f}ms")
+    print(f"processed={server.stats.processed} failed={server.stats.failed} "
+          f"rejected={server.stats.rejected} -> {server.stats.processed / processed:.0f} updates/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--api-port", type=int, default=8081)
+    parser.add_argument("--api-latency", type=float, default=0.02)
+    parser.add_argument("--db", default="/tmp/webhook_bench.db")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from environs import Env
 from typing import Optional
 
@@ -7,6 +7,8 @@ class TgBot:
     """ Telegram """
     token: str
     admin_ids: list[int]
+    api_server: Optional[str] = None
+    fsm_storage: str = "database"
 
 @dataclass
 class DBConfig:
@@ -16,15 +18,135 @@ class DBConfig:
     name: Optional[str] = None
     user: Optional[str] = None
     password: Optional[str] = None
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    connect_timeout: float = 5.0
+    statement_cache_size: int = 100
+    statement_timeout: Optional[int] = None  # мс
+    replica_hosts: list[str] = field(default_factory=list)  # host[:port]
 
     """ SQLite """
     path: Optional[str] = None
+    sqlite_pool_size: int = 5
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size: int = -64_000
+    sqlite_busy_timeout: int = 5000
+    sqlite_serialize_writes: bool = True
+    replica_paths: list[str] = field(default_factory=list)
+
+    """ Read replicas """
+    replica_check_interval: float = 5.0
+
+@dataclass
+class OutboxConfig:
+    """ Outbound messages """
+    workers: int = 4
+    max_queue_size: int = 100_000
+    global_rate: float = 30.0
+    chat_rate: float = 1.0
+    max_attempts: int = 5
+
+@dataclass
+class WebhookConfig:
+    """ Webhook """
+    enabled: bool = False
+    url: Optional[str] = None
+    path: str = "/webhook"
+    host: str = "0.0.0.0"
+    port: int = 8080
+    secret_token: Optional[str] = None
+    workers: int = 16
+    queue_size: int = 1000
+
+@dataclass
+class ShardingConfig:
+    """ Multi-process update processing """
+    workers: int = 1
+    queue_size: int = 10_000
+    max_in_flight: int = 256
+
+@dataclass
+class CacheConfig:
+    """ In-process caches """
+    profile_size: int = 10_000
+    profile_ttl: float = 300.0
+    catalog_ttl: Optional[float] = 600.0
+    catalog_version_interval: Optional[float] = 1.0
+
+@dataclass
+class MetricsConfig:
+    """ Metrics """
+    host: str = "127.0.0.1"
+    port: Optional[int] = None
+    path: str = "/metrics"
+    dump_path: Optional[str] = None
+    dump_interval: float = 15.0
+    slow_call_threshold: float = 0.5
+    slow_call_sample_rate: float = 0.1
+
+@dataclass
+class TracingConfig:
+    """ Tracing """
+    enabled: bool = False
+    threshold: float = 0.5
+    jsonl_path: Optional[str] = "traces.jsonl"
+    otlp_endpoint: Optional[str] = None
+    service_name: str = "healthy"
+    max_spans: int = 500
+    flush_interval: float = 2.0
+
+@dataclass
+class QueryAuditConfig:
+    """ SQL query budgets """
+    enabled: bool = False
+    raise_on_violation: bool = False
+    update_statements: Optional[int] = 10  # None - без лимита (QUERY_AUDIT_*_STATEMENTS=none)
+    call_statements: Optional[int] = 4
+    repeats: int = 3  # одинаковых запросов в апдейте - N+1
+    eager_depth: int = 1
+
+@dataclass
+class ChartsConfig:
+    """ Progress charts """
+    enabled: bool = True
+    cache_dir: str = "charts"
+    workers: int = 1
+    days: int = 90
+
+@dataclass
+class RuntimeConfig:
+    """ Event loop """
+    event_loop: str = "auto"  # auto, uvloop, winloop, asyncio
+
 
 @dataclass
 class Config:
     """ Config """
     tg_bot: TgBot
     db: DBConfig
+    outbox: OutboxConfig = field(default_factory=OutboxConfig)
+    webhook: WebhookConfig = field(default_factory=WebhookConfig)
+    sharding: ShardingConfig = field(default_factory=ShardingConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
+    tracing: TracingConfig = field(default_factory=TracingConfig)
+    query_audit: QueryAuditConfig = field(default_factory=QueryAuditConfig)
+    charts: ChartsConfig = field(default_factory=ChartsConfig)
+    runtime: RuntimeConfig = field(default_factory=RuntimeConfig)
+
+def env_optional_int(env: Env, name: str, default: Optional[int]) -> Optional[int]:
+    """Целое из окружения; пустое значение или none отключают лимит (None)"""
+    value = env.str(name, None)
+    if value is None:
+        return default
+    if value.strip().lower() in ("", "none"):
+        return None
+    return env.int(name)
 
 def load_config(path: str | None) -> Config:
     env = Env()
@@ -33,7 +155,9 @@ def load_config(path: str | None) -> Config:
     return Config(
         tg_bot=TgBot(
             token=env('BOT_TOKEN'),
-            admin_ids=list(map(int, env.list('ADMIN_IDS')))
+            admin_ids=list(map(int, env.list('ADMIN_IDS'))),
+            api_server=env('BOT_API_SERVER', None),
+            fsm_storage=env('FSM_STORAGE', 'database')
         ),
         db=DBConfig(
             host=env('DB_HOST', None),
@@ -41,6 +165,87 @@ def load_config(path: str | None) -> Config:
             name=env('DB_NAME', None),
             user=env('DB_USER', None),
             password=env('DB_PASSWORD', None),
-            path=env('DB_PATH', 'data/bot.db')
+            pool_size=env.int('DB_POOL_SIZE', 5),
+            max_overflow=env.int('DB_MAX_OVERFLOW', 10),
+            pool_timeout=env.float('DB_POOL_TIMEOUT', 30.0),
+            pool_recycle=env.int('DB_POOL_RECYCLE', 1800),
+            pool_pre_ping=env.bool('DB_POOL_PRE_PING', True),
+            connect_timeout=env.float('DB_CONNECT_TIMEOUT', 5.0),
+            statement_cache_size=env.int('DB_STATEMENT_CACHE_SIZE', 100),
+            statement_timeout=env.int('DB_STATEMENT_TIMEOUT', None),
+            replica_hosts=env.list('DB_REPLICA_HOSTS', []),
+            path=env('DB_PATH', 'data/bot.db'),
+            sqlite_pool_size=env.int('SQLITE_POOL_SIZE', 5),
+            sqlite_journal_mode=env('SQLITE_JOURNAL_MODE', 'WAL'),
+            sqlite_synchronous=env('SQLITE_SYNCHRONOUS', 'NORMAL'),
+            sqlite_mmap_size=env.int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+            sqlite_cache_size=env.int('SQLITE_CACHE_SIZE', -64_000),
+            sqlite_busy_timeout=env.int('SQLITE_BUSY_TIMEOUT', 5000),
+            sqlite_serialize_writes=env.bool('SQLITE_SERIALIZE_WRITES', True),
+            replica_paths=env.list('SQLITE_REPLICA_PATHS', []),
+            replica_check_interval=env.float('DB_REPLICA_CHECK_INTERVAL', 5.0)
+        ),
+        outbox=OutboxConfig(
+            workers=env.int('OUTBOX_WORKERS', 4),
+            max_queue_size=env.int('OUTBOX_MAX_QUEUE_SIZE', 100_000),
+            global_rate=env.float('OUTBOX_GLOBAL_RATE', 30.0),
+            chat_rate=env.float('OUTBOX_CHAT_RATE', 1.0),
+            max_attempts=env.int('OUTBOX_MAX_ATTEMPTS', 5)
+        ),
+        webhook=WebhookConfig(
+            enabled=env.bool('WEBHOOK_ENABLED', False),
+            url=env('WEBHOOK_URL', None),
+            path=env('WEBHOOK_PATH', '/webhook'),
+            host=env('WEBHOOK_HOST', '0.0.0.0'),
+            port=env.int('WEBHOOK_PORT', 8080),
+            secret_token=env('WEBHOOK_SECRET', None),
+            workers=env.int('WEBHOOK_WORKERS', 16),
+            queue_size=env.int('WEBHOOK_QUEUE_SIZE', 1000)
+        ),
+        sharding=ShardingConfig(
+            workers=env.int('SHARD_WORKERS', 1),
+            queue_size=env.int('SHARD_QUEUE_SIZE', 10_000),
+            max_in_flight=env.int('SHARD_MAX_IN_FLIGHT', 256)
+        ),
+        cache=CacheConfig(
+            profile_size=env.int('PROFILE_CACHE_SIZE', 10_000),
+            profile_ttl=env.float('PROFILE_CACHE_TTL', 300.0),
+            catalog_ttl=env.float('CATALOG_CACHE_TTL', 600.0),
+            catalog_version_interval=env.float('CATALOG_VERSION_CHECK_INTERVAL', 1.0)
+        ),
+        metrics=MetricsConfig(
+            host=env('METRICS_HOST', '127.0.0.1'),
+            port=env.int('METRICS_PORT', None),
+            path=env('METRICS_PATH', '/metrics'),
+            dump_path=env('METRICS_DUMP_PATH', None),
+            dump_interval=env.float('METRICS_DUMP_INTERVAL', 15.0),
+            slow_call_threshold=env.float('SLOW_CALL_THRESHOLD', 0.5),
+            slow_call_sample_rate=env.float('SLOW_CALL_SAMPLE_RATE', 0.1)
+        ),
+        tracing=TracingConfig(
+            enabled=env.bool('TRACING_ENABLED', False),
+            threshold=env.float('TRACING_THRESHOLD', 0.5),
+            jsonl_path=env('TRACING_JSONL_PATH', 'traces.jsonl'),
+            otlp_endpoint=env('TRACING_OTLP_ENDPOINT', None),
+            service_name=env('TRACING_SERVICE_NAME', 'healthy'),
+            max_spans=env.int('TRACING_MAX_SPANS', 500),
+            flush_interval=env.float('TRACING_FLUSH_INTERVAL', 2.0)
+        ),
+        query_audit=QueryAuditConfig(
+            enabled=env.bool('QUERY_AUDIT_ENABLED', False),
+            raise_on_violation=env.bool('QUERY_AUDIT_RAISE', False),
+            update_statements=env_optional_int(env, 'QUERY_AUDIT_UPDATE_STATEMENTS', 10),
+            call_statements=env_optional_int(env, 'QUERY_AUDIT_CALL_STATEMENTS', 4),
+            repeats=env.int('QUERY_AUDIT_REPEATS', 3),
+            eager_depth=env.int('QUERY_AUDIT_EAGER_DEPTH', 1)
+        ),
+        charts=ChartsConfig(
+            enabled=env.bool('CHARTS_ENABLED', True),
+            cache_dir=env('CHARTS_CACHE_DIR', 'charts'),
+            workers=env.int('CHARTS_WORKERS', 1),
+            days=env.int('CHARTS_DAYS', 90)
+        ),
+        runtime=RuntimeConfig(
+            event_loop=env('EVENT_LOOP', 'auto')
         )
     )
@@ -0,0 +1,89 @@
+import asyncio
+import time as t
+from typing import Awaitable, Callable, Optional
+
+from core.cache.lru import CacheStats
+from core.database.dto import HabitDomain
+
+
+class HabitCatalogCache:
+    """
+    Кэш всего каталога привычек (Habit + Info + Hint) в виде неизменяемых
+    HabitDomain. Каталог меняется админкой и сбрасывается явно. Изменения
+    из других процессов (шарды, импорт каталога) видны по версии каталога
+    в БД: не чаще раза в version_check_interval секунд она сверяется
+    с версией, при которой каталог загружен (db_version). ttl - страховка
+    на случай записи в каталог в обход шлюза.
+    """
+    def __init__(self, ttl: Optional[float] = None, version_check_interval: Optional[float] = None):
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+        self.stats = CacheStats()
+        self.version = 0
+        self.db_version: Optional[int] = None
+        self._habits: Optional[dict[int, HabitDomain]] = None
+        self._expires_at = 0.0
+        self._version_checked_at = 0.0
+        self._load_lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        if self._habits is not None and self.ttl is not None and self._expires_at <= t.monotonic():
+            self._habits = None
+            self.stats.expirations += 1
+        return self._habits is not None
+
+    async def get_all(self, loader: Callable[[], Awaitable[list[HabitDomain]]]) -> list[HabitDomain]:
+        habits = self._habits if self.loaded else None
+        if habits is not None:
+            self.stats.hits += 1
+            return list(habits.values())
+
+        async with self._load_lock:
+            # Каталог мог загрузить конкурентный запрос, пока мы ждали
+            if self._habits is None:
+                self.stats.misses += 1
+                version = self.version
+                loaded = await loader()
+                if version == self.version:
+                    self._habits = {habit.id: habit for habit in loaded}
+                    self._expires_at = t.monotonic() + (self.ttl or 0.0)
+                return loaded
+            self.stats.hits += 1
+            return list(self._habits.values())
+
+    async def get(
+            self,
+            habit_id: int,
+            loader: Callable[[], Awaitable[list[HabitDomain]]]
+    ) -> Optional[HabitDomain]:
+        if not self.loaded:
+            return next((habit for habit in await self.get_all(loader) if habit.id == habit_id), None)
+        self.stats.hits += 1
+        return self._habits.get(habit_id)
+
+    def claim_version_check(self) -> bool:
+        """
+        Пора ли сверить версию каталога с БД; сверку берет на себя первый
+        спросивший, остальные до следующего интервала работают с кэшем
+        """
+        if self.version_check_interval is None or self._habits is None:
+            return False
+        now = t.monotonic()
+        if now - self._version_checked_at < self.version_check_interval:
+            return False
+        self._version_checked_at = now
+        return True
+
+    def check_version(self, db_version: int):
+        if db_version != self.db_version:
+            self.invalidate()
+
+    def set_db_version(self, db_version: int):
+        """Версия каталога, прочитанная загрузчиком до самого каталога"""
+        self.db_version = db_version
+        self._version_checked_at = t.monotonic()
+
+    def invalidate(self):
+        self._habits = None
+        self.version += 1
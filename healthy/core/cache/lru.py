@@ -0,0 +1,79 @@
+import time as t
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Generic, Hashable, Iterator, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+@dataclass
+class CacheStats:
+    """Счетчики попаданий и вытеснений кэша"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Ограниченный по размеру LRU-кэш с необязательным TTL.
+    Рассчитан на работу внутри одного event loop, поэтому без блокировок.
+    """
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._data: OrderedDict[K, tuple[V, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(list(self._data))
+
+    def get(self, key: K, default=None, count: bool = True):
+        item = self._data.get(key)
+        if item is None:
+            if count:
+                self.stats.misses += 1
+            return default
+
+        value, expires_at = item
+        if self.ttl is not None and expires_at <= t.monotonic():
+            del self._data[key]
+            if count:
+                self.stats.expirations += 1
+                self.stats.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        if count:
+            self.stats.hits += 1
+        return value
+
+    def set(self, key: K, value: V):
+        expires_at = t.monotonic() + self.ttl if self.ttl is not None else 0.0
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    def pop(self, key: K, default=None):
+        item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def clear(self):
+        self._data.clear()
@@ -0,0 +1,62 @@
+from typing import Optional
+
+from core.cache.lru import CacheStats, LRUCache
+from core.database.dto import UserDomain, UserHabitDomain, UserProfileDomain
+
+
+class UserProfileCache:
+    """
+    LRU+TTL кэш профилей пользователей (UserDomain + привычки) по tg_id.
+    Записи обновляются методами записи шлюза (write-through), TTL ограничивает
+    расхождение с БД при изменениях из других процессов.
+    """
+    def __init__(self, maxsize: int = 10_000, ttl: Optional[float] = 300.0):
+        self._profiles: LRUCache[int, UserProfileDomain] = LRUCache(maxsize, ttl)
+        self._tg_ids: LRUCache[int, int] = LRUCache(maxsize, ttl)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._profiles.stats
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def get(self, tg_id: int) -> Optional[UserProfileDomain]:
+        return self._profiles.get(tg_id)
+
+    def get_by_user_id(self, user_id: int, count: bool = True) -> Optional[UserProfileDomain]:
+        tg_id = self._tg_ids.get(user_id, count=False)
+        if tg_id is None:
+            if count:
+                self._profiles.stats.misses += 1
+            return None
+        return self._profiles.get(tg_id, count=count)
+
+    def put(self, profile: UserProfileDomain):
+        self._profiles.set(profile.user.tg_id, profile)
+        self._tg_ids.set(profile.user.id, profile.user.tg_id)
+
+    def put_user(self, user: UserDomain):
+        """Обновляет пользователя в закэшированном профиле, если он там есть"""
+        profile = self._profiles.get(user.tg_id, count=False)
+        if profile is not None:
+            self.put(UserProfileDomain(user=user, habits=profile.habits))
+
+    def put_habit(self, habit: UserHabitDomain):
+        profile = self.get_by_user_id(habit.user_id, count=False)
+        if profile is None:
+            return
+        habits = [h for h in profile.habits if h.id != habit.id]
+        habits.append(habit)
+        habits.sort(key=lambda h: h.id)
+        self.put(UserProfileDomain(user=profile.user, habits=habits))
+
+    def invalidate(self, tg_id: int):
+        profile = self._profiles.pop(tg_id)
+        if profile is not None:
+            self._tg_ids.pop(profile.user.id)
+
+    def invalidate_user(self, user_id: int):
+        tg_id = self._tg_ids.pop(user_id)
+        if tg_id is not None:
+            self._profiles.pop(tg_id)
@@ -1,10 +1,41 @@
-from typing import Awaitable, Optional
+from typing import AsyncIterable, Awaitable, Iterable, Optional, Union
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from datetime import datetime, date, time
 
 from core.database.dto import *
 
+
+class NotFoundError(Exception):
+    """Requested entity does not exist"""
+
+
+@dataclass(frozen=True, slots=True)
+class HabitRecord:
+    """Catalog habit for bulk import"""
+    name: str
+    cost_per_unit: Optional[float] = None
+
+
+@dataclass(frozen=True, slots=True)
+class HabitContentRecord:
+    """Info block or hint for bulk import"""
+    habit_id: int
+    name: str
+    description: str
+
+
+@dataclass(frozen=True, slots=True)
+class HabitStatsCheck:
+    """Result of the consistency check of a chunk of user_habit_stats"""
+    last_id: int
+    checked: int
+    mismatched: list[int]
+
+
+Records = Union[Iterable, AsyncIterable]
+
+
 class BaseUserGateway(ABC):
     @abstractmethod
     async def create_user(
@@ -53,3 +84,273 @@ class BaseUserGateway(ABC):
         :return HintDomain model of the habit
         """
         raise NotImplementedError()
+
+    @abstractmethod
+    async def add_admin_info(
+            self,
+            name: str,
+            description: str,
+            habit_id: int
+    ) -> InfoDomain:
+        """
+        Create a new info block to habit in database by admin.
+        name: name of the info block.
+        description: text of the info block.
+        habit_id: habit id of the info block.
+        :return InfoDomain model of the info block
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def add_admin_habits_bulk(
+            self,
+            habits: Records,
+            chunk_size: int = 500
+    ) -> dict[str, int]:
+        """
+        Create or update catalog habits by name with multi-row upserts.
+        habits: iterable or async iterable of HabitRecord.
+        chunk_size: number of rows per statement.
+        :return mapping of habit name to habit id
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def add_admin_info_bulk(
+            self,
+            info: Records,
+            chunk_size: int = 500
+    ) -> int:
+        """
+        Create info blocks with multi-row inserts.
+        info: iterable or async iterable of HabitContentRecord.
+        chunk_size: number of rows per statement.
+        :return number of created info blocks
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def add_admin_hints_bulk(
+            self,
+            hints: Records,
+            chunk_size: int = 500
+    ) -> int:
+        """
+        Create hints with multi-row inserts.
+        hints: iterable or async iterable of HabitContentRecord.
+        chunk_size: number of rows per statement.
+        :return number of created hints
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def delete_habit_content(self, habit_ids: list[int]) -> None:
+        """
+        Delete all info blocks and hints of the habits.
+        habit_ids: ids of the habits.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_catalog_version(self) -> int:
+        """
+        Get the version of the habit catalog.
+        Every catalog write increases it in the same transaction.
+        :return catalog version
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_all_habits(self) -> list[HabitDomain]:
+        """
+        Get the whole habit catalog with info and hints.
+        :return list of HabitDomain models ordered by name
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_habit_by_id(self, habit_id: int) -> HabitDomain:
+        """
+        Get a habit of the catalog with info and hints.
+        habit_id: id of the habit.
+        :return HabitDomain model of the habit
+        :raises NotFoundError if there is no such habit
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_user_by_tg_id(self, tg_id: int) -> Optional[UserDomain]:
+        """
+        Get a user by Telegram ID.
+        tg_id: Telegram ID of the user.
+        :return UserDomain model of the user or None if not registered
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_users_by_tg_ids(self, tg_ids: list[int]) -> list[UserDomain]:
+        """
+        Get users by Telegram IDs with one query.
+        tg_ids: Telegram IDs of the users.
+        :return list of UserDomain models of registered users, in no particular order
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_habits_by_ids(self, habit_ids: list[int]) -> list[HabitDomain]:
+        """
+        Get habits of the catalog with info and hints by ids.
+        habit_ids: ids of the habits.
+        :return list of HabitDomain models of existing habits, in no particular order
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_user_habits(self, user_id: int) -> list[UserHabitDomain]:
+        """
+        Get habits tracked by the user.
+        user_id: id of the user.
+        :return list of UserHabitDomain models
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_user_profile(self, tg_id: int) -> Optional[UserProfileDomain]:
+        """
+        Get a user together with the tracked habits.
+        tg_id: Telegram ID of the user.
+        :return UserProfileDomain model or None if not registered
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_user_habit_stats(self, tg_id: int) -> list[UserHabitStatsDomain]:
+        """
+        Get tracked habits of the user with streaks, relapse count and savings
+        from user_habit_stats.
+        tg_id: Telegram ID of the user.
+        :return list of UserHabitStatsDomain models (empty if not registered)
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_habit_stats(self, user_habit_id: int) -> UserHabitStatsDomain:
+        """
+        Get streaks, relapse count and savings of one tracked habit.
+        user_habit_id: id of the tracked habit.
+        :return UserHabitStatsDomain model
+        :raises NotFoundError if there is no such tracked habit
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_habit_stats_by_ids(self, user_habit_ids: list[int]) -> list[UserHabitStatsDomain]:
+        """
+        Get stats of several tracked habits with one query.
+        user_habit_ids: ids of the tracked habits.
+        :return list of UserHabitStatsDomain models of existing tracked habits ordered by id
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def add_user_habit(self, user_id: int, habit_id: int) -> UserHabitDomain:
+        """
+        Start tracking a catalog habit for the user.
+        user_id: id of the user.
+        habit_id: id of the catalog habit.
+        :return UserHabitDomain model of the tracked habit
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def record_relapse(self, user_habit_id: int, reason: Optional[str] = None) -> UserHabitDomain:
+        """
+        Record a relapse of the tracked habit.
+        user_habit_id: id of the tracked habit.
+        reason: reason of the relapse.
+        :return UserHabitDomain model with updated last_relapse
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_relapse_history(
+            self,
+            user_habit_id: int,
+            limit: int,
+            before: Optional[tuple[datetime, int]] = None
+    ) -> list[RelapseHistoryDomain]:
+        """
+        Get a page of relapses of the tracked habit, newest first (keyset pagination).
+        user_habit_id: id of the tracked habit.
+        limit: max size of the page.
+        before: (relapse_time, id) of the last relapse of the previous page (None for the first one).
+        :return list of RelapseHistoryDomain models
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_relapse_buckets(
+            self,
+            user_habit_id: int,
+            bucket: str = "day",
+            since: Optional[datetime] = None,
+            until: Optional[datetime] = None
+    ) -> list[RelapseBucketDomain]:
+        """
+        Count relapses of the tracked habit per day, week or month, aggregated by the database.
+        user_habit_id: id of the tracked habit.
+        bucket: "day", "week" (starting on Monday) or "month".
+        since: include relapses at or after this time (UTC).
+        until: include relapses before this time (UTC).
+        :return list of RelapseBucketDomain models ordered by bucket_start, empty buckets are omitted
+        :raises ValueError if the bucket is unknown
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def rebuild_habit_stats(self, after_id: int, limit: int) -> int:
+        """
+        Recompute user_habit_stats from relapse_history for a chunk of tracked habits
+        ordered by id (keyset pagination).
+        after_id: id of the last tracked habit of the previous chunk (0 for the first one).
+        limit: max size of the chunk.
+        :return id of the last rebuilt tracked habit or 0 if the chunk is empty
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def check_habit_stats(self, after_id: int, limit: int) -> HabitStatsCheck:
+        """
+        Compare stored user_habit_stats with values recomputed from relapse_history
+        for a chunk of tracked habits ordered by id.
+        after_id: id of the last tracked habit of the previous chunk (0 for the first one).
+        limit: max size of the chunk.
+        :return HabitStatsCheck with ids of tracked habits whose stats are missing or stale
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_active_reminders(
+            self,
+            after_id: int,
+            limit: int
+    ) -> list[ReminderScheduleDomain]:
+        """
+        Get a chunk of active reminders ordered by id (keyset pagination).
+        after_id: id of the last reminder of the previous chunk (0 for the first one).
+        limit: max size of the chunk.
+        :return list of ReminderScheduleDomain models
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def get_reminders_by_ids(
+            self,
+            reminder_ids: list[int]
+    ) -> list[ReminderScheduleDomain]:
+        """
+        Get active reminders by their ids, inactive and deleted ones are skipped.
+        reminder_ids: ids of the reminders.
+        :return list of ReminderScheduleDomain models
+        """
+        raise NotImplementedError()
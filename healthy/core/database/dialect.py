@@ -0,0 +1,44 @@
+from typing import Any, Callable, Iterable, Union
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+_INSERTS: dict[str, Callable] = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def dialect_insert(bind: AsyncEngine | AsyncSession) -> Callable:
+    """
+    Возвращает insert() диалекта движка, поддерживающий ON CONFLICT.
+    bind: движок или сессия (в том числе прокси вроде LazySession).
+    """
+    if not isinstance(bind, AsyncEngine):
+        bind = bind.bind
+    name = bind.dialect.name
+    try:
+        return _INSERTS[name]
+    except KeyError:
+        raise NotImplementedError(f"Upsert is not supported for dialect {name!r}")
+
+
+def upsert(
+        bind: AsyncEngine | AsyncSession,
+        model: Any,
+        values: Union[dict[str, Any], list[dict[str, Any]]],
+        index_elements: list[Any],
+        update: Iterable[str]
+):
+    """
+    INSERT ... ON CONFLICT DO UPDATE для текущего диалекта.
+    values: строка или список строк для multi-row VALUES.
+    index_elements: колонки уникального ключа конфликта.
+    update: колонки, которые берутся из вставляемой строки при конфликте.
+    RETURNING добавляется вызывающим, чтобы получить строку за тот же запрос.
+    """
+    statement = dialect_insert(bind)(model).values(values)
+    return statement.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={name: statement.excluded[name] for name in update}
+    )
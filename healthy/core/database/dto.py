@@ -1,14 +1,15 @@
-from pydantic import BaseModel, validator, constr
+from pydantic import BaseModel, ConfigDict, validator, constr
 from typing import Optional, List
-from datetime import datetime
-import pytz
+from datetime import date, datetime
 
 from .structures import *
 
 class UserDomain(BaseModel):
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
     id: int
     tg_id: int
-    username: constr(min_length=1, max_length=50)
+    username: Optional[constr(min_length=1, max_length=50)]
     first_name: constr(min_length=1, max_length=50)
     timezone: str
     registration_date: datetime
@@ -16,6 +17,8 @@ class UserDomain(BaseModel):
     @staticmethod
     @validator("timezone")
     def validate_timezone(value):
+        import pytz
+
         try:
             pytz.timezone(value)
             return value
@@ -23,6 +26,8 @@ class UserDomain(BaseModel):
             raise ValueError("Invalid timezone")
 
 class HabitDomain(BaseModel):
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
     id: int
     name: str
     cost_per_unit: Optional[float] = None
@@ -30,20 +35,49 @@ class HabitDomain(BaseModel):
     hints: List["HintDomain"]
 
 class UserHabitDomain(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: int
     user_id: int
     habit_id: int
+    habit_name: str
     start_date: datetime
     last_relapse: Optional[datetime]
     saved_money: Optional[float] = None
 
+class UserHabitStatsDomain(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    id: int
+    user_id: int
+    habit_id: int
+    habit_name: str
+    cost_per_unit: Optional[float] = None
+    start_date: datetime
+    last_relapse: Optional[datetime]
+    last_relapse_id: Optional[int] = None
+    current_streak: int
+    longest_streak: int
+    relapse_count: int
+    saved_money: float
+
+class UserProfileDomain(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    user: UserDomain
+    habits: List[UserHabitDomain]
+
 class InfoDomain(BaseModel):
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
     id: int
     name: constr(min_length=1, max_length=50)
     description: str
     habit_id: int
 
 class HintDomain(BaseModel):
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
     id: int
     name: constr(min_length=1, max_length=50)
     description: str
@@ -56,8 +90,22 @@ class ReminderDomain(BaseModel):
     is_active: bool
     user_habit_id: int
 
+class ReminderScheduleDomain(BaseModel):
+    id: int
+    reminder_type: str
+    scheduled_time: time
+    timezone: str
+    tg_id: int
+    habit_name: str
+
 class RelapseHistoryDomain(BaseModel):
     id: int
     relapse_time: datetime
-    reason: Optional[constr(min_length=1, max_length=100)]
+    reason: Optional[constr(min_length=1, max_length=500)]
     user_habit_id: int
+
+class RelapseBucketDomain(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    bucket_start: date
+    relapse_count: int
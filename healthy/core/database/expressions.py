@@ -0,0 +1,80 @@
+from sqlalchemy import Date, DateTime, Integer
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+# Даты в БД хранятся naive UTC (datetime.utcnow), поэтому границы дней - по UTC
+
+
+class utc_now(FunctionElement):
+    """Текущее время UTC без часового пояса, как в колонках таблиц"""
+    type = DateTime()
+    inherit_cache = True
+    name = "utc_now"
+
+
+@compiles(utc_now)
+def _utc_now_default(element, compiler, **kw):
+    return "(CURRENT_TIMESTAMP AT TIME ZONE 'UTC')"
+
+
+@compiles(utc_now, "sqlite")
+def _utc_now_sqlite(element, compiler, **kw):
+    # CURRENT_TIMESTAMP в SQLite уже в UTC, формат совпадает с хранимым
+    return "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+class day_number(FunctionElement):
+    """
+    Номер календарного дня для datetime: разность двух day_number -
+    число полных календарных дней между датами.
+    """
+    type = Integer()
+    inherit_cache = True
+    name = "day_number"
+
+
+@compiles(day_number)
+def _day_number_default(element, compiler, **kw):
+    return "(CAST(%s AS DATE) - DATE '1970-01-01')" % compiler.process(element.clauses, **kw)
+
+
+@compiles(day_number, "sqlite")
+def _day_number_sqlite(element, compiler, **kw):
+    return "CAST(julianday(date(%s)) AS INTEGER)" % compiler.process(element.clauses, **kw)
+
+
+BUCKETS = ("day", "week", "month")
+
+
+class date_bucket(FunctionElement):
+    """Начало дня, недели (с понедельника) или месяца, в который попадает datetime"""
+    type = Date()
+    inherit_cache = True
+    name = "date_bucket"
+    # bucket входит в ключ кэша компиляции, иначе day и week дали бы один SQL
+    _traverse_internals = FunctionElement._traverse_internals + [("bucket", InternalTraversal.dp_string)]
+
+    def __init__(self, bucket: str, expression):
+        if bucket not in BUCKETS:
+            raise ValueError(f"Unknown bucket {bucket!r}, expected one of {BUCKETS}")
+        self.bucket = bucket
+        super().__init__(expression)
+
+
+@compiles(date_bucket)
+def _date_bucket_default(element, compiler, **kw):
+    return "CAST(date_trunc('%s', %s) AS DATE)" % (element.bucket, compiler.process(element.clauses, **kw))
+
+
+_SQLITE_BUCKET_MODIFIERS = {
+    "day": "",
+    # 'weekday 1' сдвигает вперед до понедельника, поэтому сначала отступаем на 6 дней
+    "week": ", '-6 days', 'weekday 1'",
+    "month": ", 'start of month'",
+}
+
+
+@compiles(date_bucket, "sqlite")
+def _date_bucket_sqlite(element, compiler, **kw):
+    return "date(%s%s)" % (compiler.process(element.clauses, **kw), _SQLITE_BUCKET_MODIFIERS[element.bucket])
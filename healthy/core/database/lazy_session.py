@@ -0,0 +1,108 @@
+import logging
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LazySession:
+    """
+    Прокси над AsyncSession: сессия создается при первом обращении к любому
+    её атрибуту, а соединение из пула берется только при первом запросе.
+    """
+    __slots__ = ("_factory", "_session", "_committed")
+
+    def __init__(self, session_factory: Callable[[], AsyncSession]):
+        self._factory = session_factory
+        self._session: Optional[AsyncSession] = None
+        self._committed = False
+
+    @property
+    def materialized(self) -> bool:
+        return self._session is not None
+
+    @property
+    def holds_write_lock(self) -> bool:
+        """Транзакция держит замок на запись SQLite (SerializedWriteSession)"""
+        return self._session is not None and getattr(self._session.sync_session, "holds_write_lock", False)
+
+    async def commit_writes(self) -> bool:
+        """
+        Фиксирует записи, сделанные до сетевого вызова обработчика, и отпускает
+        замок на запись; следующие записи апдейта идут новой транзакцией.
+        """
+        if not self.holds_write_lock:
+            return False
+        await self._session.commit()
+        self._committed = True
+        return True
+
+    def __getattr__(self, name: str) -> Any:
+        if self._session is None:
+            self._session = self._factory()
+        return getattr(self._session, name)
+
+    async def finalize(self, error: Optional[BaseException] = None) -> bool:
+        """
+        Завершает сессию по окончании апдейта.
+        error: исключение обработчика, если оно было.
+        :return True, если сессия реально работала с БД (был commit/rollback)
+        """
+        session = self._session
+        if session is None:
+            return False
+
+        try:
+            if not session.in_transaction():
+                return self._committed
+            if error is None:
+                await session.commit()
+            else:
+                await session.rollback()
+            return True
+        except Exception as e:
+            logger.error("Database error: %s", e, exc_info=True)
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+            self._session = None
+            self._committed = False
+
+
+class ReadSession:
+    """
+    Сессия геттеров: пока апдейт не открыл транзакцию на основной БД, запросы
+    идут в read (реплика или отдельный пул чтения). После первой записи - в
+    транзакцию primary: апдейт видит свои записи, а держатель замка на запись
+    SQLite не ждет соединение для чтения, занятое апдейтами в очереди за замком.
+    """
+    __slots__ = ("_read", "_primary")
+
+    def __init__(self, read: LazySession, primary: LazySession):
+        self._read = read
+        self._primary = primary
+
+    def __getattr__(self, name: str) -> Any:
+        primary = self._primary
+        if primary.materialized and primary.in_transaction():
+            return getattr(primary, name)
+        return getattr(self._read, name)
+
+
+class LazyGateway(Generic[T]):
+    """Создает шлюз только при первом обращении к его методам"""
+    __slots__ = ("_gateway_class", "_session", "_gateway")
+
+    def __init__(self, gateway_class: Callable[[Any], T], session: Any):
+        self._gateway_class = gateway_class
+        self._session = session
+        self._gateway: Optional[T] = None
+
+    def __getattr__(self, name: str) -> Any:
+        if self._gateway is None:
+            self._gateway = self._gateway_class(self._session)
+        return getattr(self._gateway, name)
@@ -0,0 +1,106 @@
+"""
+Версионированные миграции схемы. Версия хранится в таблице schema_version:
+при старте она читается одним запросом, и если схема актуальна, больше
+ничего не выполняется (модули миграций даже не импортируются). Каждая
+недостающая миграция применяется в своей транзакции вместе с записью
+версии. На PostgreSQL транзакция берет advisory lock, чтобы одновременно
+стартующие инстансы не применяли одну миграцию дважды.
+
+Новая миграция - модуль vNNNN_<name>.py с функцией upgrade(connection)
+(синхронное Connection) и строка в MIGRATIONS. Миграции должны быть
+идемпотентными: DDL в SQLite не всегда откатывается вместе с транзакцией.
+Таблицы и SQL миграция определяет у себя, а не импортирует модели
+и шлюзы: они меняются дальше, а миграция должна делать то же, что и при
+первом применении.
+"""
+import importlib
+import logging
+import time as t
+from typing import Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, insert, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# (версия, имя модуля без префикса), строго по возрастанию
+MIGRATIONS: tuple[tuple[int, str], ...] = (
+    (1, "initial"),
+    (2, "user_habit_stats"),
+    (3, "relapse_habit_time_index"),
+    (4, "catalog_version"),
+    (5, "users_timezone_name"),
+)
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Ключ pg_advisory_xact_lock, общий для всех инстансов бота
+_LOCK_KEY = 0x6865616c
+
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False, server_default=func.current_timestamp()),
+)
+
+
+async def current_version(engine: AsyncEngine) -> int:
+    """Версия схемы, 0 - если таблицы версий еще нет"""
+    async with engine.connect() as conn:
+        return await conn.run_sync(_read_version)
+
+
+async def migrate(engine: AsyncEngine, target: Optional[int] = None) -> list[int]:
+    """
+    Применяет миграции до target (по умолчанию до последней).
+    :return: версии, примененные этим вызовом
+    """
+    target = LATEST_VERSION if target is None else target
+    version = await current_version(engine)
+    if version >= target:
+        logger.debug("Database schema is up to date (version %d)", version)
+        return []
+
+    applied = []
+    for migration_version, name in MIGRATIONS:
+        if version < migration_version <= target:
+            started = t.perf_counter()
+            async with engine.begin() as conn:
+                done = await conn.run_sync(_apply, migration_version, name)
+            if done:
+                applied.append(migration_version)
+                logger.info(
+                    "Applied migration %04d_%s in %.2fs", migration_version, name, t.perf_counter() - started
+                )
+    return applied
+
+
+def _read_version(connection: Connection) -> int:
+    try:
+        return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        # Таблицы версий нет: БД пустая или создана create_all до появления миграций
+        connection.rollback()
+        return 0
+
+
+def _apply(connection: Connection, version: int, name: str) -> bool:
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+    schema_version.create(connection, checkfirst=True)
+
+    # Под блокировкой: миграцию мог уже применить другой инстанс
+    applied = connection.execute(
+        select(schema_version.c.version).where(schema_version.c.version == version)
+    ).first()
+    if applied is not None:
+        return False
+
+    module = importlib.import_module(f"{__package__}.v{version:04d}_{name}")
+    module.upgrade(connection)
+    connection.execute(insert(schema_version).values(version=version, name=name))
+    return True
@@ -0,0 +1,98 @@
+"""
+Исходная схема. Определения таблиц заморожены здесь на момент миграции:
+последующие изменения моделей (core.database.structures) делаются новыми
+миграциями. Таблицы создаются с checkfirst, поэтому миграция безопасна
+и для БД, созданных раньше через create_all.
+"""
+from sqlalchemy import (
+    BigInteger, Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, MetaData, String,
+    Table, Time, func
+)
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("tg_id", BigInteger, nullable=False, unique=True),
+    Column("username", String, nullable=True),
+    Column("first_name", String, nullable=True),
+    Column("timezone", String(64), nullable=False),
+    Column("registration_date", DateTime, nullable=False, server_default=func.now()),
+    Index("ix_user_tg_id", "tg_id"),
+)
+
+Table(
+    "habits",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(50), nullable=False, unique=True),
+    Column("cost_per_unit", Float, nullable=True),
+    Index("ix_habit_name", "name"),
+)
+
+Table(
+    "user_habits",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("habit_id", Integer, ForeignKey("habits.id"), nullable=False),
+    Column("start_date", DateTime, nullable=False, server_default=func.now()),
+    Column("last_relapse", DateTime, nullable=True),
+    Column("saved_money", Integer, nullable=False),
+    Index("ix_user_habit", "user_id", "habit_id", unique=True),
+)
+
+Table(
+    "info",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(50), nullable=False),
+    Column("description", String(1000), nullable=False),
+    Column("habit_id", Integer, ForeignKey("habits.id"), nullable=False),
+)
+
+Table(
+    "hints",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(50), nullable=False),
+    Column("description", String(1000), nullable=False),
+    Column("habit_id", Integer, ForeignKey("habits.id"), nullable=False),
+)
+
+Table(
+    "reminders",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("reminder_type", String(30), nullable=False),
+    Column("scheduled_time", Time, nullable=False),
+    Column("is_active", Boolean, nullable=False),
+    Column("user_habit_id", Integer, ForeignKey("user_habits.id"), nullable=False),
+    Index("ix_reminder_time", "scheduled_time"),
+)
+
+Table(
+    "relapse_history",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("relapse_time", DateTime, nullable=False, server_default=func.now()),
+    Column("reason", String(500), nullable=True),
+    Column("user_habit_id", Integer, ForeignKey("user_habits.id"), nullable=False),
+    Index("ix_relapse_date", "relapse_time"),
+)
+
+Table(
+    "fsm_storage",
+    metadata,
+    Column("key", String(255), primary_key=True),
+    Column("state", String(255), nullable=True),
+    Column("data", LargeBinary, nullable=True),
+    Column("updated_at", DateTime, nullable=False, server_default=func.now()),
+)
+
+
+def upgrade(connection: Connection):
+    metadata.create_all(connection, checkfirst=True)
@@ -0,0 +1,118 @@
+"""
+Материализованная статистика привычек. Таблица заполняется пересчетом
+по relapse_history одним INSERT ... SELECT. Таблицы и запрос заморожены
+здесь на момент миграции, живой пересчет - UserGateway.rebuild_habit_stats.
+"""
+from sqlalchemy import (
+    Column, Date, DateTime, Float, ForeignKey, Integer, MetaData, Table, case, cast, delete, func, insert,
+    literal_column, select
+)
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+habits = Table(
+    "habits",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("cost_per_unit", Float),
+)
+
+user_habits = Table(
+    "user_habits",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("habit_id", Integer),
+    Column("start_date", DateTime),
+)
+
+relapse_history = Table(
+    "relapse_history",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("relapse_time", DateTime),
+    Column("user_habit_id", Integer),
+)
+
+user_habit_stats = Table(
+    "user_habit_stats",
+    metadata,
+    Column("user_habit_id", Integer, ForeignKey("user_habits.id", ondelete="CASCADE"), primary_key=True),
+    Column("streak_start", DateTime, nullable=False),
+    Column("longest_streak", Integer, nullable=False),
+    Column("relapse_count", Integer, nullable=False),
+    Column("last_relapse", DateTime, nullable=True),
+    Column("last_relapse_id", Integer, nullable=True),
+    Column("saved_money", Float, nullable=False),
+)
+
+
+def _day_number(connection: Connection, expression):
+    """Номер календарного дня UTC (даты в БД - naive UTC)"""
+    if connection.dialect.name == "sqlite":
+        return cast(func.julianday(func.date(expression)), Integer)
+    return cast(expression, Date) - literal_column("DATE '1970-01-01'", Date)
+
+
+def _stats_source(connection: Connection):
+    """
+    Серия перед каждым рецидивом - окно LAG от предыдущего рецидива или
+    старта; агрегат по привычке - число рецидивов, самая длинная закрытая
+    серия и число дней с рецидивами после старта.
+    """
+    relapse_day = _day_number(connection, relapse_history.c.relapse_time)
+    start_day = _day_number(connection, user_habits.c.start_date)
+    previous = func.lag(relapse_history.c.relapse_time).over(
+        partition_by=relapse_history.c.user_habit_id,
+        order_by=(relapse_history.c.relapse_time, relapse_history.c.id)
+    )
+    gaps = (
+        select(
+            relapse_history.c.id,
+            relapse_history.c.user_habit_id,
+            relapse_history.c.relapse_time,
+            case((relapse_day > start_day, relapse_day)).label("relapse_day"),
+            (relapse_day - _day_number(connection, func.coalesce(previous, user_habits.c.start_date))).label("gap")
+        )
+        .join(user_habits, relapse_history.c.user_habit_id == user_habits.c.id)
+        .subquery("relapse_gaps")
+    )
+    relapses = (
+        select(
+            gaps.c.user_habit_id,
+            func.count().label("relapse_count"),
+            func.count(gaps.c.relapse_day.distinct()).label("relapse_days"),
+            func.max(gaps.c.gap).label("longest_streak"),
+            func.max(gaps.c.relapse_time).label("last_relapse"),
+            func.max(gaps.c.id).label("last_relapse_id")
+        )
+        .group_by(gaps.c.user_habit_id)
+        .subquery("relapse_stats")
+    )
+
+    streak_start = func.coalesce(relapses.c.last_relapse, user_habits.c.start_date)
+    clean_days = (
+        _day_number(connection, streak_start) - start_day - func.coalesce(relapses.c.relapse_days, 0)
+    )
+    return (
+        select(
+            user_habits.c.id.label("user_habit_id"),
+            streak_start.label("streak_start"),
+            func.coalesce(relapses.c.longest_streak, 0).label("longest_streak"),
+            func.coalesce(relapses.c.relapse_count, 0).label("relapse_count"),
+            relapses.c.last_relapse,
+            relapses.c.last_relapse_id,
+            (clean_days * func.coalesce(habits.c.cost_per_unit, 0)).label("saved_money")
+        )
+        .join(habits, user_habits.c.habit_id == habits.c.id)
+        .outerjoin(relapses, relapses.c.user_habit_id == user_habits.c.id)
+    )
+
+
+def upgrade(connection: Connection):
+    user_habit_stats.create(connection, checkfirst=True)
+    connection.execute(delete(user_habit_stats))
+    source = _stats_source(connection)
+    connection.execute(
+        insert(user_habit_stats).from_select([column.name for column in source.selected_columns], source)
+    )
@@ -0,0 +1,19 @@
+"""Индекс истории рецидивов привычки для пагинации и агрегации по дням"""
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, Table
+from sqlalchemy.engine import Connection
+
+metadata = MetaData()
+
+relapse_history = Table(
+    "relapse_history",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("relapse_time", DateTime),
+    Column("user_habit_id", Integer),
+)
+
+ix_relapse_habit_time = Index("ix_relapse_habit_time", relapse_history.c.user_habit_id, relapse_history.c.relapse_time)
+
+
+def upgrade(connection: Connection):
+    ix_relapse_habit_time.create(connection, checkfirst=True)
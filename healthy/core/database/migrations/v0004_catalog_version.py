@@ -0,0 +1,17 @@
+"""Версия каталога привычек для сброса кэшей каталога во всех процессах"""
+from sqlalchemy import BigInteger, Column, Integer, MetaData, Table, insert, select
+from sqlalchemy.engine import Connection
+
+_metadata = MetaData()
+catalog_version = Table(
+    "catalog_version",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("version", BigInteger, nullable=False),
+)
+
+
+def upgrade(connection: Connection):
+    catalog_version.create(connection, checkfirst=True)
+    if connection.execute(select(catalog_version.c.id).where(catalog_version.c.id == 1)).first() is None:
+        connection.execute(insert(catalog_version).values(id=1, version=0))
@@ -0,0 +1,18 @@
+"""
+users.timezone - имя часового пояса (Europe/Moscow), String(64). В исходной
+схеме колонка была INTEGER, и create_all с checkfirst в 0001 не меняет уже
+существующую таблицу. SQLite типы колонок не проверяет, менять там нечего.
+"""
+from sqlalchemy import String, inspect, text
+from sqlalchemy.engine import Connection
+
+
+def upgrade(connection: Connection):
+    if connection.dialect.name != "postgresql":
+        return
+    column = next(column for column in inspect(connection).get_columns("users") if column["name"] == "timezone")
+    if isinstance(column["type"], String) and column["type"].length == 64:
+        return
+    connection.execute(text(
+        "ALTER TABLE users ALTER COLUMN timezone TYPE VARCHAR(64) USING timezone::varchar(64)"
+    ))
@@ -0,0 +1,110 @@
+import bisect
+import logging
+import time as t
+from dataclasses import dataclass, field
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from core.metrics.registry import GAUGE_FIELD
+
+logger = logging.getLogger(__name__)
+
+# Верхние границы корзин гистограммы ожидания соединения, в секундах
+CHECKOUT_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+@dataclass
+class PoolStats:
+    """Метрики пула соединений"""
+    checkouts: int = 0
+    checkins: int = 0
+    connects: int = 0
+    invalidations: int = 0
+    overflows: int = 0
+    timeouts: int = 0
+    in_use: int = field(default=0, metadata=GAUGE_FIELD)
+    idle: int = field(default=0, metadata=GAUGE_FIELD)
+    wait_total: float = 0.0
+    wait_max: float = field(default=0.0, metadata=GAUGE_FIELD)
+    wait_buckets: list[int] = field(default_factory=lambda: [0] * (len(CHECKOUT_WAIT_BUCKETS) + 1))
+
+    def observe_wait(self, seconds: float):
+        self.wait_buckets[bisect.bisect_left(CHECKOUT_WAIT_BUCKETS, seconds)] += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    @property
+    def wait_avg(self) -> float:
+        observed = sum(self.wait_buckets)
+        return self.wait_total / observed if observed else 0.0
+
+    def wait_quantile(self, q: float) -> float:
+        """Оценка квантиля ожидания по верхней границе корзины"""
+        observed = sum(self.wait_buckets)
+        if not observed:
+            return 0.0
+        rank = q * observed
+        cumulative = 0
+        for bound, count in zip(CHECKOUT_WAIT_BUCKETS, self.wait_buckets):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return self.wait_max
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool с метриками: время ожидания соединения
+    измеряется в _do_get, остальное собирается событиями пула.
+    """
+    # Логи пула остаются в пространстве sqlalchemy.pool, а не core.*
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.InstrumentedQueuePool"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        event.listen(self, "connect", self._on_connect)
+        event.listen(self, "checkout", self._on_checkout)
+        event.listen(self, "checkin", self._on_checkin)
+        event.listen(self, "invalidate", self._on_invalidate)
+
+    def _do_get(self):
+        started = t.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            logger.warning("Connection pool exhausted: %s", self.status())
+            raise
+        finally:
+            self.stats.observe_wait(t.perf_counter() - started)
+
+    def _inc_overflow(self) -> bool:
+        created = super()._inc_overflow()
+        # _overflow отсчитывается от -pool_size, положительный - соединение сверх pool_size
+        if created and self._overflow > 0:
+            self.stats.overflows += 1
+        return created
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        # Событие checkin срабатывает до возврата соединения в очередь
+        self._update_gauges()
+
+    def _update_gauges(self):
+        self.stats.in_use = self.checkedout()
+        self.stats.idle = self.checkedin()
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.stats.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.stats.checkouts += 1
+        self._update_gauges()
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.stats.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.stats.invalidations += 1
@@ -0,0 +1,251 @@
+"""
+Учет SQL по областям (апдейт, вызов шлюза): число запросов, измененные
+строки, загруженные ORM-объекты и отдельные запросы догрузки связей.
+Один и тот же запрос, повторенный в области несколько раз, - признак N+1;
+догрузка связи через другую связь (User.habits > UserHabit.habit >
+Habit.info) - признак каскада жадных загрузок. Бюджет проверяется при
+выходе из области: в тестах нарушение поднимает QueryBudgetExceeded,
+в боте (QueryAuditor) - пишется в лог.
+
+    audit_engine(db_manager.engine)
+    with audit_queries("get_user_profile", QueryBudget(statements=2)) as audit:
+        await gateway.get_user_profile(tg_id)
+"""
+import logging
+import re
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import RelationshipProperty, Session
+
+from .structures import Base
+
+logger = logging.getLogger(__name__)
+
+MAX_STATEMENT_LENGTH = 200
+
+_active: ContextVar[tuple["QueryAudit", ...]] = ContextVar("query_audits", default=())
+
+# Списки плейсхолдеров разной длины (IN, VALUES) - один и тот же запрос
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%s|\$\d+|:\w+))+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    return _PLACEHOLDER_LIST.sub("(?)", _WHITESPACE.sub(" ", statement.strip()))
+
+
+class QueryAudit:
+    """Запросы одной области; запрос во вложенной области считается и во всех внешних"""
+    __slots__ = ("name", "statements", "rows", "loaded", "relationship_loads")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.statements: Counter[str] = Counter()
+        self.rows = 0
+        self.loaded: Counter[str] = Counter()
+        self.relationship_loads: Counter[str] = Counter()
+
+    @property
+    def count(self) -> int:
+        return sum(self.statements.values())
+
+    @property
+    def objects(self) -> int:
+        return sum(self.loaded.values())
+
+    @property
+    def eager_depth(self) -> int:
+        """Самая длинная цепочка связей, по которой пришлось догружать объекты"""
+        return max((path.count(">") + 1 for path in self.relationship_loads), default=0)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+    def summary(self) -> dict:
+        return {
+            "statements": self.count,
+            "rows": self.rows,
+            "objects": dict(self.loaded),
+            "relationship_loads": dict(self.relationship_loads),
+        }
+
+
+@dataclass(frozen=True)
+class QueryBudget:
+    """Пределы области, None - без ограничения"""
+    statements: Optional[int] = None
+    rows: Optional[int] = None
+    objects: Optional[int] = None
+    repeats: Optional[int] = 3  # столько одинаковых запросов и больше - N+1
+    eager_depth: Optional[int] = 1  # глубже - каскад жадных загрузок
+
+    def violations(self, audit: QueryAudit) -> list[str]:
+        problems = []
+        if self.statements is not None and audit.count > self.statements:
+            problems.append(f"{audit.count} statements > {self.statements}")
+        if self.rows is not None and audit.rows > self.rows:
+            problems.append(f"{audit.rows} rows written > {self.rows}")
+        if self.objects is not None and audit.objects > self.objects:
+            problems.append(f"{audit.objects} objects loaded > {self.objects}: {dict(audit.loaded)}")
+        if self.repeats is not None:
+            for statement, count in audit.repeated(self.repeats):
+                problems.append(f"N+1: {count}x {statement[:MAX_STATEMENT_LENGTH]}")
+        if self.eager_depth is not None and audit.eager_depth > self.eager_depth:
+            paths = [path for path in audit.relationship_loads if path.count(">") >= self.eager_depth]
+            problems.append(f"eager load cascade: {', '.join(paths)}")
+        return problems
+
+
+class QueryBudgetExceeded(AssertionError):
+    def __init__(self, audit: QueryAudit, problems: list[str]):
+        self.audit = audit
+        self.problems = problems
+        super().__init__(f"{audit.name}: " + "; ".join(problems))
+
+
+def _raise(audit: QueryAudit, problems: list[str]):
+    raise QueryBudgetExceeded(audit, problems)
+
+
+class _AuditScope:
+    __slots__ = ("audit", "budget", "on_violation", "_token")
+
+    def __init__(
+            self,
+            name: str,
+            budget: Optional[QueryBudget],
+            on_violation: Callable[[QueryAudit, list[str]], None]
+    ):
+        self.audit = QueryAudit(name)
+        self.budget = budget
+        self.on_violation = on_violation
+        self._token = None
+
+    def __enter__(self) -> QueryAudit:
+        self._token = _active.set(_active.get() + (self.audit,))
+        return self.audit
+
+    def __exit__(self, exc_type, exc, tb):
+        _active.reset(self._token)
+        # Бюджет проверяется только у успешных областей, чтобы не заслонять исходную ошибку
+        if exc_type is None and self.budget is not None:
+            problems = self.budget.violations(self.audit)
+            if problems:
+                self.on_violation(self.audit, problems)
+        return False
+
+
+class _NoopScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP = _NoopScope()
+
+
+def audit_queries(name: str, budget: Optional[QueryBudget] = None) -> _AuditScope:
+    """Область учета; при нарушении budget на выходе поднимается QueryBudgetExceeded"""
+    return _AuditScope(name, budget, _raise)
+
+
+@dataclass
+class QueryAuditStats:
+    updates: int = 0
+    calls: int = 0
+    violations: int = 0
+
+
+class QueryAuditor:
+    """Бюджеты апдейтов и вызовов шлюза в работающем боте"""
+    def __init__(self, update_budget: QueryBudget, call_budget: QueryBudget, raise_on_violation: bool = False):
+        self.update_budget = update_budget
+        self.call_budget = call_budget
+        self.raise_on_violation = raise_on_violation
+        self.stats = QueryAuditStats()
+
+    def update(self, name: str) -> _AuditScope:
+        self.stats.updates += 1
+        return _AuditScope(name, self.update_budget, self._violation)
+
+    def call(self, name: str) -> _AuditScope:
+        self.stats.calls += 1
+        return _AuditScope(name, self.call_budget, self._violation)
+
+    def _violation(self, audit: QueryAudit, problems: list[str]):
+        self.stats.violations += 1
+        if self.raise_on_violation:
+            raise QueryBudgetExceeded(audit, problems)
+        logger.warning("Query budget exceeded in %s: %s", audit.name, "; ".join(problems))
+
+
+_auditor: Optional[QueryAuditor] = None
+
+
+def set_auditor(auditor: Optional[QueryAuditor]):
+    global _auditor
+    _auditor = auditor
+
+
+def audit_call(name: str):
+    """Область вызова шлюза; без установленного QueryAuditor - пустой контекст"""
+    auditor = _auditor
+    if auditor is None:
+        return _NOOP
+    return auditor.call(name)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    audits = _active.get()
+    if audits:
+        normalized = normalize_statement(statement)
+        for audit in audits:
+            audit.statements[normalized] += 1
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    audits = _active.get()
+    if audits and (context.isinsert or context.isupdate or context.isdelete) and cursor.rowcount > 0:
+        for audit in audits:
+            audit.rows += cursor.rowcount
+
+
+def _do_orm_execute(orm_execute_state):
+    audits = _active.get()
+    if not audits or not orm_execute_state.is_relationship_load:
+        return
+    strategy_path = orm_execute_state.loader_strategy_path
+    if strategy_path is None:
+        return
+    path = " > ".join(str(prop) for prop in strategy_path.path if isinstance(prop, RelationshipProperty))
+    for audit in audits:
+        audit.relationship_loads[path] += 1
+
+
+def _on_load(target, context):
+    audits = _active.get()
+    if audits:
+        model = type(target).__name__
+        for audit in audits:
+            audit.loaded[model] += 1
+
+
+def audit_engine(engine: Union[AsyncEngine, Engine]):
+    """Подключает учет к движку и к ORM; вне областей учета цена - один ContextVar.get"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    if not event.contains(Session, "do_orm_execute", _do_orm_execute):
+        event.listen(Session, "do_orm_execute", _do_orm_execute)
+        event.listen(Base, "load", _on_load, propagate=True)
@@ -0,0 +1,117 @@
+import asyncio
+import itertools
+import logging
+import time as t
+from dataclasses import dataclass
+from typing import Optional
+
+import sqlalchemy as db
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Ключ Session.info сессий реплик: прочитанное ими может отставать от основной БД
+REPLICA_SESSION = "replica"
+
+
+@dataclass
+class Replica:
+    """Реплика только для чтения"""
+    name: str
+    engine: AsyncEngine
+    session_factory: async_sessionmaker
+    healthy: bool = True
+    failures: int = 0
+    checked_at: float = 0.0
+
+
+class ReplicaSet:
+    """
+    Round-robin по живым репликам.
+
+    Реплика выводится из ротации при обрыве соединения (событие
+    handle_error движка) или неудачной проверке SELECT 1 и
+    возвращается после успешной проверки. Фоновые проверки идут
+    каждые check_interval секунд после start().
+    """
+    def __init__(self, replicas: list[Replica], check_interval: float = 5.0, check_timeout: float = 2.0):
+        self.replicas = replicas
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self._cursor = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+        for replica in replicas:
+            event.listen(replica.engine.sync_engine, "handle_error", self._on_error(replica))
+
+    def __len__(self) -> int:
+        return len(self.replicas)
+
+    @property
+    def healthy(self) -> list[Replica]:
+        return [replica for replica in self.replicas if replica.healthy]
+
+    def pick(self) -> Optional[Replica]:
+        """:return следующую живую реплику или None, если живых нет"""
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._cursor) % len(self.replicas)]
+            if replica.healthy:
+                return replica
+        return None
+
+    def mark_down(self, replica: Replica, reason: object):
+        replica.failures += 1
+        if replica.healthy:
+            replica.healthy = False
+            logger.warning("Read replica %s is down: %s", replica.name, reason)
+
+    def mark_up(self, replica: Replica):
+        if not replica.healthy:
+            replica.healthy = True
+            logger.info("Read replica %s is back", replica.name)
+
+    def _on_error(self, replica: Replica):
+        def handle_error(context):
+            # connection is None - ошибка при установке соединения
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(replica, context.original_exception)
+        return handle_error
+
+    async def check(self) -> dict[str, bool]:
+        """Проверяет все реплики запросом SELECT 1"""
+        for replica in self.replicas:
+            try:
+                async with asyncio.timeout(self.check_timeout):
+                    async with replica.engine.connect() as conn:
+                        await conn.execute(db.text("SELECT 1"))
+            except Exception as e:
+                self.mark_down(replica, e)
+            else:
+                self.mark_up(replica)
+            replica.checked_at = t.monotonic()
+        return {replica.name: replica.healthy for replica in self.replicas}
+
+    async def start(self):
+        if self.replicas and self._task is None:
+            await self.check()
+            self._task = asyncio.create_task(self._health_loop(), name="replica-health-checks")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def dispose(self):
+        await self.stop()
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error("Replica health check failed: %s", e, exc_info=True)
@@ -0,0 +1,79 @@
+import asyncio
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction
+from sqlalchemy.util import await_
+
+
+class SerializedWriteSyncSession(Session):
+    """
+    Sync-сессия с общим для движка замком на запись (single writer для SQLite).
+
+    Замок берется событиями самой сессии: перед DML через любой execute
+    (в том числе scalar, scalars и get) и перед flush с изменениями.
+    Держится до конца корневой транзакции - commit, rollback или close.
+    Соединение берется до замка: держатель замка уже ничего не ждет от пула,
+    поэтому сессии, стоящие в очереди за замком, не могут его заблокировать.
+    Чтения идут без замка: pysqlite открывает транзакцию только перед
+    первым DML, а WAL не блокирует читателей.
+    """
+    def __init__(self, *args: Any, write_lock: asyncio.Lock, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.write_lock = write_lock
+        self.holds_write_lock = False
+
+    def acquire_write(self):
+        """Вызывается внутри greenlet AsyncSession, поэтому может ждать замок"""
+        if not self.holds_write_lock:
+            self.connection()
+            await_(self.write_lock.acquire())
+            self.holds_write_lock = True
+
+    def release_write(self):
+        if self.holds_write_lock:
+            self.holds_write_lock = False
+            self.write_lock.release()
+
+
+@event.listens_for(SerializedWriteSyncSession, "do_orm_execute")
+def _lock_before_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.acquire_write()
+
+
+@event.listens_for(SerializedWriteSyncSession, "before_flush")
+def _lock_before_flush(session: SerializedWriteSyncSession, flush_context, instances):
+    session.acquire_write()
+
+
+@event.listens_for(SerializedWriteSyncSession, "after_transaction_end")
+def _unlock_after_transaction(session: SerializedWriteSyncSession, transaction: SessionTransaction):
+    if transaction.parent is None:
+        session.release_write()
+
+
+class StatementScopedSyncSession(Session):
+    """
+    Sync-сессия чтения с основной БД SQLite: соединение возвращается в пул
+    сразу после каждого запроса, результат отдается буферизованным.
+    Апдейт, ждущий замок на запись, не держит соединение пула чтения,
+    которое может понадобиться держателю замка (например, через общую
+    загрузку каталога).
+    """
+
+
+@event.listens_for(StatementScopedSyncSession, "do_orm_execute")
+def _release_after_statement(orm_execute_state):
+    # Догрузки связей выполняются внутри родительского запроса и его соединения
+    if orm_execute_state.is_relationship_load or not orm_execute_state.is_select:
+        return None
+    frozen = orm_execute_state.invoke_statement().freeze()
+    orm_execute_state.session.commit()
+    return frozen()
+
+
+class SerializedWriteSession(AsyncSession):
+    """AsyncSession над SerializedWriteSyncSession, write_lock передается в sync-сессию"""
+    sync_session_class = SerializedWriteSyncSession
@@ -1,12 +1,17 @@
 import logging
 from typing import Union
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator, Optional
 import asyncio
 import os
 import sqlalchemy as db
 
+from .migrations.runner import migrate
+from .pool import InstrumentedQueuePool, PoolStats
+from .replicas import REPLICA_SESSION, Replica, ReplicaSet
+from .serialized import SerializedWriteSession, StatementScopedSyncSession
 from .structures import Base
 
 logger = logging.getLogger(__name__)
@@ -18,11 +23,70 @@ class DatabaseManagerBase:
         self.config = config
         self.engine: Optional[AsyncEngine] = None
         self.session_factory = None
+        self.replicas = ReplicaSet([])
+        # Отдельный пул основной БД для чтений, когда реплик нет
+        self.read_engine: Optional[AsyncEngine] = None
+        self._primary_read_factory = None
 
     async def initialize(self):
         """Асинхронная инициализация движка"""
         raise NotImplementedError()
 
+    @property
+    def pool_stats(self) -> Optional[PoolStats]:
+        """Метрики пула, если движок использует InstrumentedQueuePool"""
+        if self.engine is None:
+            return None
+        return getattr(self.engine.pool, "stats", None)
+
+    def _create_replicas(self, targets: list[str], create_engine) -> ReplicaSet:
+        replicas = []
+        for target in targets:
+            engine = create_engine(target)
+            replicas.append(Replica(
+                name=target,
+                engine=engine,
+                session_factory=async_sessionmaker(
+                    bind=engine, expire_on_commit=False, autoflush=False, info={REPLICA_SESSION: True}
+                )
+            ))
+        return ReplicaSet(replicas, self.config.db.replica_check_interval)
+
+    def read_session_factory(self) -> AsyncSession:
+        """
+        Создает сессию для чтения на следующей живой реплике,
+        без реплик - на основной БД.
+        """
+        replica = self.replicas.pick()
+        if replica is not None:
+            return replica.session_factory()
+        return self.primary_session_factory()
+
+    def primary_session_factory(self) -> AsyncSession:
+        """
+        Сессия для чтения с основной БД, например для наполнения общих кэшей.
+        У SQLite - из отдельного пула чтения, соединение отдается после каждого запроса.
+        """
+        if self._primary_read_factory is not None:
+            return self._primary_read_factory()
+        return self.session_factory()
+
+    @asynccontextmanager
+    async def read_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """Сессия только для чтения, данные могут отставать от основной БД"""
+        if not self.engine:
+            await self.initialize()
+
+        async with self.read_session_factory() as session:
+            yield session
+
+    async def dispose(self):
+        await self.replicas.dispose()
+        if self.read_engine:
+            await self.read_engine.dispose()
+        if self.engine:
+            await self.engine.dispose()
+
     @asynccontextmanager
     async def session(self) -> AsyncGenerator[AsyncSession, None]:
         if not self.engine:
@@ -40,39 +104,65 @@ class DatabaseManagerBase:
                 await session.close()
 
     async def create_tables(self):
+        """Схема по моделям без учета версий, для тестовых БД и бенчмарков"""
         if not self.engine:
             await self.initialize()
 
         async with self.engine.begin() as conn:
-            if isinstance(self.engine.url, str) and "sqlite" in self.engine.url:
-                await conn.execute("PRAGMA foreign_keys=ON")
             await conn.run_sync(Base.metadata.create_all)
 
+    async def migrate(self) -> list[int]:
+        """Применяет недостающие миграции схемы, актуальная схема проверяется одним запросом"""
+        if not self.engine:
+            await self.initialize()
+        return await migrate(self.engine)
+
 
 class DatabaseManager(DatabaseManagerBase):
     """Реализация для PostgreSQL"""
     async def initialize(self):
-        from sqlalchemy.ext.asyncio import create_async_engine
-
-        self.engine = create_async_engine(
-            url=f"postgresql+asyncpg://{self.config.db.user}:{self.config.db.password}@{self.config.db.host}:{self.config.db.port}/{self.config.db.name}",
-            pool_size=5,
-            max_overflow=10,
-            connect_args={"timeout": 5}  # Таймаут на подключение 5 секунд
-        )
-
+        db_config = self.config.db
+        self.engine = self._create_engine(db_config.host, db_config.port)
         self.session_factory = async_sessionmaker(
             bind=self.engine,
             class_=AsyncSession,
             expire_on_commit=False,
         )
+        self.replicas = self._create_replicas(db_config.replica_hosts, self._create_replica_engine)
+
+    def _create_replica_engine(self, target: str) -> AsyncEngine:
+        host, _, port = target.partition(":")
+        return self._create_engine(host, int(port) if port else self.config.db.port)
+
+    def _create_engine(self, host: str, port: int) -> AsyncEngine:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        db_config = self.config.db
+        connect_args = {
+            "timeout": db_config.connect_timeout,
+            # Кэш prepared statements asyncpg и диалекта SQLAlchemy, 0 - для pgbouncer
+            "statement_cache_size": db_config.statement_cache_size,
+            "prepared_statement_cache_size": db_config.statement_cache_size,
+        }
+        if db_config.statement_timeout:
+            connect_args["server_settings"] = {"statement_timeout": str(db_config.statement_timeout)}
+
+        return create_async_engine(
+            url=f"postgresql+asyncpg://{db_config.user}:{db_config.password}@{host}:{port}/{db_config.name}",
+            poolclass=InstrumentedQueuePool,
+            pool_size=db_config.pool_size,
+            max_overflow=db_config.max_overflow,
+            pool_timeout=db_config.pool_timeout,
+            pool_recycle=db_config.pool_recycle,
+            pool_pre_ping=db_config.pool_pre_ping,
+            connect_args=connect_args
+        )
 
 class DatabaseManagerSQLite(DatabaseManagerBase):
     """Реализация для SQLite"""
     async def initialize(self):
-        from sqlalchemy.ext.asyncio import create_async_engine
-        from sqlalchemy.pool import NullPool
-        db_path = self.config.db.path or "sqlite.db"
+        db_config = self.config.db
+        db_path = db_config.path or "sqlite.db"
 
         if db_path != ":memory:":
             db_path = os.path.abspath(db_path)
@@ -82,21 +172,87 @@ class DatabaseManagerSQLite(DatabaseManagerBase):
                 os.makedirs(dir_path, exist_ok=True)
                 logger.info(f"Created database directory: {dir_path}")
 
-        self.engine = create_async_engine(
-            f"sqlite+aiosqlite:///{db_path}",
-            echo=False,
-            connect_args={"check_same_thread": False},
-            poolclass=NullPool
-        )
+        self.engine = self._create_engine(db_path)
+        event.listen(self.engine.sync_engine, "connect", self._set_pragmas)
+
+        session_options = {"class_": AsyncSession}
+        if db_config.sqlite_serialize_writes:
+            session_options = {"class_": SerializedWriteSession, "write_lock": asyncio.Lock()}
 
         self.session_factory = async_sessionmaker(
             bind=self.engine,
-            class_=AsyncSession,
             expire_on_commit=False,
             autoflush=False,
+            **session_options
         )
+        if db_config.sqlite_serialize_writes and db_path != ":memory:":
+            # Апдейт с замком на запись читает через read_gateway; из общего пула
+            # он ждал бы соединение, занятое сессиями в очереди за этим замком
+            self.read_engine = self._create_replica_engine(db_path)
+            self._primary_read_factory = async_sessionmaker(
+                bind=self.read_engine,
+                sync_session_class=StatementScopedSyncSession,
+                expire_on_commit=False,
+                autoflush=False
+            )
+        self.replicas = self._create_replicas(db_config.replica_paths, self._create_replica_engine)
         logger.debug(f"SQLite database initialized at {db_path}")
 
+    def _create_replica_engine(self, path: str) -> AsyncEngine:
+        engine = self._create_engine(os.path.abspath(path))
+        event.listen(engine.sync_engine, "connect", self._set_replica_pragmas)
+        return engine
+
+    def _create_engine(self, db_path: str) -> AsyncEngine:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        from sqlalchemy.pool import NullPool, StaticPool
+        db_config = self.config.db
+
+        if db_path == ":memory:":
+            # У каждого соединения была бы своя пустая БД
+            pool_options = {"poolclass": StaticPool}
+        elif db_config.sqlite_pool_size > 0:
+            pool_options = {
+                "poolclass": InstrumentedQueuePool,
+                "pool_size": db_config.sqlite_pool_size,
+                "max_overflow": 0,
+            }
+        else:
+            pool_options = {"poolclass": NullPool}
+
+        return create_async_engine(
+            f"sqlite+aiosqlite:///{db_path}",
+            echo=False,
+            connect_args={"check_same_thread": False, "timeout": db_config.sqlite_busy_timeout / 1000},
+            **pool_options
+        )
+
+    def _set_pragmas(self, dbapi_connection, connection_record):
+        """PRAGMA действуют на соединение, поэтому применяются к каждому новому"""
+        db_config = self.config.db
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA journal_mode={db_config.sqlite_journal_mode}")
+            cursor.execute(f"PRAGMA synchronous={db_config.sqlite_synchronous}")
+            cursor.execute(f"PRAGMA mmap_size={int(db_config.sqlite_mmap_size)}")
+            cursor.execute(f"PRAGMA cache_size={int(db_config.sqlite_cache_size)}")
+            cursor.execute(f"PRAGMA busy_timeout={int(db_config.sqlite_busy_timeout)}")
+            cursor.execute("PRAGMA foreign_keys=ON")
+        finally:
+            cursor.close()
+
+    def _set_replica_pragmas(self, dbapi_connection, connection_record):
+        """Реплика открывается с query_only, чтобы запись не ушла мимо основной БД"""
+        db_config = self.config.db
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA mmap_size={int(db_config.sqlite_mmap_size)}")
+            cursor.execute(f"PRAGMA cache_size={int(db_config.sqlite_cache_size)}")
+            cursor.execute(f"PRAGMA busy_timeout={int(db_config.sqlite_busy_timeout)}")
+            cursor.execute("PRAGMA query_only=ON")
+        finally:
+            cursor.close()
+
 async def create_database_manager(config) -> Union[DatabaseManager, DatabaseManagerSQLite]:
     """Создает менеджер БД с автоматическим выбором типа"""
     if all([config.db.host, config.db.port, config.db.name,
@@ -109,7 +265,7 @@ async def create_database_manager(config) -> Union[DatabaseManager, DatabaseMana
             async with postgres_db.session() as session:
                 await session.execute(db.text("SELECT 1"))
 
-            logger.info("Using PostgreSQL database")
+            logger.info("Using PostgreSQL database with %d read replicas", len(postgres_db.replicas))
             return postgres_db
         except Exception as e:
             logger.critical(f"PostgreSQL connection failed: {e}")
@@ -2,10 +2,12 @@
 from datetime import date, datetime, time, timedelta
 from typing import Optional, List
 
-from sqlalchemy import ForeignKey, String, func, Index, BigInteger
+from sqlalchemy import ForeignKey, String, func, Index, BigInteger, LargeBinary
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.ext.hybrid import hybrid_property
 
+from .expressions import day_number, utc_now
+
 
 class Base(DeclarativeBase):
     pass
@@ -21,7 +23,7 @@ class User(Base):
     tg_id: Mapped[int] = mapped_column(BigInteger, unique=True)
     username: Mapped[Optional[str]]
     first_name: Mapped[Optional[str]]
-    timezone: Mapped[int]
+    timezone: Mapped[str] = mapped_column(String(64))
     registration_date: Mapped[datetime] = mapped_column(server_default=func.now())
 
     habits: Mapped[List['UserHabit']] = relationship(
@@ -83,11 +85,17 @@ class UserHabit(Base):
 
     @hybrid_property
     def current_streak(self) -> int:
+        # Серия - в календарных днях UTC, так же считает SQL-выражение ниже
         reference_date = self.last_relapse or self.start_date
         if isinstance(reference_date, datetime):
-            return (datetime.utcnow() - reference_date).days
+            return (datetime.utcnow().date() - reference_date.date()).days
         return 0
 
+    @current_streak.inplace.expression
+    @classmethod
+    def _current_streak_expression(cls):
+        return day_number(utc_now()) - day_number(func.coalesce(cls.last_relapse, cls.start_date))
+
 
 class Info(Base):
     __tablename__ = "info"
@@ -130,6 +138,8 @@ class RelapseHistory(Base):
     __tablename__ = "relapse_history"
     __table_args__ = (
         Index('ix_relapse_date', 'relapse_time'),
+        # История и агрегаты по одной привычке читаются диапазоном этого индекса
+        Index('ix_relapse_habit_time', 'user_habit_id', 'relapse_time'),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -137,4 +147,41 @@ class RelapseHistory(Base):
     reason: Mapped[Optional[str]] = mapped_column(String(500))
 
     user_habit_id: Mapped[int] = mapped_column(ForeignKey("user_habits.id"))
-    user_habit: Mapped['UserHabit'] = relationship(back_populates="relapses")
\ No newline at end of file
+    user_habit: Mapped['UserHabit'] = relationship(back_populates="relapses")
+
+
+class UserHabitStats(Base):
+    """
+    Материализованная статистика привычки, обновляется при каждом рецидиве.
+    Хранит состояние на начало текущей серии: текущая серия и экономия
+    за нее досчитываются при чтении.
+    """
+    __tablename__ = "user_habit_stats"
+
+    user_habit_id: Mapped[int] = mapped_column(ForeignKey("user_habits.id", ondelete="CASCADE"), primary_key=True)
+    streak_start: Mapped[datetime]
+    longest_streak: Mapped[int] = mapped_column(default=0)
+    relapse_count: Mapped[int] = mapped_column(default=0)
+    last_relapse: Mapped[Optional[datetime]]
+    last_relapse_id: Mapped[Optional[int]]
+    saved_money: Mapped[float] = mapped_column(default=0)
+
+
+class CatalogVersion(Base):
+    """
+    Версия каталога привычек (одна строка). Каждая запись в каталог
+    увеличивает ее в своей транзакции, процессы по ней сбрасывают кэш каталога.
+    """
+    __tablename__ = "catalog_version"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+class FSMRecord(Base):
+    __tablename__ = "fsm_storage"
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    state: Mapped[Optional[str]] = mapped_column(String(255))
+    data: Mapped[Optional[bytes]] = mapped_column(LargeBinary)
+    updated_at: Mapped[datetime] = mapped_column(server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,202 @@
+from typing import Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.cache.catalog import HabitCatalogCache
+from core.cache.profiles import UserProfileCache
+from core.dao.user_dao import NotFoundError, Records
+from core.database.replicas import REPLICA_SESSION
+from core.database.dto import (
+    HabitDomain, HintDomain, InfoDomain, UserDomain, UserHabitDomain, UserHabitStatsDomain, UserProfileDomain
+)
+from .usergateways import UserGateway
+
+CATALOG_CHANGED = "catalog_changed"
+
+
+class CachedUserGateway(UserGateway):
+    """
+    UserGateway с кэшами процесса поверх чтений.
+    Записи в каталог сбрасывают кэш сразу и еще раз после commit,
+    чтобы конкурентное чтение до commit не закэшировало старые данные.
+    Профили пользователей обновляются записью сквозь кэш. Общие кэши
+    наполняются только чтениями с основной БД: профиль, прочитанный
+    с отстающей реплики, не кэшируется.
+    Каталог загружается в своей короткой сессии primary_session, если она
+    задана: загрузку под замком кэша ждут другие апдейты, и она не должна
+    зависеть от соединения, которое держит сессия апдейта. Вместе
+    с каталогом читается его версия в БД, по ней видны записи в каталог
+    из других процессов.
+    """
+    def __init__(
+            self,
+            session: AsyncSession,
+            catalog: HabitCatalogCache,
+            profiles: UserProfileCache,
+            primary_session: Optional[Callable[[], AsyncSession]] = None
+    ):
+        super().__init__(session)
+        self._catalog = catalog
+        self._profiles = profiles
+        self._primary_session = primary_session
+
+    @property
+    def _catalog_changed(self) -> bool:
+        """Каталог изменен в текущей транзакции; флаг в сессии видят все шлюзы апдейта"""
+        return self._session.info.get(CATALOG_CHANGED, False)
+
+    @property
+    def _reads_replica(self) -> bool:
+        return self._session.info.get(REPLICA_SESSION, False)
+
+    def _invalidate_catalog(self):
+        self._catalog.invalidate()
+        if not self._catalog_changed:
+            self._session.info[CATALOG_CHANGED] = True
+            event.listen(self._session.sync_session, "after_commit", self._after_commit, once=True)
+
+    def _after_commit(self, session):
+        session.info.pop(CATALOG_CHANGED, None)
+        self._catalog.invalidate()
+
+    def _invalidate_profile_on_rollback(self, user_id: int):
+        # Если транзакция откатится, в кэше не должно остаться незакоммиченных данных
+        event.listen(
+            self._session.sync_session, "after_rollback",
+            lambda session: self._profiles.invalidate_user(user_id),
+            once=True
+        )
+
+    def _write_through_habit(self, user_habit: UserHabitDomain):
+        self._profiles.put_habit(user_habit)
+        self._invalidate_profile_on_rollback(user_habit.user_id)
+
+    @staticmethod
+    async def _read_catalog(gateway: UserGateway, catalog: HabitCatalogCache) -> list[HabitDomain]:
+        # Версия читается первой: каталог не старее ее, в худшем случае он перечитается лишний раз
+        if catalog.version_check_interval is not None:
+            catalog.set_db_version(await gateway.get_catalog_version())
+        return await gateway.get_all_habits()
+
+    async def _load_catalog(self) -> list[HabitDomain]:
+        if self._primary_session is None:
+            return await self._read_catalog(UserGateway(self._session), self._catalog)
+        async with self._primary_session() as session:
+            return await self._read_catalog(UserGateway(session), self._catalog)
+
+    async def _check_catalog_version(self):
+        if not self._catalog.claim_version_check():
+            return
+        if self._primary_session is None:
+            self._catalog.check_version(await self.get_catalog_version())
+            return
+        async with self._primary_session() as session:
+            self._catalog.check_version(await UserGateway(session).get_catalog_version())
+
+    async def get_all_habits(self) -> list[HabitDomain]:
+        if self._catalog_changed:
+            # Каталог изменен в текущей транзакции: читаем его в ней, мимо кэша
+            return await super().get_all_habits()
+        await self._check_catalog_version()
+        return await self._catalog.get_all(self._load_catalog)
+
+    async def get_habit_by_id(self, habit_id: int) -> HabitDomain:
+        if self._catalog_changed:
+            return await super().get_habit_by_id(habit_id)
+        await self._check_catalog_version()
+        habit = await self._catalog.get(habit_id, self._load_catalog)
+        if habit is None:
+            raise NotFoundError(f"Habit {habit_id} not found")
+        return habit
+
+    async def add_admin_habit(self, name: str, cost_per_unit: Optional[int]) -> HabitDomain:
+        habit = await super().add_admin_habit(name, cost_per_unit)
+        self._invalidate_catalog()
+        return habit
+
+    async def add_admin_hint(self, name: str, description: str, habit_id: int) -> HintDomain:
+        hint = await super().add_admin_hint(name, description, habit_id)
+        self._invalidate_catalog()
+        return hint
+
+    async def add_admin_info(self, name: str, description: str, habit_id: int) -> InfoDomain:
+        info = await super().add_admin_info(name, description, habit_id)
+        self._invalidate_catalog()
+        return info
+
+    async def add_admin_habits_bulk(self, habits: Records, chunk_size: int = 500) -> dict[str, int]:
+        habit_ids = await super().add_admin_habits_bulk(habits, chunk_size)
+        self._invalidate_catalog()
+        return habit_ids
+
+    async def add_admin_info_bulk(self, info: Records, chunk_size: int = 500) -> int:
+        count = await super().add_admin_info_bulk(info, chunk_size)
+        self._invalidate_catalog()
+        return count
+
+    async def add_admin_hints_bulk(self, hints: Records, chunk_size: int = 500) -> int:
+        count = await super().add_admin_hints_bulk(hints, chunk_size)
+        self._invalidate_catalog()
+        return count
+
+    async def delete_habit_content(self, habit_ids: list[int]) -> None:
+        await super().delete_habit_content(habit_ids)
+        self._invalidate_catalog()
+
+    async def get_user_profile(self, tg_id: int) -> Optional[UserProfileDomain]:
+        profile = self._profiles.get(tg_id)
+        if profile is None:
+            profile = await super().get_user_profile(tg_id)
+            if profile is not None and not self._reads_replica:
+                self._profiles.put(profile)
+        return profile
+
+    async def get_habits_by_ids(self, habit_ids: list[int]) -> list[HabitDomain]:
+        wanted = set(habit_ids)
+        return [habit for habit in await self.get_all_habits() if habit.id in wanted]
+
+    async def get_users_by_tg_ids(self, tg_ids: list[int]) -> list[UserDomain]:
+        users, missing = [], []
+        for tg_id in tg_ids:
+            profile = self._profiles.get(tg_id)
+            if profile is not None:
+                users.append(profile.user)
+            else:
+                missing.append(tg_id)
+        if missing:
+            users += await super().get_users_by_tg_ids(missing)
+        return users
+
+    async def get_user_by_tg_id(self, tg_id: int) -> Optional[UserDomain]:
+        profile = await self.get_user_profile(tg_id)
+        return profile.user if profile else None
+
+    async def get_user_habits(self, user_id: int) -> list[UserHabitDomain]:
+        profile = self._profiles.get_by_user_id(user_id)
+        if profile is not None:
+            return list(profile.habits)
+        return await super().get_user_habits(user_id)
+
+    async def get_user_habit_stats(self, tg_id: int) -> list[UserHabitStatsDomain]:
+        # С профилем в кэше пользователь не ищется: статистика читается по id привычек
+        profile = self._profiles.get(tg_id)
+        if profile is None:
+            return await super().get_user_habit_stats(tg_id)
+        return await self.get_habit_stats_by_ids([habit.id for habit in profile.habits])
+
+    async def create_user(self, tg_id: int, username: Optional[str], first_name: Optional[str], timezone: str) -> UserDomain:
+        user = await super().create_user(tg_id, username, first_name, timezone)
+        self._profiles.put_user(user)
+        self._invalidate_profile_on_rollback(user.id)
+        return user
+
+    async def add_user_habit(self, user_id: int, habit_id: int) -> UserHabitDomain:
+        user_habit = await super().add_user_habit(user_id, habit_id)
+        self._write_through_habit(user_habit)
+        return user_habit
+
+    async def record_relapse(self, user_habit_id: int, reason: Optional[str] = None) -> UserHabitDomain:
+        user_habit = await super().record_relapse(user_habit_id, reason)
+        self._write_through_habit(user_habit)
+        return user_habit
@@ -0,0 +1,92 @@
+import asyncio
+from operator import attrgetter
+from typing import Any, Awaitable, Callable, Generic, Hashable, Iterable, Optional, TypeVar
+
+from core.dao.user_dao import BaseUserGateway
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+BatchLoad = Callable[[list[K]], Awaitable[dict[K, V]]]
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Загрузчик в стиле DataLoader: ключи, запрошенные до следующей итерации
+    event loop (например, из корутин под asyncio.gather), уходят в БД одним
+    batch-вызовом, повторные ключи не запрашиваются. Результаты запоминаются
+    на время жизни загрузчика - одного апдейта.
+    """
+    def __init__(self, batch_load: BatchLoad):
+        self._batch_load = batch_load
+        self._futures: dict[K, asyncio.Future] = {}
+        # Ожидающие выборки пары (ключ, future): clear() не должен терять уже выданные future
+        self._queue: list[tuple[K, asyncio.Future]] = []
+        # Сильные ссылки на задачи выборки: event loop хранит только слабые
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+
+    def load(self, key: K) -> Awaitable[Optional[V]]:
+        """Значение по ключу или None, если его нет в БД"""
+        future = self._futures.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._futures[key] = future
+            if not self._queue:
+                task = asyncio.get_running_loop().create_task(self._dispatch())
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            self._queue.append((key, future))
+        return future
+
+    async def load_many(self, keys: Iterable[K]) -> list[Optional[V]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: K, value: V):
+        """Кладет уже известное значение, например из списка, загруженного другим запросом"""
+        if key not in self._futures:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self._futures[key] = future
+
+    def clear(self, key: Optional[K] = None):
+        """
+        Забывает значение после записи, чтобы следующий load перечитал его.
+        Уже ожидающие получат результат своей выборки, новый load идет отдельной.
+        """
+        if key is None:
+            self._futures.clear()
+        else:
+            self._futures.pop(key, None)
+
+    async def _dispatch(self):
+        pending, self._queue = self._queue, []
+        self.batches += 1
+        try:
+            values = await self._batch_load(list(dict.fromkeys(key for key, _ in pending)))
+        except Exception as e:
+            for key, future in pending:
+                if self._futures.get(key) is future:
+                    del self._futures[key]
+                if not future.done():
+                    future.set_exception(e)
+                    # Ожидающих может уже не быть, ошибка не должна попасть в лог asyncio
+                    future.exception()
+            return
+
+        for key, future in pending:
+            if not future.done():
+                future.set_result(values.get(key))
+
+
+def _batch(load_list: Callable[[list[Any]], Awaitable[list[Any]]], key: Callable[[Any], Any]) -> BatchLoad:
+    async def batch_load(keys: list[Any]) -> dict[Any, Any]:
+        return {key(item): item for item in await load_list(keys)}
+    return batch_load
+
+
+class UpdateLoaders:
+    """Загрузчики одного апдейта поверх read_gateway"""
+    def __init__(self, gateway: BaseUserGateway):
+        self.habits = DataLoader(_batch(gateway.get_habits_by_ids, attrgetter("id")))
+        self.habit_stats = DataLoader(_batch(gateway.get_habit_stats_by_ids, attrgetter("id")))
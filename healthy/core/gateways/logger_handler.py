@@ -1,41 +1,46 @@
 from typing import Awaitable, Optional, Callable, Any
 from functools import wraps
-import time as t
 import logging
 
+from core.database.query_audit import audit_call
+from core.metrics.registry import MetricsRegistry
+from core.metrics.timing import timed
+from core.tracing.tracer import span
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
 )
 
 class DatabaseLoggerHandler:
-    def __init__(self, enable_timing: bool = True):
+    """
+    Латентность и ошибки вызовов шлюза уходят в реестр метрик (core.metrics)
+    вместо INFO-лога на каждый вызов. Ошибки по-прежнему логируются,
+    медленные вызовы - выборочно, по порогу реестра. Внутри трассы
+    апдейта вызов становится спаном kind=gateway, с QueryAuditor -
+    областью учета SQL со своим бюджетом.
+    """
+    def __init__(self, enable_timing: bool = True, registry: Optional[MetricsRegistry] = None):
         self.enable_timing = enable_timing
+        self.registry = registry
         self.logger = logging.getLogger(__name__)
 
     def __call__(self, func: Callable | Awaitable[Any]):
+        span_name = func.__qualname__
+
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
-            start_time = t.monotonic()
-            result, error = None, None
-
             try:
-                return await func(*args, **kwargs)
+                with span(span_name, "gateway"), audit_call(span_name):
+                    return await func(*args, **kwargs)
 
             except Exception as e:
-                error = e
-                self.logger.error(f"Error in {func.__name__}: {str(e)}", exc_info=True, extra={"args": args, "kwargs": kwargs})
+                self.logger.error("Error in %s: %s", func.__name__, e, exc_info=True)
                 raise
 
-            finally:
-                if self.enable_timing:
-                    duration = t.monotonic() - start_time
-                    self.logger.info(
-                        f"Method {func.__name__} executed in {duration:.4f}s",
-                        extra={"method": func.__name__,"duration": duration,"success": error is None}
-                        )
-
+        if self.enable_timing:
+            return timed("gateway", func.__name__, self.registry)(async_wrapper)
         return async_wrapper
 
     async def _send_to_external(self, error: Exception, method_name: str):
-        pass  # Реализация для внешнего сервиса
\ No newline at end of file
+        pass  # Реализация для внешнего сервиса
@@ -3,9 +3,9 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from datetime import datetime, date, time
 
-from sqlalchemy import select
-from sqlalchemy.orm import joinedload
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import select, delete, update, func, case, literal, tuple_, DateTime
+from sqlalchemy import insert as sql_insert
+from sqlalchemy.orm import raiseload
 from sqlalchemy.ext.asyncio import AsyncSession
 from abc import ABC
 from functools import wraps
@@ -13,6 +13,8 @@ from typing import Callable, Optional
 import time as t
 
 from core.dao.user_dao import BaseUserGateway
+from core.database.dialect import upsert
+from core.database.expressions import date_bucket, day_number, utc_now
 from .logger_handler import DatabaseLoggerHandler
 from core.database.structures import *
 from core.dao.user_dao import *
@@ -25,33 +27,497 @@ class UserGateway(BaseUserGateway):
     @DatabaseLoggerHandler(enable_timing=True)
     async def create_user(self, tg_id: int, username: Optional[str], first_name: Optional[str], timezone: str) -> UserDomain:
         statement = (
-            insert(User).values(
-                tg_id=tg_id, username=username, first_name=first_name, timezone=timezone, registration_date=datetime.now()
-                )
-            .on_conflict_do_update(
-                index_elements=['tg_id'],set_={'username': username,'first_name': first_name,'timezone': timezone}
-                ).
-            returning(User)
+            upsert(
+                self._session, User,
+                values={
+                    "tg_id": tg_id, "username": username, "first_name": first_name,
+                    "timezone": timezone, "registration_date": datetime.now()
+                },
+                index_elements=[User.tg_id],
+                update=["username", "first_name", "timezone"]
+            )
+            .returning(User)
+            # Без raiseload RETURNING User догружал бы каскад selectin от User.habits
+            .options(raiseload(User.habits))
+            .execution_options(populate_existing=True)
         )
 
-        await self._session.execute(statement)
+        user = (await self._session.execute(statement)).scalar_one()
+        return UserDomain.model_validate(user)
 
     @DatabaseLoggerHandler(enable_timing=True)
     async def add_admin_habit(self, name: str, cost_per_unit: int | None) -> HabitDomain:
-        statement = (
-            insert(Habit).values(
-                name=name, cost_per_unit=cost_per_unit
+        habit = Habit(name=name, cost_per_unit=cost_per_unit)
+        self._session.add(habit)
+        await self._session.flush()
+        await self._bump_catalog_version()
+
+        return HabitDomain(id=habit.id, name=habit.name, cost_per_unit=habit.cost_per_unit, info=[], hints=[])
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def add_admin_hint(self, name: str, description: str, habit_id: int) -> HintDomain:
+        hint = Hint(name=name, description=description, habit_id=habit_id)
+        self._session.add(hint)
+        await self._session.flush()
+        await self._bump_catalog_version()
+
+        return HintDomain.model_validate(hint)
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def add_admin_info(self, name: str, description: str, habit_id: int) -> InfoDomain:
+        info = Info(name=name, description=description, habit_id=habit_id)
+        self._session.add(info)
+        await self._session.flush()
+        await self._bump_catalog_version()
+
+        return InfoDomain.model_validate(info)
+
+    @staticmethod
+    async def _chunks(records: Records, chunk_size: int):
+        chunk = []
+        if hasattr(records, "__aiter__"):
+            async for record in records:
+                chunk.append(record)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        else:
+            for record in records:
+                chunk.append(record)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def add_admin_habits_bulk(self, habits: Records, chunk_size: int = 500) -> dict[str, int]:
+        habit_ids = {}
+
+        async for chunk in self._chunks(habits, chunk_size):
+            # В одном VALUES не может быть двух строк с одинаковым ключом конфликта
+            rows = {habit.name: {"name": habit.name, "cost_per_unit": habit.cost_per_unit} for habit in chunk}
+            statement = upsert(
+                self._session, Habit, list(rows.values()),
+                index_elements=[Habit.name], update=["cost_per_unit"]
+            ).returning(Habit.id, Habit.name)
+            result = await self._session.execute(statement)
+            habit_ids.update({name: habit_id for habit_id, name in result})
+
+        if habit_ids:
+            await self._bump_catalog_version()
+        return habit_ids
+
+    async def _insert_content_bulk(self, model, records: Records, chunk_size: int) -> int:
+        count = 0
+        async for chunk in self._chunks(records, chunk_size):
+            await self._session.execute(
+                sql_insert(model).values([
+                    {"habit_id": record.habit_id, "name": record.name, "description": record.description}
+                    for record in chunk
+                ])
             )
+            count += len(chunk)
+        if count:
+            await self._bump_catalog_version()
+        return count
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def add_admin_info_bulk(self, info: Records, chunk_size: int = 500) -> int:
+        return await self._insert_content_bulk(Info, info, chunk_size)
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def add_admin_hints_bulk(self, hints: Records, chunk_size: int = 500) -> int:
+        return await self._insert_content_bulk(Hint, hints, chunk_size)
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def delete_habit_content(self, habit_ids: list[int]) -> None:
+        if not habit_ids:
+            return
+        await self._session.execute(delete(Info).where(Info.habit_id.in_(habit_ids)))
+        await self._session.execute(delete(Hint).where(Hint.habit_id.in_(habit_ids)))
+        await self._bump_catalog_version()
+
+    async def _bump_catalog_version(self):
+        await self._session.execute(
+            update(CatalogVersion).where(CatalogVersion.id == 1).values(version=CatalogVersion.version + 1)
         )
 
-        await self._session.execute(statement)
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def get_catalog_version(self) -> int:
+        version = await self._session.scalar(select(CatalogVersion.version).where(CatalogVersion.id == 1))
+        return version or 0
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def get_all_habits(self) -> list[HabitDomain]:
+        result = await self._session.scalars(select(Habit).order_by(Habit.name))
+        return [HabitDomain.model_validate(habit) for habit in result]
 
     @DatabaseLoggerHandler(enable_timing=True)
-    async def add_admin_hint(self, name: str, description: str, habit_id: int) -> HintDomain:
+    async def get_habit_by_id(self, habit_id: int) -> HabitDomain:
+        habit = await self._session.get(Habit, habit_id)
+        if habit is None:
+            raise NotFoundError(f"Habit {habit_id} not found")
+        return HabitDomain.model_validate(habit)
+
+
+    @staticmethod
+    def _user_habit_domain(user_habit: UserHabit, habit_name: str) -> UserHabitDomain:
+        return UserHabitDomain(
+            id=user_habit.id,
+            user_id=user_habit.user_id,
+            habit_id=user_habit.habit_id,
+            habit_name=habit_name,
+            start_date=user_habit.start_date,
+            last_relapse=user_habit.last_relapse,
+            saved_money=user_habit.saved_money
+        )
+
+    @staticmethod
+    def _user_habits_query(condition):
+        """
+        Привычки пользователя колонками с именем из каталога: сущности UserHabit
+        через lazy="joined"/"selectin" тянули бы Habit, reminders, info и hints.
+        """
+        return (
+            select(
+                UserHabit.id, UserHabit.user_id, UserHabit.habit_id, Habit.name.label("habit_name"),
+                UserHabit.start_date, UserHabit.last_relapse, UserHabit.saved_money
+            )
+            .join(Habit, UserHabit.habit_id == Habit.id)
+            .where(condition)
+            .order_by(UserHabit.id)
+        )
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def get_user_by_tg_id(self, tg_id: int) -> Optional[UserDomain]:
+        user = await self._session.scalar(
+            select(User).where(User.tg_id == tg_id).options(raiseload(User.habits))
+        )
+        return UserDomain.model_validate(user) if user else None
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def get_users_by_tg_ids(self, tg_ids: list[int]) -> list[UserDomain]:
+        if not tg_ids:
+            return []
+        result = await self._session.scalars(
+            select(User).where(User.tg_id.in_(tg_ids)).options(raiseload(User.habits))
+        )
+        return [UserDomain.model_validate(user) for user in result]
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def get_habits_by_ids(self, habit_ids: list[int]) -> list[HabitDomain]:
+        if not habit_ids:
+            return []
+        result = await self._session.scalars(select(Habit).where(Habit.id.in_(habit_ids)))
+        return [HabitDomain.model_validate(habit) for habit in result]
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def get_user_habits(self, user_id: int) -> list[UserHabitDomain]:
+        result = await self._session.execute(self._user_habits_query(UserHabit.user_id == user_id))
+        return [UserHabitDomain.model_validate(row._mapping) for row in result]
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def get_user_profile(self, tg_id: int) -> Optional[UserProfileDomain]:
+        user = await self._session.scalar(
+            select(User).where(User.tg_id == tg_id).options(raiseload(User.habits))
+        )
+        if user is None:
+            return None
+        result = await self._session.execute(self._user_habits_query(UserHabit.user_id == user.id))
+        return UserProfileDomain(
+            user=UserDomain.model_validate(user),
+            habits=[UserHabitDomain.model_validate(row._mapping) for row in result]
+        )
+
+    @staticmethod
+    def _habit_stats_source(condition):
+        """
+        Пересчет user_habit_stats по relapse_history. Окно LAG дает для каждого
+        рецидива длину серии перед ним (от предыдущего рецидива или старта),
+        агрегат по user_habit - число рецидивов, самую длинную закрытую серию
+        и число дней с рецидивами после старта. Дни - календарные, по UTC.
+        """
+        relapse_day = day_number(RelapseHistory.relapse_time)
+        start_day = day_number(UserHabit.start_date)
+        previous = func.lag(RelapseHistory.relapse_time).over(
+            partition_by=RelapseHistory.user_habit_id,
+            order_by=(RelapseHistory.relapse_time, RelapseHistory.id)
+        )
+        gaps = (
+            select(
+                RelapseHistory.id,
+                RelapseHistory.user_habit_id,
+                RelapseHistory.relapse_time,
+                case((relapse_day > start_day, relapse_day)).label("relapse_day"),
+                (relapse_day - day_number(func.coalesce(previous, UserHabit.start_date))).label("gap")
+            )
+            .join(UserHabit, RelapseHistory.user_habit_id == UserHabit.id)
+            .where(condition)
+            .subquery("relapse_gaps")
+        )
+        relapses = (
+            select(
+                gaps.c.user_habit_id,
+                func.count().label("relapse_count"),
+                func.count(gaps.c.relapse_day.distinct()).label("relapse_days"),
+                func.max(gaps.c.gap).label("longest_streak"),
+                func.max(gaps.c.relapse_time).label("last_relapse"),
+                func.max(gaps.c.id).label("last_relapse_id")
+            )
+            .group_by(gaps.c.user_habit_id)
+            .subquery("relapse_stats")
+        )
+
+        streak_start = func.coalesce(relapses.c.last_relapse, UserHabit.start_date)
+        # Чистые дни до начала текущей серии: со старта минус дни с рецидивами
+        clean_days = day_number(streak_start) - start_day - func.coalesce(relapses.c.relapse_days, 0)
+        return (
+            select(
+                UserHabit.id.label("user_habit_id"),
+                streak_start.label("streak_start"),
+                func.coalesce(relapses.c.longest_streak, 0).label("longest_streak"),
+                func.coalesce(relapses.c.relapse_count, 0).label("relapse_count"),
+                relapses.c.last_relapse,
+                relapses.c.last_relapse_id,
+                (clean_days * func.coalesce(Habit.cost_per_unit, 0)).label("saved_money")
+            )
+            .join(Habit, UserHabit.habit_id == Habit.id)
+            .outerjoin(relapses, relapses.c.user_habit_id == UserHabit.id)
+            .where(condition)
+            .order_by(UserHabit.id)
+        )
+
+    @staticmethod
+    def _insert_habit_stats(condition):
+        source = UserGateway._habit_stats_source(condition)
+        return sql_insert(UserHabitStats).from_select([column.name for column in source.selected_columns], source)
+
+    @staticmethod
+    def _habit_stats_query(condition):
+        """
+        Статистика привычек из user_habit_stats: текущая серия и экономия
+        за нее досчитываются от streak_start, история рецидивов не читается.
+        Для привычек без строки статистики серия считается от last_relapse.
+        """
+        current_streak = day_number(utc_now()) - day_number(
+            func.coalesce(UserHabitStats.streak_start, UserHabit.last_relapse, UserHabit.start_date)
+        )
+        longest_closed = func.coalesce(UserHabitStats.longest_streak, 0)
+        return (
+            select(
+                UserHabit.id,
+                UserHabit.user_id,
+                UserHabit.habit_id,
+                Habit.name.label("habit_name"),
+                Habit.cost_per_unit,
+                UserHabit.start_date,
+                UserHabit.last_relapse,
+                UserHabitStats.last_relapse_id,
+                current_streak.label("current_streak"),
+                case((longest_closed > current_streak, longest_closed), else_=current_streak).label("longest_streak"),
+                func.coalesce(UserHabitStats.relapse_count, 0).label("relapse_count"),
+                (
+                    func.coalesce(UserHabitStats.saved_money, 0)
+                    + current_streak * func.coalesce(Habit.cost_per_unit, 0)
+                ).label("saved_money")
+            )
+            .join(Habit, UserHabit.habit_id == Habit.id)
+            .outerjoin(UserHabitStats, UserHabitStats.user_habit_id == UserHabit.id)
+            .where(condition)
+            .order_by(UserHabit.id)
+        )
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def get_user_habit_stats(self, tg_id: int) -> list[UserHabitStatsDomain]:
+        user_id = select(User.id).where(User.tg_id == tg_id).scalar_subquery()
+        result = await self._session.execute(self._habit_stats_query(UserHabit.user_id == user_id))
+        return [UserHabitStatsDomain.model_validate(row._mapping) for row in result]
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def get_habit_stats(self, user_habit_id: int) -> UserHabitStatsDomain:
+        row = (await self._session.execute(self._habit_stats_query(UserHabit.id == user_habit_id))).first()
+        if row is None:
+            raise NotFoundError(f"User habit {user_habit_id} not found")
+        return UserHabitStatsDomain.model_validate(row._mapping)
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def get_relapse_history(
+            self,
+            user_habit_id: int,
+            limit: int,
+            before: Optional[tuple[datetime, int]] = None
+    ) -> list[RelapseHistoryDomain]:
         statement = (
-            insert(Hint).values(
-                name=name, description=description, habit_id=habit_id
+            select(RelapseHistory.id, RelapseHistory.relapse_time, RelapseHistory.reason, RelapseHistory.user_habit_id)
+            .where(RelapseHistory.user_habit_id == user_habit_id)
+            .order_by(RelapseHistory.relapse_time.desc(), RelapseHistory.id.desc())
+            .limit(limit)
+        )
+        if before is not None:
+            statement = statement.where(tuple_(RelapseHistory.relapse_time, RelapseHistory.id) < tuple_(*before))
+
+        result = await self._session.execute(statement)
+        return [RelapseHistoryDomain.model_validate(dict(row._mapping)) for row in result]
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def get_relapse_buckets(
+            self,
+            user_habit_id: int,
+            bucket: str = "day",
+            since: Optional[datetime] = None,
+            until: Optional[datetime] = None
+    ) -> list[RelapseBucketDomain]:
+        bucket_start = date_bucket(bucket, RelapseHistory.relapse_time)
+        statement = (
+            select(bucket_start.label("bucket_start"), func.count().label("relapse_count"))
+            .where(RelapseHistory.user_habit_id == user_habit_id)
+            .group_by(bucket_start)
+            .order_by(bucket_start)
+        )
+        if since is not None:
+            statement = statement.where(RelapseHistory.relapse_time >= since)
+        if until is not None:
+            statement = statement.where(RelapseHistory.relapse_time < until)
+
+        result = await self._session.execute(statement)
+        return [RelapseBucketDomain.model_validate(dict(row._mapping)) for row in result]
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def get_habit_stats_by_ids(self, user_habit_ids: list[int]) -> list[UserHabitStatsDomain]:
+        if not user_habit_ids:
+            return []
+        result = await self._session.execute(self._habit_stats_query(UserHabit.id.in_(user_habit_ids)))
+        return [UserHabitStatsDomain.model_validate(row._mapping) for row in result]
+
+    async def _user_habit_ids_chunk(self, after_id: int, limit: int) -> list[int]:
+        result = await self._session.scalars(
+            select(UserHabit.id).where(UserHabit.id > after_id).order_by(UserHabit.id).limit(limit)
+        )
+        return list(result)
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def rebuild_habit_stats(self, after_id: int, limit: int) -> int:
+        user_habit_ids = await self._user_habit_ids_chunk(after_id, limit)
+        if not user_habit_ids:
+            return 0
+
+        await self._session.execute(delete(UserHabitStats).where(UserHabitStats.user_habit_id.in_(user_habit_ids)))
+        await self._session.execute(self._insert_habit_stats(UserHabit.id.in_(user_habit_ids)))
+        return user_habit_ids[-1]
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def check_habit_stats(self, after_id: int, limit: int) -> HabitStatsCheck:
+        user_habit_ids = await self._user_habit_ids_chunk(after_id, limit)
+        if not user_habit_ids:
+            return HabitStatsCheck(last_id=0, checked=0, mismatched=[])
+
+        columns = ("streak_start", "longest_streak", "relapse_count", "last_relapse", "last_relapse_id")
+        expected = await self._session.execute(self._habit_stats_source(UserHabit.id.in_(user_habit_ids)))
+        stored = {
+            stats.user_habit_id: stats for stats in await self._session.scalars(
+                select(UserHabitStats).where(UserHabitStats.user_habit_id.in_(user_habit_ids))
+            )
+        }
+
+        mismatched = []
+        for row in expected:
+            stats = stored.get(row.user_habit_id)
+            if (
+                stats is None
+                or any(getattr(stats, column) != getattr(row, column) for column in columns)
+                or round(stats.saved_money - row.saved_money, 2) != 0
+            ):
+                mismatched.append(row.user_habit_id)
+        return HabitStatsCheck(last_id=user_habit_ids[-1], checked=len(user_habit_ids), mismatched=mismatched)
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def add_user_habit(self, user_id: int, habit_id: int) -> UserHabitDomain:
+        user_habit = UserHabit(user_id=user_id, habit_id=habit_id, start_date=datetime.utcnow())
+        self._session.add(user_habit)
+        await self._session.flush()
+        await self._session.execute(
+            sql_insert(UserHabitStats).values(user_habit_id=user_habit.id, streak_start=user_habit.start_date)
+        )
+        habit_name = await self._session.scalar(select(Habit.name).where(Habit.id == habit_id))
+
+        return self._user_habit_domain(user_habit, habit_name)
+
+    async def _update_habit_stats(self, user_habit: UserHabit, relapse: RelapseHistory, cost: float):
+        """
+        Инкрементальное обновление user_habit_stats одним UPDATE: закрытая серия
+        сравнивается с самой длинной, ее чистые дни (кроме дня рецидива)
+        добавляются к экономии, новая серия начинается с рецидива.
+        """
+        gap = day_number(literal(relapse.relapse_time, DateTime())) - day_number(UserHabitStats.streak_start)
+        result = await self._session.execute(
+            update(UserHabitStats)
+            .where(UserHabitStats.user_habit_id == user_habit.id)
+            .values(
+                streak_start=relapse.relapse_time,
+                last_relapse=relapse.relapse_time,
+                last_relapse_id=relapse.id,
+                relapse_count=UserHabitStats.relapse_count + 1,
+                longest_streak=case((gap > UserHabitStats.longest_streak, gap), else_=UserHabitStats.longest_streak),
+                saved_money=UserHabitStats.saved_money + case((gap > 1, (gap - 1) * cost), else_=0)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            # Строки еще нет (привычка старше таблицы статистики) - считаем по истории
+            await self._session.execute(self._insert_habit_stats(UserHabit.id == user_habit.id))
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def record_relapse(self, user_habit_id: int, reason: Optional[str] = None) -> UserHabitDomain:
+        # Из каталога нужны только имя и цена, связи UserHabit не загружаются
+        row = (await self._session.execute(
+            select(UserHabit, Habit.name, Habit.cost_per_unit)
+            .join(Habit, UserHabit.habit_id == Habit.id)
+            .where(UserHabit.id == user_habit_id)
+            .options(raiseload(UserHabit.habit), raiseload(UserHabit.reminders))
+        )).first()
+        if row is None:
+            raise NotFoundError(f"User habit {user_habit_id} not found")
+        user_habit, habit_name, cost = row
+
+        relapse = RelapseHistory(user_habit_id=user_habit_id, reason=reason, relapse_time=datetime.utcnow())
+        user_habit.last_relapse = relapse.relapse_time
+        self._session.add(relapse)
+        await self._session.flush()
+        await self._update_habit_stats(user_habit, relapse, cost or 0)
+
+        return self._user_habit_domain(user_habit, habit_name)
+
+    def _reminder_schedule_query(self):
+        return (
+            select(
+                Reminder.id, Reminder.reminder_type, Reminder.scheduled_time,
+                User.timezone, User.tg_id, Habit.name.label("habit_name")
             )
+            .join(UserHabit, Reminder.user_habit_id == UserHabit.id)
+            .join(User, UserHabit.user_id == User.id)
+            .join(Habit, UserHabit.habit_id == Habit.id)
+            .where(Reminder.is_active.is_(True))
         )
 
-        await self._session.execute(statement)
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def get_active_reminders(self, after_id: int, limit: int) -> list[ReminderScheduleDomain]:
+        statement = (
+            self._reminder_schedule_query()
+            .where(Reminder.id > after_id)
+            .order_by(Reminder.id)
+            .limit(limit)
+        )
+
+        result = await self._session.execute(statement)
+        return [ReminderScheduleDomain.model_validate(dict(row._mapping)) for row in result]
+
+    @DatabaseLoggerHandler(enable_timing=True)
+    async def get_reminders_by_ids(self, reminder_ids: list[int]) -> list[ReminderScheduleDomain]:
+        if not reminder_ids:
+            return []
+
+        statement = self._reminder_schedule_query().where(Reminder.id.in_(reminder_ids))
+
+        result = await self._session.execute(statement)
+        return [ReminderScheduleDomain.model_validate(dict(row._mapping)) for row in result]
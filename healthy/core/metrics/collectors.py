@@ -0,0 +1,63 @@
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Iterator, Optional
+
+from core.database.pool import CHECKOUT_WAIT_BUCKETS
+
+from .registry import GAUGE_FIELD, MetricFamily, counter_name, histogram_family
+
+
+def stats_collector(
+        prefix: str,
+        source: Callable[[], Optional[Any]],
+        help: str = "",
+        exclude: tuple[str, ...] = ()
+) -> Callable[[], Iterator[MetricFamily]]:
+    """
+    Коллектор для dataclass-счетчиков (OutboxStats, CacheStats и т.п.):
+    числовое поле становится counter prefix_field_total, поле с metadata
+    GAUGE_FIELD и числовое свойство (доли, средние) - gauge prefix_field.
+    source вызывается при каждом экспорте и может вернуть None.
+    """
+    def collect() -> Iterator[MetricFamily]:
+        stats = source()
+        if stats is None or not is_dataclass(stats):
+            return
+        kinds = [(item.name, item.metadata.get("metric", "counter")) for item in fields(stats)]
+        kinds += [(name, "gauge") for name, value in vars(type(stats)).items() if isinstance(value, property)]
+        for name, kind in kinds:
+            value = getattr(stats, name)
+            if name in exclude or not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            metric = f"{prefix}_{name}"
+            if kind == "counter":
+                metric = counter_name(metric)
+                yield MetricFamily(metric, kind, help or metric, [(metric + "_total", {}, float(value))])
+            else:
+                yield MetricFamily(metric, kind, help or metric, [(metric, {}, float(value))])
+    return collect
+
+
+def gauge_collector(name: str, help: str, source: Callable[[], Optional[float]]) -> Callable[[], Iterator[MetricFamily]]:
+    """Коллектор одного значения, например глубины очереди"""
+    def collect() -> Iterator[MetricFamily]:
+        value = source()
+        if value is not None:
+            yield MetricFamily(name, "gauge", help, [(name, {}, float(value))])
+    return collect
+
+
+def pool_collector(prefix: str, source: Callable[[], Optional[Any]]) -> Callable[[], Iterator[MetricFamily]]:
+    """Коллектор PoolStats: счетчики и gauge, плюс гистограмма ожидания соединения"""
+    # Сумма и число ожиданий есть в гистограмме
+    counters = stats_collector(prefix, source, "Connection pool statistics", exclude=("wait_total", "wait_avg"))
+
+    def collect() -> Iterator[MetricFamily]:
+        stats = source()
+        if stats is None:
+            return
+        yield from counters()
+        yield histogram_family(
+            f"{prefix}_checkout_wait_seconds", "Time spent waiting for a pooled connection",
+            CHECKOUT_WAIT_BUCKETS, [({}, stats.wait_buckets, stats.wait_total)]
+        )
+    return collect
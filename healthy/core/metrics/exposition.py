@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from aiohttp import web
+
+from .registry import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render_prometheus(registry: MetricsRegistry) -> str:
+    """Текстовый формат Prometheus 0.0.4"""
+    lines = []
+    for family in registry.collect():
+        if not family.samples:
+            continue
+        # Как в prometheus_client: у counter HELP/TYPE называются так же, как samples
+        name = family.name + "_total" if family.type == "counter" else family.name
+        lines.append(f"# HELP {name} {_escape(family.help)}")
+        lines.append(f"# TYPE {name} {family.type}")
+        for name, labels, value in family.samples:
+            if labels:
+                rendered = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels.items())
+                lines.append(f"{name}{{{rendered}}} {_format_value(value)}")
+            else:
+                lines.append(f"{name} {_format_value(value)}")
+    lines.append("")
+    return "\n".join(lines)
+
+
+def _write_atomic(path: str, text: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+
+
+class MetricsExporter:
+    """
+    Отдает метрики реестра: HTTP-эндпоинт для Prometheus (если задан port)
+    и/или периодический дамп в файл (если задан dump_path), например для
+    node_exporter textfile collector. Снимок собирается в event loop,
+    запись файла уходит в поток.
+    """
+    def __init__(
+            self,
+            registry: MetricsRegistry,
+            host: str = "127.0.0.1",
+            port: Optional[int] = None,
+            path: str = "/metrics",
+            dump_path: Optional[str] = None,
+            dump_interval: float = 15.0
+    ):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.path = path
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self._runner: Optional[web.AppRunner] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(body=render_prometheus(self.registry).encode(), headers={"Content-Type": CONTENT_TYPE})
+
+    async def start(self):
+        if self.port:
+            app = web.Application()
+            app.router.add_get(self.path, self.handle)
+            self._runner = web.AppRunner(app, access_log=None)
+            await self._runner.setup()
+            await web.TCPSite(self._runner, self.host, self.port).start()
+            logger.info("Metrics endpoint listening on %s:%s%s", self.host, self.port, self.path)
+        if self.dump_path:
+            self._task = asyncio.create_task(self._dump_loop(), name="metrics-dump")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            await self.dump()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def dump(self):
+        await asyncio.to_thread(_write_atomic, self.dump_path, render_prometheus(self.registry))
+
+    async def _dump_loop(self):
+        while True:
+            await asyncio.sleep(self.dump_interval)
+            try:
+                await self.dump()
+            except OSError as e:
+                logger.error("Failed to dump metrics to %s: %s", self.dump_path, e)
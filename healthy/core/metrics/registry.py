@@ -0,0 +1,205 @@
+import bisect
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Optional
+
+# Границы корзин гистограмм латентности по умолчанию, в секундах
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[str, ...]
+
+# metadata поля dataclass-счетчиков, которое может уменьшаться: stats_collector
+# отдает его как gauge, остальные числовые поля - как counter
+GAUGE_FIELD = {"metric": "gauge"}
+
+
+@dataclass
+class MetricFamily:
+    """
+    Снимок метрики для экспорта: samples - (имя, метки, значение).
+    У counter name - без суффикса _total, как в prometheus_client,
+    суффикс есть у имен samples и добавляется в HELP/TYPE при экспорте.
+    """
+    name: str
+    type: str
+    help: str
+    samples: list[tuple[str, dict[str, str], float]] = field(default_factory=list)
+
+
+class Counter:
+    """Монотонный счетчик с метками"""
+    __slots__ = ("name", "help", "label_names", "_values")
+
+    def __init__(self, name: str, help: str, label_names: Labels = ()):
+        self.name = counter_name(name)
+        self.help = help
+        self.label_names = label_names
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0.0)
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, "counter", self.help)
+        for labels, value in self._values.items():
+            family.samples.append((self.name + "_total", dict(zip(self.label_names, labels)), value))
+        return family
+
+
+def counter_name(name: str) -> str:
+    """Имя семейства counter без суффикса _total"""
+    return name[:-len("_total")] if name.endswith("_total") else name
+
+
+class Gauge:
+    """Мгновенное значение с метками"""
+    __slots__ = ("name", "help", "label_names", "_values")
+
+    def __init__(self, name: str, help: str, label_names: Labels = ()):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self._values: dict[Labels, float] = {}
+
+    def set(self, value: float, labels: Labels = ()):
+        self._values[labels] = value
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, "gauge", self.help)
+        for labels, value in self._values.items():
+            family.samples.append((self.name, dict(zip(self.label_names, labels)), value))
+        return family
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными корзинами. observe - O(log n) без
+    блокировок: метрики обновляются только из потока event loop.
+    """
+    __slots__ = ("name", "help", "label_names", "buckets", "_series")
+
+    def __init__(self, name: str, help: str, label_names: Labels = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[Labels, _HistogramSeries] = {}
+
+    def observe(self, value: float, labels: Labels = ()):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = _HistogramSeries(len(self.buckets) + 1)
+        series.counts[bisect.bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    def quantile(self, q: float, labels: Labels = ()) -> float:
+        """Оценка квантиля по верхней границе корзины"""
+        series = self._series.get(labels)
+        if series is None or not series.count:
+            return 0.0
+        rank, cumulative = q * series.count, 0
+        for bound, count in zip(self.buckets, series.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+    def collect(self) -> MetricFamily:
+        return histogram_family(
+            self.name, self.help, self.buckets,
+            ((dict(zip(self.label_names, labels)), series.counts, series.sum)
+             for labels, series in self._series.items())
+        )
+
+
+def histogram_family(
+        name: str,
+        help: str,
+        buckets: tuple[float, ...],
+        series: Iterable[tuple[dict[str, str], list[int], float]]
+) -> MetricFamily:
+    """
+    Собирает семейство histogram из готовых счетчиков корзин.
+    series: (метки, счетчики корзин с последней +Inf, сумма).
+    """
+    family = MetricFamily(name, "histogram", help)
+    for labels, counts, total in series:
+        cumulative = 0
+        for bound, count in zip(buckets + (float("inf"),), counts):
+            cumulative += count
+            family.samples.append((name + "_bucket", {**labels, "le": _format_bound(bound)}, cumulative))
+        family.samples.append((name + "_sum", labels, total))
+        family.samples.append((name + "_count", labels, cumulative))
+    return family
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса. Кроме собственных метрик принимает
+    коллекторы - функции, которые при экспорте отдают снимки
+    уже существующих счетчиков (пул, outbox, кэши).
+    """
+    def __init__(self, slow_call_threshold: float = 0.5, slow_call_sample_rate: float = 1.0):
+        self.slow_call_threshold = slow_call_threshold
+        self.slow_call_sample_rate = slow_call_sample_rate
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+        self._collectors: dict[str, Callable[[], Iterable[MetricFamily]]] = {}
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name!r} is already registered as {type(metric).__name__}")
+        return metric
+
+    def counter(self, name: str, help: str, label_names: Labels = ()) -> Counter:
+        return self._get_or_create(Counter, counter_name(name), help, label_names)
+
+    def gauge(self, name: str, help: str, label_names: Labels = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, label_names)
+
+    def histogram(
+            self,
+            name: str,
+            help: str,
+            label_names: Labels = (),
+            buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, help, label_names, buckets)
+
+    def register_collector(self, name: str, collector: Callable[[], Iterable[MetricFamily]]):
+        """Повторная регистрация под тем же именем заменяет коллектор"""
+        self._collectors[name] = collector
+
+    def unregister_collector(self, name: str):
+        self._collectors.pop(name, None)
+
+    def get(self, name: str) -> Optional[Counter | Gauge | Histogram]:
+        return self._metrics.get(name)
+
+    def collect(self) -> Iterator[MetricFamily]:
+        for metric in self._metrics.values():
+            yield metric.collect()
+        for collector in list(self._collectors.values()):
+            yield from collector()
+
+
+# Реестр процесса по умолчанию
+REGISTRY = MetricsRegistry()
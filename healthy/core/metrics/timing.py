@@ -0,0 +1,61 @@
+import inspect
+import logging
+import random
+import time as t
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from .registry import REGISTRY, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+CALL_DURATION = "healthy_call_duration_seconds"
+CALL_ERRORS = "healthy_call_errors"
+
+
+def timed(kind: str, name: Optional[str] = None, registry: Optional[MetricsRegistry] = None):
+    """
+    Декоратор корутины: латентность в гистограмму healthy_call_duration_seconds
+    и ошибки в счетчик healthy_call_errors с метками kind/method.
+    Медленные вызовы (дольше slow_call_threshold реестра) логируются
+    с вероятностью slow_call_sample_rate.
+    """
+    target = registry or REGISTRY
+
+    def decorator(func: Callable):
+        method = name or func.__name__
+        labels = (kind, method)
+        durations = target.histogram(CALL_DURATION, "Call latency", ("kind", "method"))
+        errors = target.counter(CALL_ERRORS, "Failed calls", ("kind", "method", "error"))
+
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any):
+            started = t.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                errors.inc((kind, method, type(e).__name__))
+                raise
+            finally:
+                duration = t.perf_counter() - started
+                durations.observe(duration, labels)
+                if duration >= target.slow_call_threshold and random.random() < target.slow_call_sample_rate:
+                    logger.warning("Slow %s %s: %.3fs", kind, method, duration)
+
+        return wrapper
+    return decorator
+
+
+def instrument_methods(obj: Any, kind: str, registry: Optional[MetricsRegistry] = None) -> Any:
+    """
+    Оборачивает все публичные корутинные методы объекта в timed,
+    заменяя их атрибутами экземпляра. Вызывать до того, как методы
+    переданы в виджеты диалогов.
+    """
+    for attr in dir(obj):
+        if attr.startswith("_"):
+            continue
+        method = getattr(obj, attr)
+        if inspect.iscoroutinefunction(method):
+            setattr(obj, attr, timed(kind, attr, registry)(method))
+    return obj
@@ -0,0 +1,79 @@
+"""
+Выбор реализации event loop: uvloop на Linux/macOS, winloop на Windows,
+стандартный asyncio - если нужного пакета нет или платформа не подходит.
+Цикл создается через фабрику asyncio.Runner, глобальная политика не меняется.
+"""
+import asyncio
+import logging
+import sys
+from dataclasses import dataclass
+from typing import Any, Callable, Coroutine, Optional
+
+logger = logging.getLogger(__name__)
+
+LOOPS = ("auto", "uvloop", "winloop", "asyncio")
+
+LoopFactory = Callable[[], asyncio.AbstractEventLoop]
+
+
+@dataclass(frozen=True)
+class LoopChoice:
+    """Выбранный цикл; reason объясняет откат на asyncio"""
+    name: str
+    requested: str
+    factory: Optional[LoopFactory] = None
+    reason: str = ""
+
+
+def _platform_loop(platform: str) -> str:
+    return "winloop" if platform == "win32" else "uvloop"
+
+
+def _loop_factory(name: str) -> LoopFactory:
+    """ImportError, если пакета нет"""
+    if name == "uvloop":
+        import uvloop
+        return uvloop.new_event_loop
+    if name == "winloop":
+        import winloop
+        return winloop.new_event_loop
+    raise ValueError(f"Unknown event loop {name!r}")
+
+
+def select_event_loop(requested: str = "auto", platform: str = sys.platform) -> LoopChoice:
+    """
+    Выбирает цикл по настройке и платформе.
+    requested: auto, uvloop, winloop или asyncio.
+    Недоступный цикл не роняет запуск: выбирается asyncio с причиной в reason.
+    """
+    requested = requested.lower()
+    if requested not in LOOPS:
+        raise ValueError(f"Unknown event loop {requested!r}, expected one of {', '.join(LOOPS)}")
+    if requested == "asyncio":
+        return LoopChoice("asyncio", requested)
+
+    name = _platform_loop(platform) if requested == "auto" else requested
+    if name != _platform_loop(platform):
+        return LoopChoice("asyncio", requested, reason=f"{name} is not supported on {platform}")
+    try:
+        return LoopChoice(name, requested, _loop_factory(name))
+    except ImportError:
+        return LoopChoice("asyncio", requested, reason=f"{name} is not installed")
+
+
+def run(main: Coroutine[Any, Any, Any], requested: str = "auto") -> Any:
+    """asyncio.run() на выбранном цикле"""
+    choice = select_event_loop(requested)
+    if choice.reason:
+        log = logger.warning if choice.requested != "auto" else logger.info
+        log("Event loop: asyncio (%s)", choice.reason)
+    else:
+        logger.info("Event loop: %s", choice.name)
+
+    with asyncio.Runner(loop_factory=choice.factory) as runner:
+        return runner.run(main)
+
+
+def running_loop_name() -> str:
+    """Реализация текущего цикла по модулю его класса: uvloop, winloop или asyncio"""
+    return type(asyncio.get_running_loop()).__module__.partition(".")[0]
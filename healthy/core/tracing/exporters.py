@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+from typing import Any, Optional
+
+import aiohttp
+
+from .tracer import Span, Trace
+
+logger = logging.getLogger(__name__)
+
+
+class _BufferedExporter:
+    """Буфер трасс: export вызывается из event loop и не делает I/O"""
+    def __init__(self, max_buffer: int = 10_000):
+        self.max_buffer = max_buffer
+        self.dropped = 0
+        self._buffer: list[Trace] = []
+
+    def export(self, trace: Trace):
+        if len(self._buffer) >= self.max_buffer:
+            self.dropped += 1
+            return
+        self._buffer.append(trace)
+
+    def _drain(self) -> list[Trace]:
+        traces, self._buffer = self._buffer, []
+        return traces
+
+    async def close(self):
+        await self.flush()
+
+    async def flush(self):
+        raise NotImplementedError()
+
+
+def _span_dict(trace: Trace, span: Span) -> dict[str, Any]:
+    return {
+        "span_id": span.span_id,
+        "parent_id": span.parent_id,
+        "name": span.name,
+        "kind": span.kind,
+        "start_offset_ms": round((span.start_ns - trace.root.start_ns) / 1e6, 3),
+        "duration_ms": round(span.duration * 1e3, 3),
+        "attributes": span.attributes,
+        "error": span.error,
+    }
+
+
+class JsonlTraceExporter(_BufferedExporter):
+    """Медленные трассы в локальный файл, по трассе на строку"""
+    def __init__(self, path: str, max_buffer: int = 10_000):
+        super().__init__(max_buffer)
+        self.path = path
+
+    def _render(self, trace: Trace) -> str:
+        return json.dumps({
+            "trace_id": trace.trace_id,
+            "timestamp_ns": trace.wall_ns(trace.root.start_ns),
+            "name": trace.root.name,
+            "duration_ms": round(trace.root.duration * 1e3, 3),
+            "attributes": trace.root.attributes,
+            "error": trace.root.error,
+            "dropped_spans": trace.dropped,
+            "spans": [_span_dict(trace, span) for span in trace.spans[1:]],
+        }, ensure_ascii=False, default=str)
+
+    def _write(self, lines: list[str]):
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.writelines(line + "\n" for line in lines)
+
+    async def flush(self):
+        traces = self._drain()
+        if traces:
+            await asyncio.to_thread(self._write, [self._render(trace) for trace in traces])
+
+
+# Коды SpanKind из спецификации OTLP
+_OTLP_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+class OtlpHttpExporter(_BufferedExporter):
+    """
+    Экспорт в локальный OpenTelemetry Collector по OTLP/HTTP с JSON
+    (http://127.0.0.1:4318/v1/traces), без зависимостей от opentelemetry-sdk.
+    """
+    def __init__(self, endpoint: str, service_name: str = "healthy", timeout: float = 5.0, max_buffer: int = 10_000):
+        super().__init__(max_buffer)
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+        self._session = None
+
+    def _span(self, trace: Trace, span: Span) -> dict[str, Any]:
+        payload = {
+            "traceId": trace.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": _OTLP_KINDS.get(span.kind, 1),
+            "startTimeUnixNano": str(trace.wall_ns(span.start_ns)),
+            "endTimeUnixNano": str(trace.wall_ns(span.end_ns or span.start_ns)),
+            "attributes": _otlp_attributes({"healthy.kind": span.kind, **span.attributes}),
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 0},
+        }
+        if span.parent_id:
+            payload["parentSpanId"] = span.parent_id
+        return payload
+
+    def _payload(self, traces: list[Trace]) -> dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                "scopeSpans": [{
+                    "scope": {"name": "healthy.tracing"},
+                    "spans": [self._span(trace, span) for trace in traces for span in trace.spans],
+                }],
+            }]
+        }
+
+    async def flush(self):
+        traces = self._drain()
+        if not traces:
+            return
+
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        async with self._session.post(self.endpoint, json=self._payload(traces)) as response:
+            if response.status >= 400:
+                logger.warning("OTLP collector rejected %d traces: HTTP %s", len(traces), response.status)
+
+    async def close(self):
+        try:
+            await self.flush()
+        finally:
+            if self._session is not None:
+                await self._session.close()
+                self._session = None
+
+
+def create_exporters(jsonl_path: Optional[str], otlp_endpoint: Optional[str], service_name: str = "healthy") -> list:
+    exporters = []
+    if jsonl_path:
+        exporters.append(JsonlTraceExporter(jsonl_path))
+    if otlp_endpoint:
+        exporters.append(OtlpHttpExporter(otlp_endpoint, service_name))
+    return exporters
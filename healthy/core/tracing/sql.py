@@ -0,0 +1,44 @@
+from typing import Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .tracer import start_span
+
+MAX_STATEMENT_LENGTH = 1000
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = start_span(
+        "sql " + statement.lstrip().split(None, 1)[0].upper(), "client",
+        **{"db.system": conn.dialect.name, "db.statement": statement[:MAX_STATEMENT_LENGTH], "db.executemany": executemany}
+    )
+    if span is not None:
+        context._trace_span = span
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        span.attributes["db.rowcount"] = cursor.rowcount
+        span.end()
+        context._trace_span = None
+
+
+def _handle_error(exception_context):
+    context = exception_context.execution_context
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        span.end(exception_context.original_exception)
+        context._trace_span = None
+
+
+def instrument_engine(engine: Union[AsyncEngine, Engine]):
+    """Спан на каждый выполненный запрос, если он идет внутри трассы"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
@@ -0,0 +1,236 @@
+import asyncio
+import inspect
+import logging
+import os
+import random
+import time as t
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Optional, Protocol
+
+logger = logging.getLogger(__name__)
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """Интервал внутри трассы, время - в наносекундах perf_counter"""
+    __slots__ = ("name", "kind", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, kind: str, parent_id: Optional[str], attributes: dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.start_ns = t.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_ns or t.perf_counter_ns()) - self.start_ns) / 1e9
+
+    def end(self, error: Optional[BaseException] = None):
+        self.end_ns = t.perf_counter_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+
+class Trace:
+    """Трасса одного апдейта: корневой спан и все вложенные"""
+    __slots__ = ("trace_id", "root", "spans", "dropped", "max_spans", "_wall_ns", "_perf_ns")
+
+    def __init__(self, name: str, attributes: dict[str, Any], max_spans: int):
+        self.trace_id = os.urandom(16).hex()
+        self._wall_ns = t.time_ns()
+        self._perf_ns = t.perf_counter_ns()
+        self.root = Span(name, "server", None, attributes)
+        self.spans: list[Span] = [self.root]
+        self.dropped = 0
+        self.max_spans = max_spans
+
+    def wall_ns(self, perf_ns: int) -> int:
+        """Переводит отметку perf_counter в unix-время для экспорта"""
+        return self._wall_ns + (perf_ns - self._perf_ns)
+
+    def start_span(self, name: str, kind: str, parent: Optional[Span], attributes: dict[str, Any]) -> Optional[Span]:
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return None
+        span = Span(name, kind, (parent or self.root).span_id, attributes)
+        self.spans.append(span)
+        return span
+
+
+class TraceExporter(Protocol):
+    def export(self, trace: Trace): ...
+
+    async def flush(self): ...
+
+    async def close(self): ...
+
+
+class _NoopScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP = _NoopScope()
+
+
+class _SpanScope:
+    __slots__ = ("trace", "name", "kind", "attributes", "span", "_token")
+
+    def __init__(self, trace: Trace, name: str, kind: str, attributes: dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.span: Optional[Span] = None
+        self._token = None
+
+    def __enter__(self) -> Optional[Span]:
+        self.span = self.trace.start_span(self.name, self.kind, _current_span.get(), self.attributes)
+        if self.span is not None:
+            self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is not None:
+            self.span.end(exc)
+            _current_span.reset(self._token)
+        return False
+
+
+def span(name: str, kind: str = "internal", **attributes: Any):
+    """
+    Вложенный спан текущей трассы. Вне трассы возвращает пустой
+    контекст, так что с выключенной трассировкой цена - один ContextVar.get.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP
+    return _SpanScope(trace, name, kind, attributes)
+
+
+def start_span(name: str, kind: str = "internal", **attributes: Any) -> Optional[Span]:
+    """Листовой спан без смены текущего, для колбэков вроде событий движка"""
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    return trace.start_span(name, kind, _current_span.get(), attributes)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def traced(kind: str, name: Optional[str] = None):
+    """Декоратор корутины: спан kind/name, если вызов идет внутри трассы"""
+    def decorator(func: Callable):
+        span_name = name or func.__qualname__
+
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any):
+            trace = _current_trace.get()
+            if trace is None:
+                return await func(*args, **kwargs)
+            with _SpanScope(trace, span_name, kind, {}):
+                return await func(*args, **kwargs)
+
+        return wrapper
+    return decorator
+
+
+def trace_methods(obj: Any, kind: str) -> Any:
+    """Оборачивает публичные корутинные методы объекта в traced"""
+    for attr in dir(obj):
+        if attr.startswith("_"):
+            continue
+        method = getattr(obj, attr)
+        if inspect.iscoroutinefunction(method):
+            setattr(obj, attr, traced(kind, f"{type(obj).__name__}.{attr}")(method))
+    return obj
+
+
+class _TraceScope:
+    __slots__ = ("tracer", "trace", "_trace_token", "_span_token")
+
+    def __init__(self, tracer: "Tracer", trace: Trace):
+        self.tracer = tracer
+        self.trace = trace
+
+    def __enter__(self) -> Trace:
+        self._trace_token = _current_trace.set(self.trace)
+        self._span_token = _current_span.set(self.trace.root)
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        self.trace.root.end(exc)
+        _current_span.reset(self._span_token)
+        _current_trace.reset(self._trace_token)
+        self.tracer.finish(self.trace)
+        return False
+
+
+class Tracer:
+    """
+    Создает трассы и отдает экспортерам те, что длиннее threshold секунд.
+    Экспортеры буферизуют трассы, запись идет в фоне раз в flush_interval.
+    """
+    def __init__(
+            self,
+            exporters: list[TraceExporter],
+            threshold: float = 0.5,
+            max_spans: int = 500,
+            flush_interval: float = 2.0
+    ):
+        self.exporters = exporters
+        self.threshold = threshold
+        self.max_spans = max_spans
+        self.flush_interval = flush_interval
+        self.traces = 0
+        self.exported = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def trace(self, name: str, **attributes: Any) -> _TraceScope:
+        return _TraceScope(self, Trace(name, attributes, self.max_spans))
+
+    def finish(self, trace: Trace):
+        self.traces += 1
+        if trace.root.duration < self.threshold:
+            return
+        self.exported += 1
+        for exporter in self.exporters:
+            exporter.export(trace)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop(), name="trace-flush")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for exporter in self.exporters:
+            await exporter.close()
+
+    async def flush(self):
+        for exporter in self.exporters:
+            try:
+                await exporter.flush()
+            except Exception as e:
+                logger.error("Failed to export traces via %s: %s", type(exporter).__name__, e)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
@@ -0,0 +1,77 @@
+"""
+Обслуживание материализованной статистики привычек (user_habit_stats).
+
+    python habit_stats.py rebuild [--chunk-size 1000]
+    python habit_stats.py check [--chunk-size 1000]
+
+rebuild пересчитывает статистику по relapse_history (нужен после первого
+развертывания таблицы и после смены цен в каталоге), каждая пачка - в своей
+транзакции. check сравнивает сохраненные значения с пересчитанными и
+завершается с кодом 1, если нашлись расхождения.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time as t
+
+from config_reader import load_config
+from core.database.session_manager import create_database_manager
+from core.gateways.usergateways import UserGateway
+
+logger = logging.getLogger(__name__)
+
+
+async def rebuild(db_manager, chunk_size: int) -> int:
+    last_id, chunks = 0, 0
+    while True:
+        async with db_manager.session() as session:
+            last_id = await UserGateway(session).rebuild_habit_stats(last_id, chunk_size)
+        if not last_id:
+            return chunks
+        chunks += 1
+
+
+async def check(db_manager, chunk_size: int) -> tuple[int, list[int]]:
+    last_id, checked, mismatched = 0, 0, []
+    while True:
+        async with db_manager.read_session() as session:
+            result = await UserGateway(session).check_habit_stats(last_id, chunk_size)
+        if not result.last_id:
+            return checked, mismatched
+        last_id = result.last_id
+        checked += result.checked
+        mismatched += result.mismatched
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Maintain user_habit_stats")
+    parser.add_argument("command", choices=("rebuild", "check"))
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--env", default=".env")
+    args = parser.parse_args()
+
+    config = load_config(args.env)
+    db_manager = await create_database_manager(config)
+    await db_manager.migrate()
+
+    started = t.perf_counter()
+    try:
+        if args.command == "rebuild":
+            chunks = await rebuild(db_manager, args.chunk_size)
+            logger.info("Rebuilt habit stats in %d chunks in %.2fs", chunks, t.perf_counter() - started)
+            return 0
+
+        checked, mismatched = await check(db_manager, args.chunk_size)
+        logger.info("Checked %d tracked habits in %.2fs", checked, t.perf_counter() - started)
+        if mismatched:
+            logger.error("Stale habit stats for %d tracked habits: %s", len(mismatched), mismatched[:50])
+            return 1
+        return 0
+    finally:
+        await db_manager.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main()))
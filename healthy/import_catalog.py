@@ -0,0 +1,138 @@
+"""
+Импорт каталога привычек из JSON, JSON Lines или CSV.
+
+    python import_catalog.py catalog.json [--replace] [--chunk-size 500]
+
+JSON: список привычек, JSON Lines: по привычке на строку
+    {"name": "Курение", "cost_per_unit": 250,
+     "info": [{"name": "...", "description": "..."}],
+     "hints": [{"name": "...", "description": "..."}]}
+
+CSV: колонки type,habit,name,description,cost_per_unit, где type - habit, info или hint
+    habit,Курение,,,250
+    hint,Курение,Дыхание,Сделайте 10 глубоких вдохов,
+
+Привычки обновляются по имени, информация и подсказки добавляются
+(с --replace старые удаляются). Импорт повышает версию каталога в БД,
+запущенные боты сбрасывают кэш каталога при следующем чтении (не реже
+раза в CATALOG_VERSION_CHECK_INTERVAL).
+"""
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import logging
+import time as t
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from config_reader import load_config
+from core.dao.user_dao import HabitContentRecord, HabitRecord
+from core.database.session_manager import create_database_manager
+from core.gateways.usergateways import UserGateway
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CatalogEntry:
+    name: str
+    cost_per_unit: Optional[float] = None
+    info: list[dict] = field(default_factory=list)
+    hints: list[dict] = field(default_factory=list)
+
+
+def _entry(item: dict) -> CatalogEntry:
+    cost = item.get("cost_per_unit")
+    return CatalogEntry(
+        name=item["name"],
+        cost_per_unit=float(cost) if cost not in (None, "") else None,
+        info=item.get("info", []),
+        hints=item.get("hints", [])
+    )
+
+
+def read_json(path: str) -> Iterator[CatalogEntry]:
+    with open(path, encoding="utf-8") as file:
+        for item in json.load(file):
+            yield _entry(item)
+
+
+def read_jsonl(path: str) -> Iterator[CatalogEntry]:
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield _entry(json.loads(line))
+
+
+def read_csv(path: str) -> Iterator[CatalogEntry]:
+    entries: dict[str, CatalogEntry] = {}
+    with open(path, encoding="utf-8", newline="") as file:
+        for row in csv.DictReader(file):
+            entry = entries.setdefault(row["habit"], CatalogEntry(name=row["habit"]))
+            kind = row["type"].strip().lower()
+            if kind == "habit":
+                cost = row.get("cost_per_unit")
+                entry.cost_per_unit = float(cost) if cost else None
+            elif kind in ("info", "hint"):
+                content = {"name": row["name"], "description": row["description"]}
+                (entry.info if kind == "info" else entry.hints).append(content)
+            else:
+                raise ValueError(f"Unknown row type {row['type']!r}")
+    yield from entries.values()
+
+
+READERS = {"json": read_json, "jsonl": read_jsonl, "csv": read_csv}
+
+
+def _content(entries: list[CatalogEntry], habit_ids: dict[str, int], attr: str) -> Iterator[HabitContentRecord]:
+    for entry in entries:
+        for item in getattr(entry, attr):
+            yield HabitContentRecord(habit_id=habit_ids[entry.name], name=item["name"], description=item["description"])
+
+
+async def import_catalog(db_manager, entries: Iterator[CatalogEntry], chunk_size: int, replace: bool) -> dict[str, int]:
+    totals = {"habits": 0, "info": 0, "hints": 0}
+    async with db_manager.session() as session:
+        gateway = UserGateway(session)
+        while chunk := list(itertools.islice(entries, chunk_size)):
+            habit_ids = await gateway.add_admin_habits_bulk(
+                (HabitRecord(entry.name, entry.cost_per_unit) for entry in chunk), chunk_size
+            )
+            if replace:
+                await gateway.delete_habit_content(list(habit_ids.values()))
+            totals["habits"] += len(habit_ids)
+            totals["info"] += await gateway.add_admin_info_bulk(_content(chunk, habit_ids, "info"), chunk_size)
+            totals["hints"] += await gateway.add_admin_hints_bulk(_content(chunk, habit_ids, "hints"), chunk_size)
+    return totals
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Import habit catalog")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=READERS, help="by default taken from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--replace", action="store_true", help="replace info and hints of imported habits")
+    parser.add_argument("--env", default=".env")
+    args = parser.parse_args()
+
+    file_format = args.format or args.path.rsplit(".", 1)[-1].lower()
+    if file_format not in READERS:
+        parser.error(f"Unknown catalog format {file_format!r}")
+
+    config = load_config(args.env)
+    db_manager = await create_database_manager(config)
+    try:
+        await db_manager.migrate()
+
+        started = t.perf_counter()
+        totals = await import_catalog(db_manager, READERS[file_format](args.path), args.chunk_size, args.replace)
+        logger.info("Imported %s in %.2fs", totals, t.perf_counter() - started)
+    finally:
+        await db_manager.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
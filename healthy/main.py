@@ -1,21 +1,7 @@
-import asyncio
 import logging
-from contextlib import asynccontextmanager
-from typing import Any, Awaitable, Callable, Dict, AsyncGenerator
-import winloop
-
-import sqlalchemy as db
-from aiogram import Bot, Dispatcher, types, BaseMiddleware, Router
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
-from aiogram.types import Message, TelegramObject
-from sqlalchemy.ext.asyncio import (
-    AsyncSession,
-    async_sessionmaker,
-    create_async_engine,
-)
-from services.telegram.handlers import *
-from services.telegram.telegram import *
+
+from core.runtime.event_loop import run
+from services.telegram.telegram import TelegramApp
 from config_reader import load_config
 
 
@@ -26,13 +12,19 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def main():
-    config = load_config(".env")
+async def main(config):
+    if config.sharding.workers > 1:
+        # Супервизор шардов (multiprocessing, вебхук) не нужен в обычном режиме
+        from services.telegram.sharding import ShardSupervisor
+
+        await ShardSupervisor(config).run()
+        return
+
     tg_app = TelegramApp(config)
     await tg_app.setup()  # Теперь setup асинхронный
     await tg_app.run()
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
-    winloop.install()
-    asyncio.run(main())
+    config = load_config(".env")
+    run(main(config), config.runtime.event_loop)
@@ -0,0 +1,47 @@
+"""
+Миграции схемы БД (core/database/migrations).
+
+    python migrate.py              применить недостающие миграции
+    python migrate.py --check      код 1, если есть непримененные миграции
+    python migrate.py --target 2   применить миграции только до версии 2
+
+Бот применяет миграции сам при старте, скрипт нужен, чтобы выкатить
+схему до перезапуска инстансов или проверить ее в CI.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+from config_reader import load_config
+from core.database.migrations.runner import LATEST_VERSION, current_version, migrate
+from core.database.session_manager import create_database_manager
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Apply database schema migrations")
+    parser.add_argument("--check", action="store_true", help="only report pending migrations")
+    parser.add_argument("--target", type=int, default=None)
+    parser.add_argument("--env", default=".env")
+    args = parser.parse_args()
+
+    config = load_config(args.env)
+    db_manager = await create_database_manager(config)
+    try:
+        version = await current_version(db_manager.engine)
+        if args.check:
+            logger.info("Schema version %d, latest %d", version, LATEST_VERSION)
+            return 0 if version >= LATEST_VERSION else 1
+
+        applied = await migrate(db_manager.engine, args.target)
+        logger.info("Schema version %d, applied %s", max([version, *applied]), applied or "nothing")
+        return 0
+    finally:
+        await db_manager.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,140 @@
+"""
+Рендер графика прогресса. Модуль выполняется в процессах пула, поэтому
+здесь только чистые функции и picklable-данные. matplotlib необязателен:
+без него рисуется упрощенный график встроенным PNG-энкодером.
+"""
+import glob
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+WIDTH, HEIGHT = 640, 320
+
+_BACKGROUND = (255, 255, 255)
+_GRID = (230, 230, 230)
+_STREAK = (76, 175, 80)
+_RELAPSE = (229, 57, 53)
+
+
+@dataclass(frozen=True, slots=True)
+class ChartSeries:
+    """Данные для графика: окно дней и рецидивы по дням внутри него"""
+    start: date
+    end: date
+    streak_start: date
+    relapses: tuple[tuple[date, int], ...]
+
+    def days(self) -> list[date]:
+        return [self.start + timedelta(days=offset) for offset in range((self.end - self.start).days + 1)]
+
+    def streaks(self) -> list[int]:
+        """Длина серии на конец каждого дня окна"""
+        relapse_days = {day for day, _ in self.relapses}
+        reference, streaks = self.streak_start, []
+        for day in self.days():
+            if day in relapse_days:
+                reference = day
+            streaks.append(max((day - reference).days, 0))
+        return streaks
+
+
+def _png(width: int, height: int, pixels: bytearray) -> bytes:
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    stride = width * 3
+    raw = b"".join(b"\x00" + bytes(pixels[row * stride:(row + 1) * stride]) for row in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw, 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _render_builtin(series: ChartSeries) -> bytes:
+    """Столбики серии (зеленые) и рецидивы (красные) без подписей осей"""
+    pixels = bytearray(bytes(_BACKGROUND) * (WIDTH * HEIGHT))
+
+    def fill(x0: int, y0: int, x1: int, y1: int, color: tuple[int, int, int]):
+        row = bytes(color) * max(x1 - x0, 0)
+        for y in range(max(y0, 0), min(y1, HEIGHT)):
+            offset = (y * WIDTH + x0) * 3
+            pixels[offset:offset + len(row)] = row
+
+    pad = 16
+    days, streaks = series.days(), series.streaks()
+    relapses = dict(series.relapses)
+    top, bottom = pad, HEIGHT - pad
+    column = (WIDTH - 2 * pad) / len(days)
+    max_streak = max(max(streaks), 1)
+    max_relapses = max(relapses.values(), default=1)
+
+    for index, day in enumerate(days):
+        x0 = pad + int(index * column)
+        x1 = max(pad + int((index + 1) * column) - 1, x0 + 1)
+        if day.weekday() == 0:
+            fill(x0, top, x0 + 1, bottom, _GRID)
+        height = int((bottom - top) * streaks[index] / max_streak)
+        fill(x0, bottom - height, x1, bottom, _STREAK)
+        if day in relapses:
+            height = max(int((bottom - top) * 0.3 * relapses[day] / max_relapses), 4)
+            fill(x0, bottom - height, x1, bottom, _RELAPSE)
+    fill(pad, bottom, WIDTH - pad, bottom + 1, (0, 0, 0))
+    return _png(WIDTH, HEIGHT, pixels)
+
+
+def _render_matplotlib(series: ChartSeries) -> bytes:
+    import io
+
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib import pyplot
+
+    days = series.days()
+    figure, streak_axis = pyplot.subplots(figsize=(WIDTH / 100, HEIGHT / 100), dpi=100)
+    try:
+        streak_axis.fill_between(days, series.streaks(), step="post", color="#4caf50", alpha=0.6)
+        streak_axis.set_ylabel("Серия, дней")
+        streak_axis.set_ylim(bottom=0)
+        if series.relapses:
+            relapse_axis = streak_axis.twinx()
+            relapse_axis.bar(
+                [day for day, _ in series.relapses], [count for _, count in series.relapses],
+                color="#e53935", width=0.8
+            )
+            relapse_axis.set_ylabel("Рецидивы")
+            relapse_axis.set_ylim(bottom=0)
+        figure.autofmt_xdate()
+        figure.tight_layout()
+        buffer = io.BytesIO()
+        figure.savefig(buffer, format="png")
+        return buffer.getvalue()
+    finally:
+        pyplot.close(figure)
+
+
+def render_chart(path: str, series: ChartSeries, stale_pattern: str) -> str:
+    """
+    Рисует график в path (атомарно) и удаляет прежние графики той же
+    привычки по stale_pattern. Вызывается в процессе пула.
+    """
+    try:
+        image = _render_matplotlib(series)
+    except ImportError:
+        image = _render_builtin(series)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(image)
+    os.replace(tmp_path, path)
+
+    for stale_path in glob.glob(stale_pattern):
+        if stale_path != path:
+            try:
+                os.remove(stale_path)
+            except OSError:
+                pass
+    return path
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from aiogram.enums import ContentType
+from aiogram_dialog.api.entities import MediaAttachment
+from aiogram_dialog.api.protocols import MediaIdStorageProtocol
+
+from core.dao.user_dao import BaseUserGateway
+from core.database.dto import UserHabitStatsDomain
+
+from .render import ChartSeries, render_chart
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ChartStats:
+    """Счетчики графиков прогресса"""
+    file_id_hits: int = 0
+    file_hits: int = 0
+    renders: int = 0
+    errors: int = 0
+    render_time: float = 0.0
+
+
+class ChartService:
+    """
+    Графики прогресса привычек. Файл графика называется по ключу
+    (user_habit_id, id последнего рецидива, день UTC): пока статистика не
+    изменилась, график не перерисовывается, а MediaIdStorage диалогов
+    отдает file_id уже загруженного в Telegram фото. Рендер идет в пуле
+    процессов, одновременные запросы одного графика ждут один рендер.
+    """
+    def __init__(
+            self,
+            media_storage: MediaIdStorageProtocol,
+            cache_dir: str = "charts",
+            workers: int = 1,
+            days: int = 90
+    ):
+        self.media_storage = media_storage
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.days = days
+        self.stats = ChartStats()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: dict[str, asyncio.Future] = {}
+
+    def chart_path(self, habit: UserHabitStatsDomain, today: date) -> str:
+        return os.path.join(
+            self.cache_dir, f"chart-{habit.id}-{habit.last_relapse_id or 0}-{today:%Y%m%d}.png"
+        )
+
+    async def get_chart(self, habit: UserHabitStatsDomain, gateway: BaseUserGateway) -> Optional[MediaAttachment]:
+        """График привычки или None, если нарисовать не удалось"""
+        today = datetime.utcnow().date()
+        path = self.chart_path(habit, today)
+
+        file_id = await self.media_storage.get_media_id(path, None, ContentType.PHOTO)
+        if file_id is not None:
+            self.stats.file_id_hits += 1
+            return MediaAttachment(ContentType.PHOTO, path=path, file_id=file_id)
+
+        try:
+            await self._ensure_rendered(path, habit, today, gateway)
+        except Exception as e:
+            self.stats.errors += 1
+            logger.error("Failed to render chart for user habit %s: %s", habit.id, e)
+            return None
+        return MediaAttachment(ContentType.PHOTO, path=path)
+
+    async def _load_series(self, habit: UserHabitStatsDomain, today: date, gateway: BaseUserGateway) -> ChartSeries:
+        """Рецидивы по дням за окно и последний рецидив до него - два запроса по индексу"""
+        start = max(habit.start_date.date(), today - timedelta(days=self.days - 1))
+        since = datetime.combine(start, time())
+        buckets = await gateway.get_relapse_buckets(habit.id, "day", since=since)
+        previous = await gateway.get_relapse_history(habit.id, 1, before=(since, 0))
+        return ChartSeries(
+            start=start,
+            end=today,
+            streak_start=previous[0].relapse_time.date() if previous else habit.start_date.date(),
+            relapses=tuple((bucket.bucket_start, bucket.relapse_count) for bucket in buckets)
+        )
+
+    async def _ensure_rendered(self, path: str, habit: UserHabitStatsDomain, today: date, gateway: BaseUserGateway):
+        pending = self._pending.get(path)
+        if pending is not None:
+            await asyncio.shield(pending)
+            return
+
+        # Future регистрируется до первого await, чтобы конкурентные запросы ждали его
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[path] = future
+        try:
+            if await asyncio.to_thread(os.path.exists, path):
+                self.stats.file_hits += 1
+            else:
+                started = loop.time()
+                series = await self._load_series(habit, today, gateway)
+                await loop.run_in_executor(
+                    self._get_pool(), render_chart, path, series,
+                    os.path.join(self.cache_dir, f"chart-{habit.id}-*.png")
+                )
+                self.stats.renders += 1
+                self.stats.render_time += loop.time() - started
+            future.set_result(path)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Ожидающих может не быть: помечаем исключение полученным, чтобы asyncio не ругался
+            future.exception()
+            raise
+        finally:
+            del self._pending[path]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def stop(self):
+        if self._pool is not None:
+            await asyncio.to_thread(self._pool.shutdown, cancel_futures=True)
+            self._pool = None
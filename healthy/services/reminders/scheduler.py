@@ -0,0 +1,218 @@
+import asyncio
+import heapq
+import logging
+import math
+import time as t
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from typing import Awaitable, Callable, Iterable, Optional
+
+import pytz
+
+from core.database.dto import ReminderScheduleDomain
+from core.database.session_manager import DatabaseManagerBase
+from core.gateways.usergateways import UserGateway
+
+logger = logging.getLogger(__name__)
+
+FireCallback = Callable[[list[ReminderScheduleDomain]], Awaitable[None]]
+
+
+def next_fire_at(scheduled_time: time, tz: pytz.BaseTzInfo, now: float) -> float:
+    """
+    Ближайший момент (unix timestamp) строго позже now, когда в часовом поясе
+    tz наступает локальное время scheduled_time.
+    """
+    local_now = datetime.fromtimestamp(now, dt_timezone.utc).astimezone(tz)
+    for offset in range(3):
+        day = local_now.date() + timedelta(days=offset)
+        local = tz.normalize(tz.localize(datetime.combine(day, scheduled_time)))
+        if local.timestamp() > now:
+            return local.timestamp()
+    raise ValueError(f"Cannot schedule {scheduled_time} in {tz}")
+
+
+class ReminderScheduler:
+    """
+    Планировщик напоминаний на min-heap.
+
+    В памяти хранится только (момент срабатывания, id напоминания), данные для
+    отправки догружаются одним запросом на пачку в момент срабатывания.
+    Устаревшие записи кучи удаляются лениво: актуальное время каждого
+    напоминания лежит в _due_at. После записи напоминаний вызывается
+    reload(ids) - перечитываются только эти строки, без скана таблицы.
+    """
+    def __init__(
+            self,
+            db_manager: DatabaseManagerBase,
+            on_fire: FireCallback,
+            load_chunk_size: int = 5000,
+            batch_window: float = 1.0,
+            max_sleep: float = 300.0
+    ):
+        self.db_manager = db_manager
+        self.on_fire = on_fire
+        self.load_chunk_size = load_chunk_size
+        self.batch_window = batch_window
+        self.max_sleep = max_sleep
+
+        self._heap: list[tuple[float, int]] = []
+        self._due_at: dict[int, float] = {}
+        self._timezones: dict[str, pytz.BaseTzInfo] = {}
+        # Напоминания, отправляемые сейчас, и снятые с расписания во время отправки
+        self._in_flight: set[int] = set()
+        self._dropped: set[int] = set()
+        self._sleep_until = math.inf
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._due_at)
+
+    async def start(self):
+        await self._load_all()
+        self._task = asyncio.create_task(self._run(), name="reminder-scheduler")
+        logger.info("Reminder scheduler started with %d active reminders", len(self))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def reload(self, reminder_ids: Iterable[int]):
+        """
+        Перечитывает указанные напоминания после добавления или изменения;
+        удаленные и выключенные снимаются с расписания.
+        """
+        reminder_ids = list(set(reminder_ids))
+        async with self.db_manager.session() as session:
+            reminders = await UserGateway(session).get_reminders_by_ids(reminder_ids)
+
+        found = {reminder.id for reminder in reminders}
+        self.unschedule(reminder_id for reminder_id in reminder_ids if reminder_id not in found)
+        now = t.time()
+        for reminder in reminders:
+            self._schedule_next(reminder, now)
+
+    def unschedule(self, reminder_ids: Iterable[int]):
+        """Снимает напоминания с расписания; записи кучи отбрасываются лениво"""
+        for reminder_id in reminder_ids:
+            self._due_at.pop(reminder_id, None)
+            if reminder_id in self._in_flight:
+                self._dropped.add(reminder_id)
+
+    def _timezone(self, name: str) -> pytz.BaseTzInfo:
+        tz = self._timezones.get(name)
+        if tz is None:
+            try:
+                tz = pytz.timezone(name)
+            except pytz.UnknownTimeZoneError:
+                logger.warning("Unknown timezone %r, falling back to UTC", name)
+                tz = pytz.utc
+            self._timezones[name] = tz
+        return tz
+
+    def _schedule_next(self, reminder: ReminderScheduleDomain, now: float):
+        fire_at = next_fire_at(reminder.scheduled_time, self._timezone(reminder.timezone), now)
+        self._due_at[reminder.id] = fire_at
+        self._dropped.discard(reminder.id)
+
+        heapq.heappush(self._heap, (fire_at, reminder.id))
+        # Вершина кучи может быть устаревшей записью, поэтому сравниваем с моментом пробуждения
+        if fire_at < self._sleep_until:
+            self._wakeup.set()
+
+        if len(self._heap) > 2 * len(self._due_at) + 1024:
+            self._compact()
+
+    def _compact(self):
+        self._heap = [(fire_at, reminder_id) for reminder_id, fire_at in self._due_at.items()]
+        heapq.heapify(self._heap)
+
+    async def _load_all(self):
+        after_id = 0
+        now = t.time()
+        while True:
+            async with self.db_manager.session() as session:
+                chunk = await UserGateway(session).get_active_reminders(after_id, self.load_chunk_size)
+            for reminder in chunk:
+                self._schedule_next(reminder, now)
+            if len(chunk) < self.load_chunk_size:
+                break
+            after_id = chunk[-1].id
+
+    def _pop_due(self, until: float) -> list[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= until:
+            fire_at, reminder_id = heapq.heappop(self._heap)
+            if self._due_at.get(reminder_id) == fire_at:
+                del self._due_at[reminder_id]
+                due.append(reminder_id)
+        return due
+
+    def _next_delay(self) -> float:
+        while self._heap:
+            fire_at, reminder_id = self._heap[0]
+            if self._due_at.get(reminder_id) == fire_at:
+                return min(fire_at - t.time(), self.max_sleep)
+            heapq.heappop(self._heap)
+        return self.max_sleep
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            delay = self._next_delay()
+            if delay > 0:
+                self._sleep_until = t.time() + delay
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    self._sleep_until = math.inf
+                continue
+
+            due_ids = self._pop_due(t.time() + self.batch_window)
+            if due_ids:
+                await self._fire_due(due_ids)
+
+    async def _fire_due(self, reminder_ids: list[int]):
+        self._in_flight.update(reminder_ids)
+        try:
+            await self._fire(reminder_ids)
+        except Exception as e:
+            logger.error("Failed to fire %d reminders: %s", len(reminder_ids), e, exc_info=True)
+            self._retry_later(reminder_ids)
+        finally:
+            self._in_flight.difference_update(reminder_ids)
+            self._dropped.difference_update(reminder_ids)
+
+    def _rescheduled(self, reminder_id: int) -> bool:
+        """Уже перепланировано reload или снято unschedule во время отправки"""
+        return reminder_id in self._due_at or reminder_id in self._dropped
+
+    def _retry_later(self, reminder_ids: list[int], delay: float = 30.0):
+        """Повторяет неотправленные; отправленные уже перепланированы и пропускаются"""
+        fire_at = t.time() + delay
+        for reminder_id in reminder_ids:
+            if not self._rescheduled(reminder_id):
+                self._due_at[reminder_id] = fire_at
+                heapq.heappush(self._heap, (fire_at, reminder_id))
+
+    async def _fire(self, reminder_ids: list[int]):
+        for start in range(0, len(reminder_ids), self.load_chunk_size):
+            chunk = reminder_ids[start:start + self.load_chunk_size]
+            async with self.db_manager.session() as session:
+                reminders = await UserGateway(session).get_reminders_by_ids(chunk)
+
+            # Окно пачки уже пройдено: следующее срабатывание ищем после него
+            now = t.time() + self.batch_window
+            if reminders:
+                await self.on_fire(reminders)
+            # Следующее срабатывание - только после успешной отправки, иначе пачку повторит _retry_later
+            for reminder in reminders:
+                if not self._rescheduled(reminder.id):
+                    self._schedule_next(reminder, now)
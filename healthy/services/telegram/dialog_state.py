@@ -0,0 +1,51 @@
+"""
+Компактное состояние диалогов: в dialog_data лежат только id и версия формата,
+объекты восстанавливаются при рендере через загрузчики апдейта (привычки
+каталога - из кэша процесса). Такое состояние сериализуется в JSON и не
+тащит за собой info/hints привычек.
+"""
+from typing import Any, Iterable, MutableMapping, Optional
+
+from core.database.dto import HabitDomain
+from core.gateways.loaders import UpdateLoaders
+
+# Поднимается при смене формата: ссылки из состояния старой версии игнорируются
+STATE_VERSION = 1
+VERSION_KEY = "_v"
+
+DialogData = MutableMapping[str, Any]
+
+
+def store_id(dialog_data: DialogData, key: str, value: int | str):
+    dialog_data[key] = int(value)
+    dialog_data[VERSION_KEY] = STATE_VERSION
+
+
+def store_ids(dialog_data: DialogData, key: str, values: Iterable[int | str]):
+    dialog_data[key] = [int(value) for value in values]
+    dialog_data[VERSION_KEY] = STATE_VERSION
+
+
+def stored_id(dialog_data: DialogData, key: str) -> Optional[int]:
+    if dialog_data.get(VERSION_KEY) != STATE_VERSION:
+        return None
+    value = dialog_data.get(key)
+    return value if isinstance(value, int) else None
+
+
+def stored_ids(dialog_data: DialogData, key: str) -> list[int]:
+    if dialog_data.get(VERSION_KEY) != STATE_VERSION:
+        return []
+    values = dialog_data.get(key)
+    return values if isinstance(values, list) else []
+
+
+async def load_habit(loaders: UpdateLoaders, dialog_data: DialogData, key: str) -> Optional[HabitDomain]:
+    habit_id = stored_id(dialog_data, key)
+    return await loaders.habits.load(habit_id) if habit_id is not None else None
+
+
+async def load_habits(loaders: UpdateLoaders, dialog_data: DialogData, key: str) -> list[HabitDomain]:
+    """Привычки по сохраненным id в исходном порядке, удаленные пропускаются"""
+    habits = await loaders.habits.load_many(stored_ids(dialog_data, key))
+    return [habit for habit in habits if habit is not None]
@@ -1,9 +1,13 @@
 from aiogram_dialog import DialogManager
 
+from .dialog_state import load_habit, load_habits, stored_id
+
 class DialogGetters:
     @staticmethod
     async def admin_habits_getter(dialog_manager: DialogManager, **kwargs):
-        habits = dialog_manager.dialog_data.get("admin_habits", [])
+        habits = await load_habits(
+            dialog_manager.middleware_data["loaders"], dialog_manager.dialog_data, "admin_habit_ids"
+        )
         return {
             "habits": habits,
             "habits_count": len(habits)
@@ -11,7 +15,9 @@ class DialogGetters:
 
     @staticmethod
     async def current_habit_getter(dialog_manager: DialogManager, **kwargs):
-        habit = dialog_manager.dialog_data.get("current_habit")
+        habit = await load_habit(
+            dialog_manager.middleware_data["loaders"], dialog_manager.dialog_data, "current_habit_id"
+        )
         return {
             "habit_name": habit.name if habit else "Не выбрано",
             "habit_cost": habit.cost_per_unit if habit else 0,
@@ -28,9 +34,10 @@ class DialogGetters:
 
     @staticmethod
     async def user_habits_getter(dialog_manager: DialogManager, **kwargs):
-        user_gateway = dialog_manager.middleware_data["user_gateway"]
-        user = await user_gateway.get_user_by_tg_id(dialog_manager.event.from_user.id)
-        habits = await user_gateway.get_user_habit_by_id(user.id)
+        # Серии и экономия считаются в БД одним агрегатным запросом,
+        # привычки пользователя берутся из кэша профилей, если он там есть
+        user_gateway = dialog_manager.middleware_data["read_gateway"]
+        habits = await user_gateway.get_user_habit_stats(dialog_manager.event.from_user.id)
 
         return {
             "habits": habits,
@@ -40,26 +47,47 @@ class DialogGetters:
 
     @staticmethod
     async def habit_detail_getter(dialog_manager: DialogManager, **kwargs):
-        habit_id = dialog_manager.dialog_data.get("habit_id")
-        session = dialog_manager.middleware_data["session"]
-        user_gateway = UserGateway(session)
+        habit_id = stored_id(dialog_manager.dialog_data, "habit_id")
+        stats = None
+        if habit_id is not None:
+            stats = await dialog_manager.middleware_data["loaders"].habit_stats.load(habit_id)
+        if stats is None:
+            # Устаревшее состояние диалога или привычка удалена между апдейтами
+            return {
+                "stats": None,
+                "habit_name": "Не выбрано",
+                "streak_days": 0,
+                "longest_streak": 0,
+                "relapse_count": 0,
+                "saved_money": 0,
+                "last_relapse": "—",
+                "cost_per_day": 0
+            }
 
-        # Заглушка для демонстрации
         return {
-            "habit_name": "Курение",
-            "streak_days": 15,
-            "saved_money": 3750,
-            "last_relapse": (datetime.now() - timedelta(days=5)).strftime("%d.%m.%Y"),
-            "cost_per_day": 250
+            "stats": stats,
+            "habit_name": stats.habit_name,
+            "streak_days": stats.current_streak,
+            "longest_streak": stats.longest_streak,
+            "relapse_count": stats.relapse_count,
+            "saved_money": stats.saved_money,
+            "last_relapse": stats.last_relapse.strftime("%d.%m.%Y") if stats.last_relapse else "—",
+            "cost_per_day": stats.cost_per_unit or 0
         }
 
+    @staticmethod
+    async def habit_stats_getter(dialog_manager: DialogManager, **kwargs):
+        data = await DialogGetters.habit_detail_getter(dialog_manager)
+        chart_service = dialog_manager.middleware_data.get("chart_service")
+        if chart_service is not None and data["stats"] is not None:
+            user_gateway = dialog_manager.middleware_data["read_gateway"]
+            data["chart"] = await chart_service.get_chart(data["stats"], user_gateway)
+        return data
+
     @staticmethod
     async def all_habits_getter(dialog_manager: DialogManager, **kwargs):
-        # В реальном приложении - запрос к БД
+        # Каталог отдается из кэша процесса, в БД идем только после инвалидации
+        user_gateway = dialog_manager.middleware_data["read_gateway"]
         return {
-            "habits": [
-                {"id": 1, "name": "Курение", "cost": 250},
-                {"id": 2, "name": "Фастфуд", "cost": 350},
-                {"id": 3, "name": "Алкоголь", "cost": 500},
-            ]
+            "habits": await user_gateway.get_all_habits()
         }
@@ -8,7 +8,9 @@ from aiogram.fsm.state import State
 from typing import Any
 
 from .states import DialogSG
+from .dialog_state import store_id, store_ids, stored_id
 from core.gateways.usergateways import UserGateway
+from core.dao.user_dao import NotFoundError
 
 class DialogHandlers:
 
@@ -29,22 +31,19 @@ class DialogHandlers:
     async def on_show_all_habits(self, callback: CallbackQuery, button: Button, dialog_manager: DialogManager):
         user_gateway = dialog_manager.middleware_data["user_gateway"]
         habits = await user_gateway.get_all_habits()
-        dialog_manager.dialog_data["admin_habits"] = habits
-        await dialog_manager.switch_to(DialogSG.ADMIN_EDIT_HABIT)
+        store_ids(dialog_manager.dialog_data, "admin_habit_ids", (habit.id for habit in habits))
+        await dialog_manager.switch_to(DialogSG.ADMIN_HABIT_MANAGE)
 
     async def on_habit_selected_admin(self, callback: CallbackQuery, widget: Any,
                                       dialog_manager: DialogManager, habit_id: str):
-        habit_id = int(habit_id)
-        dialog_manager.dialog_data["current_habit_id"] = habit_id
-
-        # Получаем привычку для отображения
+        # Проверяем, что привычка есть; в состоянии храним только id
         user_gateway = dialog_manager.middleware_data["user_gateway"]
         try:
-            habit = await user_gateway.get_habit_by_id(habit_id)
-            dialog_manager.dialog_data["current_habit"] = habit
+            await user_gateway.get_habit_by_id(int(habit_id))
         except NotFoundError:
             await callback.answer("Привычка не найдена!")
             return
+        store_id(dialog_manager.dialog_data, "current_habit_id", habit_id)
 
         await dialog_manager.switch_to(DialogSG.ADMIN_EDIT_HABIT)
 
@@ -67,11 +66,9 @@ class DialogHandlers:
 
         # Создаем привычку
         user_gateway = dialog_manager.middleware_data["user_gateway"]
-        new_habit = await user_gateway.create_habit(
+        new_habit = await user_gateway.add_admin_habit(
             name=dialog_manager.dialog_data["new_habit_name"],
-            cost_per_unit=cost_value,
-            info=[],
-            hints=[]
+            cost_per_unit=cost_value
         )
 
         await message.answer(f"✅ Привычка '{new_habit.name}' создана!")
@@ -83,11 +80,14 @@ class DialogHandlers:
     async def on_info_entered(self, message: Message, widget: TextInput,
                               dialog_manager: DialogManager, text: str):
         # Сохраняем информацию для текущей привычки
-        habit_id = dialog_manager.dialog_data["current_habit_id"]
+        habit_id = stored_id(dialog_manager.dialog_data, "current_habit_id")
+        if habit_id is None:
+            await dialog_manager.switch_to(DialogSG.ADMIN_HABIT_MANAGE)
+            return
         user_gateway = dialog_manager.middleware_data["user_gateway"]
 
         # В реальности нужно разделить название и описание
-        await user_gateway.add_info_to_habit(
+        await user_gateway.add_admin_info(
             habit_id=habit_id,
             name="Информация",
             description=text
@@ -128,9 +128,25 @@ class DialogHandlers:
 
     async def on_habit_selected(self, callback: CallbackQuery, button: Button,
                                 dialog_manager: DialogManager, habit_id: int):
-        dialog_manager.dialog_data["habit_id"] = habit_id
+        store_id(dialog_manager.dialog_data, "habit_id", habit_id)
         await dialog_manager.switch_to(DialogSG.HABIT_DETAIL)
 
+    async def on_catalog_habit_selected(self, callback: CallbackQuery, button: Button,
+                                        dialog_manager: DialogManager, habit_id: str):
+        user_gateway = dialog_manager.middleware_data["user_gateway"]
+        user = await user_gateway.get_user_by_tg_id(callback.from_user.id)
+        if user is None:
+            await callback.answer("Сначала зарегистрируйтесь: /start")
+            return
+
+        if any(h.habit_id == int(habit_id) for h in await user_gateway.get_user_habits(user.id)):
+            await callback.answer("Эта привычка уже отслеживается")
+            return
+
+        await user_gateway.add_user_habit(user_id=user.id, habit_id=int(habit_id))
+        await callback.answer("Привычка добавлена!")
+        await dialog_manager.switch_to(DialogSG.USER_HABITS)
+
     async def on_show_stats(self, callback: CallbackQuery, button: Button,
                             dialog_manager: DialogManager):
         await dialog_manager.switch_to(DialogSG.HABIT_STATS)
@@ -141,10 +157,17 @@ class DialogHandlers:
 
     async def on_confirm_relapse(self, callback: CallbackQuery, button: Button,
                                  dialog_manager: DialogManager):
-        habit_id = dialog_manager.dialog_data["habit_id"]
-        session = dialog_manager.middleware_data["session"]
-        user_gateway = UserGateway(session)
+        habit_id = stored_id(dialog_manager.dialog_data, "habit_id")
+        if habit_id is None:
+            await dialog_manager.switch_to(DialogSG.USER_HABITS)
+            return
+        user_gateway = dialog_manager.middleware_data["user_gateway"]
 
-        # Здесь будет логика трекинга рецидива
+        await user_gateway.record_relapse(user_habit_id=habit_id)
+        # Окно деталей перечитало бы статистику через read_gateway, а реплика
+        # может еще не видеть рецидив: читаем ее с основной БД и кладем в загрузчик
+        habit_stats = dialog_manager.middleware_data["loaders"].habit_stats
+        habit_stats.clear(habit_id)
+        habit_stats.prime(habit_id, await user_gateway.get_habit_stats(habit_id))
         await callback.answer("Рецидив зафиксирован!")
         await dialog_manager.switch_to(DialogSG.HABIT_DETAIL)
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+
+def update_chat_id(update: Update) -> int:
+    """Чат, к которому относится апдейт; для событий без чата - id пользователя"""
+    event = update.event
+    chat = getattr(event, "chat", None)
+    if chat is None:
+        chat = getattr(getattr(event, "message", None), "chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(event, "from_user", None)
+    return user.id if user else 0
+
+
+class ChatLanes:
+    """
+    Обработка апдейтов с сохранением порядка внутри чата: у каждого чата
+    своя очередь, которую разбирает одна задача, разные чаты идут параллельно.
+    max_active ограничивает число чатов, обрабатываемых одновременно.
+    """
+    def __init__(self, process: Callable[[Update], Awaitable], max_active: Optional[int] = None):
+        self.process = process
+        self.pending = 0
+        self._lanes: dict[int, deque[Update]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._semaphore = asyncio.Semaphore(max_active) if max_active else None
+        self._idle = asyncio.Event()
+        self._idle.set()
+        # Взводится при каждом обработанном апдейте
+        self._progress = asyncio.Event()
+
+    def submit(self, chat_id: int, update: Update):
+        self.pending += 1
+        self._idle.clear()
+        lane = self._lanes.get(chat_id)
+        if lane is not None:
+            lane.append(update)
+            return
+        lane = self._lanes[chat_id] = deque([update])
+        task = asyncio.create_task(self._drain(chat_id, lane))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def join(self):
+        await self._idle.wait()
+
+    async def wait_below(self, limit: int):
+        """Ждет, пока в очередях останется меньше limit апдейтов"""
+        while self.pending >= limit:
+            self._progress.clear()
+            await self._progress.wait()
+
+    async def cancel(self) -> int:
+        """Прерывает разбор очередей; возвращает число брошенных апдейтов"""
+        dropped = self.pending
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._lanes.clear()
+        self.pending = 0
+        self._idle.set()
+        self._progress.set()
+        return dropped
+
+    async def _drain(self, chat_id: int, lane: deque[Update]):
+        while lane:
+            update = lane[0]
+            try:
+                if self._semaphore is None:
+                    await self.process(update)
+                else:
+                    async with self._semaphore:
+                        await self.process(update)
+            except Exception as e:
+                logger.error("Failed to process update %s: %s", update.update_id, e, exc_info=True)
+            finally:
+                lane.popleft()
+                self.pending -= 1
+                self._progress.set()
+        del self._lanes[chat_id]
+        if not self.pending:
+            self._idle.set()
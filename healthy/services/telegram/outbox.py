@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import time as t
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from core.metrics.registry import GAUGE_FIELD
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket с резервированием: токены могут уходить в минус,
+    тогда вызывающий ждет ровно столько, сколько нужно на их восстановление.
+    """
+    __slots__ = ("rate", "capacity", "_tokens", "_updated_at")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = t.monotonic()
+
+    def reserve(self) -> float:
+        """Резервирует токен и возвращает время ожидания в секундах"""
+        now = t.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def pause(self, seconds: float):
+        """Обнуляет бакет так, чтобы следующий токен появился через seconds"""
+        self.reserve()
+        self._tokens = min(self._tokens, -seconds * self.rate)
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+@dataclass
+class OutboundMessage:
+    chat_id: int
+    text: str
+    kwargs: dict[str, Any] = field(default_factory=dict)
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=t.monotonic)
+
+
+@dataclass
+class OutboxStats:
+    """Счетчики очереди исходящих сообщений"""
+    enqueued: int = 0
+    sent: int = 0
+    retried: int = 0
+    dropped: int = 0
+    latency_total: float = 0.0
+    latency_max: float = field(default=0.0, metadata=GAUGE_FIELD)
+
+    @property
+    def latency_avg(self) -> float:
+        return self.latency_total / self.sent if self.sent else 0.0
+
+
+class MessageOutbox:
+    """
+    Очередь исходящих сообщений для рассылок и напоминаний.
+
+    Отправка идет через несколько воркеров с общим лимитом Telegram
+    (~30 сообщений в секунду) и лимитом на отдельный чат. RetryAfter
+    приостанавливает все воркеры, сетевые и 5xx ошибки повторяются
+    с экспоненциальной задержкой, остальные ошибки API не повторяются.
+    enqueue отбрасывает сообщение при переполнении, put ждет места -
+    для фоновых источников вроде напоминаний.
+    """
+    def __init__(
+            self,
+            bot: Bot,
+            workers: int = 4,
+            max_queue_size: int = 100_000,
+            global_rate: float = 30.0,
+            chat_rate: float = 1.0,
+            chat_burst: float = 3.0,
+            max_attempts: int = 5,
+            backoff_base: float = 0.5,
+            backoff_max: float = 30.0,
+            max_tracked_chats: int = 10_000
+    ):
+        self.bot = bot
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_tracked_chats = max_tracked_chats
+
+        self.stats = OutboxStats()
+        self._queue: asyncio.Queue[OutboundMessage] = asyncio.Queue(maxsize=max_queue_size)
+        self._global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_buckets: OrderedDict[int, TokenBucket] = OrderedDict()
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def enqueue(self, chat_id: int, text: str, **kwargs: Any) -> bool:
+        """
+        Ставит сообщение в очередь без ожидания.
+        :return False, если очередь переполнена и сообщение отброшено
+        """
+        try:
+            self._queue.put_nowait(OutboundMessage(chat_id, text, kwargs))
+        except asyncio.QueueFull:
+            self.stats.dropped += 1
+            logger.warning("Outbox is full, message to chat %s dropped", chat_id)
+            return False
+        self.stats.enqueued += 1
+        return True
+
+    def enqueue_many(self, messages: Iterable[tuple[int, str]], **kwargs: Any) -> int:
+        """:return количество принятых в очередь сообщений"""
+        return sum(self.enqueue(chat_id, text, **kwargs) for chat_id, text in messages)
+
+    async def put(self, chat_id: int, text: str, **kwargs: Any):
+        """Ставит сообщение в очередь, при переполнении ждет места (backpressure)"""
+        await self._queue.put(OutboundMessage(chat_id, text, kwargs))
+        self.stats.enqueued += 1
+
+    async def put_many(self, messages: Iterable[tuple[int, str]], **kwargs: Any):
+        for chat_id, text in messages:
+            await self.put(chat_id, text, **kwargs)
+
+    async def start(self):
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"outbox-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self, drain_timeout: Optional[float] = 5.0):
+        """drain_timeout: сколько ждать отправки очереди, None - ждать без ограничения"""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Outbox stopped with %d undelivered messages", self.queue_depth)
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+            if len(self._chat_buckets) > self.max_tracked_chats:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    async def _worker(self):
+        while True:
+            message = await self._queue.get()
+            try:
+                await self._deliver(message)
+            except Exception as e:
+                self.stats.dropped += 1
+                logger.error("Unexpected outbox error for chat %s: %s", message.chat_id, e, exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, message: OutboundMessage):
+        while True:
+            await self._chat_bucket(message.chat_id).acquire()
+            await self._global_bucket.acquire()
+            message.attempts += 1
+
+            try:
+                await self.bot.send_message(message.chat_id, message.text, **message.kwargs)
+
+            except TelegramRetryAfter as e:
+                logger.warning("Flood control: pausing outbox for %ss", e.retry_after)
+                self._global_bucket.pause(e.retry_after)
+
+            except (TelegramNetworkError, TelegramServerError) as e:
+                if message.attempts >= self.max_attempts:
+                    self.stats.dropped += 1
+                    logger.error("Message to chat %s dropped after %d attempts: %s",
+                                 message.chat_id, message.attempts, e)
+                    return
+                await asyncio.sleep(min(self.backoff_base * 2 ** (message.attempts - 1), self.backoff_max))
+
+            except TelegramAPIError as e:
+                # Остальные ответы API постоянные (бот заблокирован, чат не найден, неверный запрос)
+                self.stats.dropped += 1
+                logger.info("Message to chat %s rejected: %s", message.chat_id, e)
+                return
+
+            else:
+                latency = t.monotonic() - message.enqueued_at
+                self.stats.sent += 1
+                self.stats.latency_total += latency
+                self.stats.latency_max = max(self.stats.latency_max, latency)
+                return
+
+            if message.attempts >= self.max_attempts:
+                self.stats.dropped += 1
+                logger.error("Message to chat %s dropped after %d attempts", message.chat_id, message.attempts)
+                return
+            self.stats.retried += 1
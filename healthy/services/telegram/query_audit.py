@@ -0,0 +1,13 @@
+from aiogram import BaseMiddleware
+
+from core.database.query_audit import QueryAuditor
+
+
+class QueryAuditMiddleware(BaseMiddleware):
+    """Внешний middleware апдейта: все SQL апдейта проверяются бюджетом QueryAuditor"""
+    def __init__(self, auditor: QueryAuditor):
+        self.auditor = auditor
+
+    async def __call__(self, handler, event, data):
+        with self.auditor.update(f"update {event.event_type}"):
+            return await handler(event, data)
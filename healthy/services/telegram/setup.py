@@ -1,4 +1,3 @@
-from cgitb import handler
 from datetime import timezone
 
 from aiogram import Router
@@ -6,12 +5,12 @@ from aiogram_dialog import (
     Dialog, setup_dialogs, StartMode, Window, DialogManager
 )
 from aiogram_dialog.widgets.kbd import (
-    Button, Back, Cancel, Group, ListGroup, Select, SwitchTo, Row, ScrollingGroup
+    Button, Back, Cancel, Column, Group, Select, SwitchTo, Row, ScrollingGroup
 )
 from aiogram_dialog.widgets.text import Const, Format
+from aiogram_dialog.widgets.media import DynamicMedia
 from aiogram_dialog.widgets.input import TextInput
 from functools import partial
-import pytz
 
 from .states import DialogSG
 from .getters import DialogGetters
@@ -77,7 +76,7 @@ class DialogSetup:
             Window(
                 Format("📋 Все привычки ({habits_count}):"),
 
-                ListGroup(
+                Column(
                     Select(
                         text=Format("📌 {item.name}"),
                         id="habits_select_admin",
@@ -85,8 +84,6 @@ class DialogSetup:
                         items="habits",
                         on_click=self.handlers.on_habit_selected_admin,
                     ),
-                    item_id_getter=lambda item: str(item.id),
-                    items="habits",
                     id="admin_habits_group"
                 ),
 
@@ -239,18 +236,16 @@ class DialogSetup:
             Window(
                 Format("📋 Ваши привычки:"),
                 Format("\nВсего привычек: {habits_count}"),
-                Format("Суммарно сэкономлено: {total_saved} ₽"),
+                Format("Суммарно сэкономлено: {total_saved:.0f} ₽"),
 
-                ListGroup(
+                Column(
                     Select(
-                        text=Format("📌 {item.name}"),
+                        text=Format("📌 {item.habit_name}"),
                         id="habits_select",
                         item_id_getter=lambda item: item.id,
                         items="habits",
                         on_click=self.handlers.on_habit_selected,
                     ),
-                    item_id_getter=lambda item: item.id,
-                    items="habits",
                     id="habits_group",
                 ),
 
@@ -267,7 +262,7 @@ class DialogSetup:
             Window(
                 Format("📌 Привычка: {habit_name}"),
                 Format("\n🔥 Текущая серия: {streak_days} дней"),
-                Format("💸 Сэкономлено: {saved_money} ₽"),
+                Format("💸 Сэкономлено: {saved_money:.0f} ₽"),
                 Format("⏱ Последний рецидив: {last_relapse}"),
                 Format("\n💵 Траты в день: {cost_per_day} ₽"),
 
@@ -282,6 +277,7 @@ class DialogSetup:
                         id="habit_stats",
                         on_click=self.handlers.on_show_stats,
                     ),
+                    when="stats",
                 ),
                 SwitchTo(
                     Const("⬅️ Назад"),
@@ -298,11 +294,11 @@ class DialogSetup:
 
                 ScrollingGroup(
                     Select(
-                        text=Format("{item.name} - {item.cost} ₽/день"),
+                        text=Format("{item.name} - {item.cost_per_unit} ₽/день"),
                         id="all_habits_select",
-                        item_id_getter=lambda item: item["id"],
+                        item_id_getter=lambda item: item.id,
                         items="habits",
-                        on_click=self.handlers.on_habit_selected,
+                        on_click=self.handlers.on_catalog_habit_selected,
                     ),
                     id="all_habits_group",
                     width=1,
@@ -320,11 +316,11 @@ class DialogSetup:
 
             # Статистика привычки
             Window(
+                DynamicMedia("chart", when="chart"),
                 Format("📊 Статистика по привычке: {habit_name}"),
-                Const("\n📈 График прогресса..."),
-                Format("\n🔥 Самая длинная серия: 30 дней"),
-                Format("📉 Всего рецидивов: 5"),
-                Format("\n💵 Всего сэкономлено: {saved_money} ₽"),
+                Format("\n🔥 Самая длинная серия: {longest_streak} дней"),
+                Format("📉 Всего рецидивов: {relapse_count}"),
+                Format("\n💵 Всего сэкономлено: {saved_money:.0f} ₽"),
 
                 SwitchTo(
                     Const("⬅️ Назад"),
@@ -332,7 +328,7 @@ class DialogSetup:
                     state=DialogSG.HABIT_DETAIL
                 ),
                 state=DialogSG.HABIT_STATS,
-                getter=self.getters.habit_detail_getter
+                getter=self.getters.habit_stats_getter
             ),
 
             # Трекинг рецидива
@@ -347,6 +343,7 @@ class DialogSetup:
                         Const("✅ Подтвердить"),
                         id="confirm_relapse",
                         on_click=self.handlers.on_confirm_relapse,
+                        when="stats",
                     ),
                     SwitchTo(
                         Const("❌ Отмена"),
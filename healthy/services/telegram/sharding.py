@@ -0,0 +1,303 @@
+import asyncio
+import functools
+import logging
+import multiprocessing as mp
+import queue as queue_module
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.process import BaseProcess
+from multiprocessing.sharedctypes import Synchronized
+from typing import Optional
+
+from aiogram.exceptions import TelegramNetworkError, TelegramServerError
+from aiogram.types import Update
+
+from core.database.session_manager import create_database_manager
+from core.runtime.event_loop import run
+from .lanes import ChatLanes, update_chat_id
+from .telegram import TelegramApp, create_bot
+from .webhook import WebhookServer
+
+logger = logging.getLogger(__name__)
+
+
+def _get_batch(source: mp.Queue, limit: int, in_flight: Synchronized) -> list[Optional[str]]:
+    batch = [source.get()]
+    try:
+        while len(batch) < limit and batch[-1] is not None:
+            batch.append(source.get_nowait())
+    except queue_module.Empty:
+        pass
+    # Взятые из очереди апдейты живут только в этом процессе - супервизор
+    # видит их число и при падении шарда сообщает о потере
+    with in_flight.get_lock():
+        in_flight.value += len(batch) - (batch[-1] is None)
+    return batch
+
+
+async def serve_shard(
+        config,
+        index: int,
+        source: mp.Queue,
+        in_flight: Synchronized,
+        run_services: bool,
+        max_in_flight: int = 256
+):
+    """Воркер шарда: свой Dispatcher и DatabaseManager, апдейты из source"""
+    app = TelegramApp(config)
+    await app.setup()
+    await app.start_telemetry(index)
+    if run_services:
+        await app.start_services()
+    await app.dp.emit_startup(bot=app.bot, **app.dp.workflow_data)
+
+    async def process(update: Update):
+        try:
+            await app.dp.feed_update(app.bot, update)
+        finally:
+            with in_flight.get_lock():
+                in_flight.value -= 1
+
+    lanes = ChatLanes(process)
+    loop = asyncio.get_running_loop()
+    logger.info("Shard %d started", index)
+    try:
+        stopping = False
+        while not stopping:
+            batch = await loop.run_in_executor(None, _get_batch, source, max_in_flight, in_flight)
+            for raw in batch:
+                if raw is None:
+                    stopping = True
+                    break
+                update = Update.model_validate_json(raw, context={"bot": app.bot})
+                lanes.submit(update_chat_id(update), update)
+            await lanes.wait_below(max_in_flight)
+        await lanes.join()
+    finally:
+        await app.dp.emit_shutdown(bot=app.bot, **app.dp.workflow_data)
+        if run_services:
+            await app.stop_services()
+        await app.stop_telemetry()
+        await app.close()
+        logger.info("Shard %d stopped", index)
+
+
+def _shard_main(config, index: int, source: mp.Queue, in_flight: Synchronized, run_services: bool, max_in_flight: int):
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s - %(levelname)s - shard{index} - %(name)s - %(message)s",
+    )
+    run(serve_shard(config, index, source, in_flight, run_services, max_in_flight), config.runtime.event_loop)
+
+
+class ShardSupervisor:
+    """
+    Фронт-процесс: принимает апдейты (polling или webhook) и раскладывает их
+    по воркерам по chat_id, перезапуская упавшие воркеры. Апдейты одного
+    чата отправляются в шард в порядке приема. Апдейты, которые упавший
+    воркер успел забрать из очереди, теряются - их число пишется в лог
+    и копится в lost. Фоновые сервисы (напоминания, рассылки) работают
+    только в нулевом шарде.
+    """
+    def __init__(self, config, workers: Optional[int] = None, restart_delay: float = 1.0):
+        self.config = config
+        self.workers = workers or config.sharding.workers
+        self.restart_delay = restart_delay
+        self.restarts = 0
+        self.lost = 0
+
+        self._ctx = mp.get_context("spawn")
+        self.queues = [self._ctx.Queue(maxsize=config.sharding.queue_size) for _ in range(self.workers)]
+        self.in_flight = [self._ctx.Value("i", 0) for _ in range(self.workers)]
+        self.processes: list[Optional[BaseProcess]] = [None] * self.workers
+        # Блокирующий put в очередь шарда - в своем потоке на шард: переполненный
+        # шард не задерживает апдейты остальных
+        self._put_executors = [
+            ThreadPoolExecutor(1, thread_name_prefix=f"shard-{index}-put") for index in range(self.workers)
+        ]
+        self._stopping = False
+
+    async def prepare_schema(self):
+        db_manager = await create_database_manager(self.config)
+        await db_manager.migrate()
+        await db_manager.dispose()
+
+    def start(self):
+        for index in range(self.workers):
+            self._spawn(index)
+
+    def _spawn(self, index: int):
+        process = self._ctx.Process(
+            target=_shard_main,
+            args=(
+                self.config, index, self.queues[index], self.in_flight[index],
+                index == 0, self.config.sharding.max_in_flight
+            ),
+            name=f"shard-{index}",
+            # Шард держит свой пул рендера графиков, а daemon-процессам нельзя
+            # иметь дочерние процессы; шарды останавливает stop()
+            daemon=False,
+        )
+        process.start()
+        self.processes[index] = process
+
+    def _target(self, update: Update) -> tuple[int, str]:
+        index = update_chat_id(update) % self.workers
+        return index, update.model_dump_json(by_alias=True, exclude_none=True)
+
+    def route(self, update: Update) -> bool:
+        """
+        Отправляет апдейт в шард его чата без ожидания.
+        :return False, если очередь шарда переполнена
+        """
+        index, raw = self._target(update)
+        try:
+            self.queues[index].put_nowait(raw)
+        except queue_module.Full:
+            return False
+        return True
+
+    async def route_wait(self, update: Update):
+        """
+        Ждет места в очереди шарда. Порядок апдейтов чата сохраняется, только
+        если для одного чата вызовы идут последовательно (polling, ChatLanes
+        в WebhookServer). После stop() ожидание прекращается, апдейт считается
+        потерянным.
+        """
+        index, raw = self._target(update)
+        try:
+            self.queues[index].put_nowait(raw)
+            return
+        except queue_module.Full:
+            pass
+        loop = asyncio.get_running_loop()
+        # Таймаут put только возвращает поток к проверке остановки
+        put = functools.partial(self.queues[index].put, raw, timeout=1.0)
+        while not self._stopping:
+            try:
+                await loop.run_in_executor(self._put_executors[index], put)
+                return
+            except queue_module.Full:
+                pass
+        self.lost += 1
+        logger.warning("Update %s not routed: shard %d is stopping", update.update_id, index)
+
+    def _count_lost(self, index: int, queued: int = 0) -> int:
+        """Сбрасывает счетчик апдейтов в работе остановленного шарда"""
+        with self.in_flight[index].get_lock():
+            lost = self.in_flight[index].value + queued
+            self.in_flight[index].value = 0
+        self.lost += lost
+        return lost
+
+    @staticmethod
+    def _discard_queue(source: mp.Queue) -> int:
+        discarded = 0
+        try:
+            while True:
+                # Таймаут - на случай, если фоновый поток очереди еще не дописал апдейты в канал
+                discarded += source.get(timeout=0.1) is not None
+        except queue_module.Empty:
+            return discarded
+
+    async def supervise(self):
+        while not self._stopping:
+            for index, process in enumerate(self.processes):
+                if process is not None and not process.is_alive() and not self._stopping:
+                    logger.error(
+                        "Shard %d exited with code %s, lost %d in-flight updates, restarting",
+                        index, process.exitcode, self._count_lost(index)
+                    )
+                    self.restarts += 1
+                    await asyncio.sleep(self.restart_delay)
+                    self._spawn(index)
+            await asyncio.sleep(1.0)
+
+    async def stop(self, timeout: float = 30.0):
+        """
+        Живым шардам отправляется сигнал остановки: они дорабатывают очередь.
+        Шард, не принявший сигнал или не успевший за timeout, завершается,
+        как и упавший шард, его апдейты считаются потерянными.
+        """
+        self._stopping = True
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        async def send_stop(index: int) -> bool:
+            try:
+                await loop.run_in_executor(None, functools.partial(self.queues[index].put, None, timeout=timeout))
+            except queue_module.Full:
+                return False
+            return True
+
+        alive = [(index, process) for index, process in enumerate(self.processes)
+                 if process is not None and process.is_alive()]
+        signalled = await asyncio.gather(*(send_stop(index) for index, _ in alive))
+        for (index, process), stopping in zip(alive, signalled):
+            if stopping:
+                await loop.run_in_executor(None, process.join, max(deadline - loop.time(), 0))
+            if process.is_alive():
+                logger.warning("Shard %s did not stop in time, terminating", process.name)
+                process.terminate()
+                await loop.run_in_executor(None, process.join)
+        for index, process in enumerate(self.processes):
+            if process is None:
+                continue
+            lost = self._count_lost(index, self._discard_queue(self.queues[index]))
+            if lost:
+                logger.error("Shard %s stopped with %d unprocessed updates", process.name, lost)
+        for executor in self._put_executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self):
+        await self.prepare_schema()
+        self.start()
+        supervisor = asyncio.create_task(self.supervise())
+        bot = create_bot(self.config)
+        try:
+            if self.config.webhook.enabled:
+                await self._run_webhook(bot)
+            else:
+                await self._run_polling(bot)
+        finally:
+            supervisor.cancel()
+            await self.stop()
+            await bot.session.close()
+
+    async def _run_polling(self, bot):
+        await bot.delete_webhook(drop_pending_updates=True)
+        offset = None
+        while True:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=30)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                logger.warning("Polling failed: %s", e)
+                await asyncio.sleep(1.0)
+                continue
+            for update in updates:
+                await self.route_wait(update)
+                offset = update.update_id + 1
+
+    async def _run_webhook(self, bot):
+        webhook = self.config.webhook
+        server = WebhookServer(
+            None,
+            bot,
+            path=webhook.path,
+            host=webhook.host,
+            port=webhook.port,
+            secret_token=webhook.secret_token,
+            workers=webhook.workers,
+            queue_size=webhook.queue_size,
+            on_update=self.route_wait
+        )
+        await server.start()
+        try:
+            if webhook.url:
+                await bot.set_webhook(
+                    url=webhook.url.rstrip("/") + webhook.path,
+                    secret_token=webhook.secret_token,
+                    drop_pending_updates=True
+                )
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
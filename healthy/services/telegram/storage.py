@@ -0,0 +1,195 @@
+import asyncio
+import json
+import logging
+import zlib
+from typing import Any, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from sqlalchemy import delete, select
+
+from core.cache.lru import LRUCache
+from core.database.dialect import upsert
+from core.database.session_manager import DatabaseManagerBase
+from core.database.structures import FSMRecord
+
+logger = logging.getLogger(__name__)
+
+_JSON = b"j"
+_JSON_ZLIB = b"z"
+
+
+def dump_data(data: Mapping[str, Any], compress_threshold: int = 512) -> Optional[bytes]:
+    """
+    Компактная сериализация данных FSM: JSON без пробелов, сжатый zlib если
+    он длиннее compress_threshold. Первый байт хранит формат.
+    Данные, которые нельзя выразить в JSON, отклоняются с TypeError.
+    """
+    if not data:
+        return None
+    try:
+        raw = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+    except (TypeError, ValueError) as e:
+        raise TypeError(f"FSM data must be JSON-serializable: {e}") from e
+
+    if len(raw) > compress_threshold:
+        return _JSON_ZLIB + zlib.compress(raw)
+    return _JSON + raw
+
+
+def load_data(payload: Optional[bytes]) -> dict[str, Any]:
+    if not payload:
+        return {}
+    kind, body = payload[:1], payload[1:]
+    if kind == _JSON:
+        return json.loads(body)
+    if kind == _JSON_ZLIB:
+        return json.loads(zlib.decompress(body))
+    raise ValueError(f"Unknown FSM data format: {kind!r}")
+
+
+class _Record:
+    __slots__ = ("state", "data", "payload")
+
+    def __init__(
+            self,
+            state: Optional[str] = None,
+            data: Optional[dict[str, Any]] = None,
+            payload: Optional[bytes] = None
+    ):
+        self.state = state
+        self.data = data or {}
+        self.payload = payload  # data, сериализованные dump_data
+
+
+class DatabaseStorage(BaseStorage):
+    """
+    FSM storage поверх DatabaseManagerBase (SQLite/PostgreSQL).
+
+    Горячие записи живут в LRU-кэше процесса, изменения пишутся в БД
+    пачкой (write-behind) раз в flush_interval секунд и при закрытии.
+    Предполагается, что апдейты одного чата обрабатывает один процесс.
+    """
+    def __init__(
+            self,
+            db_manager: DatabaseManagerBase,
+            cache_size: int = 10_000,
+            flush_interval: float = 0.5,
+            key_builder: Optional[KeyBuilder] = None
+    ):
+        self.db_manager = db_manager
+        self.flush_interval = flush_interval
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+
+        self._cache: LRUCache[str, _Record] = LRUCache(cache_size)
+        self._dirty: dict[str, _Record] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def cache_stats(self):
+        return self._cache.stats
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key)
+        record = await self._get_record(storage_key)
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(storage_key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._get_record(self.key_builder.build(key))).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise TypeError(f"Data must be a dict or dict-like object, got {type(data).__name__}")
+        # Сериализуем сразу: ошибка достается вызывающему, а не фоновому flush
+        payload = dump_data(data)
+        storage_key = self.key_builder.build(key)
+        record = await self._get_record(storage_key)
+        record.data = data.copy()
+        record.payload = payload
+        self._mark_dirty(storage_key, record)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return (await self._get_record(self.key_builder.build(key))).data.copy()
+
+    async def close(self) -> None:
+        if self._flush_task:
+            # Прерванный flush возвращает свою пачку в _dirty, ее допишет flush ниже
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Записывает все накопленные изменения одной пачкой"""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, {}
+
+            upserts, deletes = [], []
+            for storage_key, record in dirty.items():
+                if record.state is None and not record.data:
+                    deletes.append(storage_key)
+                else:
+                    upserts.append({"key": storage_key, "state": record.state, "data": record.payload})
+
+            try:
+                async with self.db_manager.session() as session:
+                    if upserts:
+                        await session.execute(upsert(
+                            session, FSMRecord, upserts,
+                            index_elements=[FSMRecord.key], update=["state", "data", "updated_at"]
+                        ))
+                    if deletes:
+                        await session.execute(delete(FSMRecord).where(FSMRecord.key.in_(deletes)))
+            except BaseException:
+                # В том числе при отмене: возвращаем непереписанные записи,
+                # более свежие изменения важнее
+                for storage_key, record in dirty.items():
+                    self._dirty.setdefault(storage_key, record)
+                raise
+
+    def _mark_dirty(self, storage_key: str, record: _Record):
+        self._dirty[storage_key] = record
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.flush_interval)
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error("FSM storage flush failed: %s", e, exc_info=True)
+        if self._dirty:
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _get_record(self, storage_key: str) -> _Record:
+        record = self._dirty.get(storage_key) or self._cache.get(storage_key)
+        if record is not None:
+            return record
+
+        async with self.db_manager.session() as session:
+            row = (await session.execute(
+                select(FSMRecord.state, FSMRecord.data).where(FSMRecord.key == storage_key)
+            )).first()
+
+        # Пока шел запрос, запись могли создать конкурентно
+        record = self._dirty.get(storage_key) or self._cache.get(storage_key, count=False)
+        if record is None:
+            record = self._load_record(storage_key, row) if row else _Record()
+            self._cache.set(storage_key, record)
+        return record
+
+    @staticmethod
+    def _load_record(storage_key: str, row) -> _Record:
+        try:
+            return _Record(row.state, load_data(row.data), row.data)
+        except ValueError as e:
+            # Например, pickle из старых версий: состояние сохраняем, данные - нет
+            logger.warning("Discarding unreadable FSM data for %s: %s", storage_key, e)
+            return _Record(row.state)
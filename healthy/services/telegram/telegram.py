@@ -1,21 +1,54 @@
 from aiogram import Bot, Dispatcher, Router, BaseMiddleware
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 from aiogram.filters import BaseFilter, Command
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram_dialog import Dialog, setup_dialogs, DialogManager
+from aiogram_dialog.context.media_storage import MediaIdStorage
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Callable, Awaitable, Dict, Any, Optional
+from typing import TYPE_CHECKING, Callable, Awaitable, Dict, Any, Optional
+from dataclasses import dataclass
+import asyncio
 import logging
+import os
+import time as t
 
 from core.database.session_manager import create_database_manager, DatabaseManagerBase, DatabaseManagerSQLite
+from core.database.lazy_session import LazySession, LazyGateway, ReadSession
+from core.database.query_audit import QueryAuditor, QueryBudget, audit_engine, set_auditor
+from core.gateways.loaders import UpdateLoaders
 from core.gateways.usergateways import UserGateway
+from core.gateways.cached import CachedUserGateway
+from core.cache.catalog import HabitCatalogCache
+from core.cache.profiles import UserProfileCache
+from core.database.dto import ReminderScheduleDomain
+from core.metrics.collectors import gauge_collector, pool_collector, stats_collector
+from core.metrics.registry import REGISTRY
+from core.metrics.timing import instrument_methods
+from core.runtime.event_loop import running_loop_name
+from core.tracing.exporters import create_exporters
+from core.tracing.sql import instrument_engine
+from core.tracing.tracer import Tracer, span, trace_methods
+from services.charts.service import ChartService
+from services.reminders.scheduler import ReminderScheduler
 
 from .states import DialogSG
 from .setup import DialogSetup
 from .handlers import DialogHandlers
 from .getters import DialogGetters
+from .outbox import MessageOutbox
+from .query_audit import QueryAuditMiddleware
+from .storage import DatabaseStorage
+from .tracing import TracingMiddleware, TracingRequestMiddleware
+from .transactions import CommitWritesRequestMiddleware, bind_update_session
+
+if TYPE_CHECKING:
+    # aiohttp.web нужен только с включенными метриками или вебхуком, импорт - при создании сервера
+    from core.metrics.exposition import MetricsExporter
+    from .webhook import WebhookServer
 
 logger = logging.getLogger(__name__)
 
@@ -28,16 +61,95 @@ class IsAdminFilter(BaseFilter):
         return event.from_user.id in self.admin_ids
 
 
+@dataclass
+class SessionStats:
+    """Счетчики обращений к БД по апдейтам"""
+    updates: int = 0
+    db_updates: int = 0
+    rollbacks: int = 0
+
+    @property
+    def db_ratio(self) -> float:
+        return self.db_updates / self.updates if self.updates else 0.0
+
+
 class DatabaseMiddleware(BaseMiddleware):
-    def __init__(self, db_manager: DatabaseManagerBase):
+    """
+    Подкладывает в data ленивую сессию и ленивый UserGateway:
+    соединение берется из пула только если обработчик реально пошел в БД.
+    read_gateway для геттеров читает с реплик, если они настроены,
+    loaders батчат и запоминают чтения геттеров в пределах апдейта.
+    Записи фиксируются перед вызовами Bot API (CommitWritesRequestMiddleware),
+    так что замок на запись SQLite не держится на время сетевых запросов.
+    """
+    def __init__(
+            self,
+            db_manager: DatabaseManagerBase,
+            habit_catalog: HabitCatalogCache,
+            user_profiles: UserProfileCache
+    ):
         self.db_manager = db_manager
+        self.habit_catalog = habit_catalog
+        self.user_profiles = user_profiles
+        self.stats = SessionStats()
+        self.update_duration = REGISTRY.histogram(
+            "healthy_update_duration_seconds", "Update processing time", ("event_type",)
+        )
 
     async def __call__(self, handler, event, data):
-        async with self.db_manager.session() as session:
-            data["session"] = session
-            data["user_gateway"] = UserGateway(session)
-            result = await handler(event, data)
-            return result
+        if not self.db_manager.engine:
+            await self.db_manager.initialize()
+        started = t.perf_counter()
+
+        session = LazySession(self.db_manager.session_factory)
+        data["session"] = session
+        data["user_gateway"] = LazyGateway(self._create_gateway, session)
+        read_session = LazySession(self.db_manager.read_session_factory)
+        data["read_gateway"] = LazyGateway(self._create_gateway, ReadSession(read_session, session))
+        # Загрузчики живут один апдейт: повторные чтения внутри него не идут в БД
+        data["loaders"] = LazyGateway(UpdateLoaders, data["read_gateway"])
+
+        error = None
+        try:
+            with span("middleware DatabaseMiddleware"), bind_update_session(session):
+                return await handler(event, data)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            with span("db finalize"):
+                # Ошибка закрытия сессии чтения не должна оставить основную транзакцию и замок на запись
+                try:
+                    await read_session.finalize(error)
+                finally:
+                    hit_db = await session.finalize(error)
+            self.update_duration.observe(t.perf_counter() - started, (event.event_type,))
+            self.stats.updates += 1
+            if hit_db:
+                self.stats.db_updates += 1
+                if error is not None:
+                    self.stats.rollbacks += 1
+            logger.debug(
+                "Update handled: db=%s (%d/%d updates hit the database)",
+                hit_db, self.stats.db_updates, self.stats.updates
+            )
+
+    def _create_gateway(self, session) -> CachedUserGateway:
+        return CachedUserGateway(
+            session, self.habit_catalog, self.user_profiles, self.db_manager.primary_session_factory
+        )
+
+
+def create_bot(config) -> Bot:
+    session = None
+    if config.tg_bot.api_server:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(config.tg_bot.api_server))
+
+    return Bot(
+        token=config.tg_bot.token,
+        session=session,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    )
 
 
 class TelegramApp:
@@ -47,8 +159,21 @@ class TelegramApp:
         self.main_router = Router()
         self.bot = None
         self.dp = None
-        self.dialog_handlers = DialogHandlers()
-        self.dialog_getters = DialogGetters()
+        self.reminder_scheduler = None
+        self.outbox = None
+        self.database_middleware = None
+        self.metrics_exporter = None
+        self.media_storage = MediaIdStorage()
+        self.chart_service = self.create_chart_service()
+        self.habit_catalog = HabitCatalogCache(config.cache.catalog_ttl, config.cache.catalog_version_interval)
+        self.user_profiles = UserProfileCache(config.cache.profile_size, config.cache.profile_ttl)
+        self.dialog_handlers = instrument_methods(DialogHandlers(), "handler")
+        self.dialog_getters = instrument_methods(DialogGetters(), "getter")
+        self.tracer = self.create_tracer()
+        self.query_auditor = self.create_query_auditor()
+        if self.tracer:
+            trace_methods(self.dialog_handlers, "handler")
+            trace_methods(self.dialog_getters, "getter")
         self.dialog_setup = DialogSetup(
             self.dialog_handlers,
             self.dialog_getters
@@ -65,31 +190,241 @@ class TelegramApp:
             self.db_manager = DatabaseManagerSQLite(self.config)
             await self.db_manager.initialize()
 
+        if self.tracer:
+            instrument_engine(self.db_manager.engine)
+            for replica in self.db_manager.replicas.replicas:
+                instrument_engine(replica.engine)
+        if self.query_auditor:
+            audit_engine(self.db_manager.engine)
+            for replica in self.db_manager.replicas.replicas:
+                audit_engine(replica.engine)
+            set_auditor(self.query_auditor)
+        # Проверки реплик нужны каждому процессу: ротация реплик у каждого своя
+        await self.db_manager.replicas.start()
+
         self.bot = await self.create_bot()
+        self.outbox = MessageOutbox(
+            self.bot,
+            workers=self.config.outbox.workers,
+            max_queue_size=self.config.outbox.max_queue_size,
+            global_rate=self.config.outbox.global_rate,
+            chat_rate=self.config.outbox.chat_rate,
+            max_attempts=self.config.outbox.max_attempts
+        )
+        self.reminder_scheduler = ReminderScheduler(self.db_manager, self.send_reminders)
         self.dp = await self.create_dispatcher()
         self.register_handlers()
+        self.register_metrics()
 
     async def run(self):
-        await self.db_manager.create_tables() #/DELETE ON PROD
-        await self.bot.delete_webhook(drop_pending_updates=True)
-        await self.dp.start_polling(self.bot)
+        await self.db_manager.migrate()
+        await self.start_telemetry()
+        await self.start_services()
+        try:
+            if self.config.webhook.enabled:
+                await self.run_webhook()
+            else:
+                await self.bot.delete_webhook(drop_pending_updates=True)
+                await self.dp.start_polling(self.bot, close_bot_session=False)
+        finally:
+            # Сессия бота закрывается последней: outbox досылает через нее очередь
+            await self.stop_services()
+            await self.stop_telemetry()
+            await self.close()
 
-    async def create_bot(self) -> Bot:
-        return Bot(
-            token=self.config.tg_bot.token,
-            default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    def register_metrics(self):
+        """Подключает существующие счетчики к реестру метрик"""
+        REGISTRY.slow_call_threshold = self.config.metrics.slow_call_threshold
+        REGISTRY.slow_call_sample_rate = self.config.metrics.slow_call_sample_rate
+
+        REGISTRY.register_collector("db_pool", pool_collector("healthy_db_pool", lambda: self.db_manager.pool_stats))
+        REGISTRY.register_collector("outbox", stats_collector(
+            "healthy_outbox", lambda: self.outbox.stats, "Outbound message queue statistics"
+        ))
+        REGISTRY.register_collector("outbox_queue", gauge_collector(
+            "healthy_outbox_queue_depth", "Messages waiting in the outbox", lambda: self.outbox.queue_depth
+        ))
+        REGISTRY.register_collector("catalog_cache", stats_collector(
+            "healthy_catalog_cache", lambda: self.habit_catalog.stats, "Habit catalog cache statistics"
+        ))
+        REGISTRY.register_collector("profile_cache", stats_collector(
+            "healthy_profile_cache", lambda: self.user_profiles.stats, "User profile cache statistics"
+        ))
+        REGISTRY.register_collector("updates", stats_collector(
+            "healthy_session", lambda: self.database_middleware.stats, "Updates that used a database session"
+        ))
+        REGISTRY.register_collector("charts", stats_collector(
+            "healthy_charts", lambda: self.chart_service.stats if self.chart_service else None,
+            "Progress chart rendering and file_id reuse"
+        ))
+        REGISTRY.register_collector("query_audit", stats_collector(
+            "healthy_query_audit", lambda: self.query_auditor.stats if self.query_auditor else None,
+            "SQL query budget checks"
+        ))
+        REGISTRY.gauge("healthy_event_loop_info", "Event loop implementation", ("loop",)).set(1, (running_loop_name(),))
+
+    def create_metrics_exporter(self, instance: int = 0) -> Optional["MetricsExporter"]:
+        """instance сдвигает порт и имя файла, чтобы шарды не конфликтовали"""
+        metrics = self.config.metrics
+        if not (metrics.port or metrics.dump_path):
+            return None
+        from core.metrics.exposition import MetricsExporter
+
+        dump_path = metrics.dump_path
+        if dump_path and instance:
+            root, ext = os.path.splitext(dump_path)
+            dump_path = f"{root}.{instance}{ext}"
+        return MetricsExporter(
+            REGISTRY,
+            host=metrics.host,
+            port=metrics.port + instance if metrics.port else None,
+            path=metrics.path,
+            dump_path=dump_path,
+            dump_interval=metrics.dump_interval
         )
 
+    def create_chart_service(self) -> Optional[ChartService]:
+        charts = self.config.charts
+        if not charts.enabled:
+            return None
+        return ChartService(
+            self.media_storage,
+            cache_dir=charts.cache_dir,
+            workers=charts.workers,
+            days=charts.days
+        )
+
+    def create_tracer(self) -> Optional[Tracer]:
+        tracing = self.config.tracing
+        if not tracing.enabled:
+            return None
+        return Tracer(
+            create_exporters(tracing.jsonl_path, tracing.otlp_endpoint, tracing.service_name),
+            threshold=tracing.threshold,
+            max_spans=tracing.max_spans,
+            flush_interval=tracing.flush_interval
+        )
+
+    def create_query_auditor(self) -> Optional[QueryAuditor]:
+        query_audit = self.config.query_audit
+        if not query_audit.enabled:
+            return None
+        limits = {"repeats": query_audit.repeats, "eager_depth": query_audit.eager_depth}
+        return QueryAuditor(
+            update_budget=QueryBudget(statements=query_audit.update_statements, **limits),
+            call_budget=QueryBudget(statements=query_audit.call_statements, **limits),
+            raise_on_violation=query_audit.raise_on_violation
+        )
+
+    async def start_telemetry(self, instance: int = 0):
+        """Экспорт метрик и трасс"""
+        self.metrics_exporter = self.create_metrics_exporter(instance)
+        if self.metrics_exporter:
+            await self.metrics_exporter.start()
+        if self.tracer:
+            await self.tracer.start()
+
+    async def stop_telemetry(self):
+        if self.tracer:
+            await self.tracer.stop()
+        if self.metrics_exporter:
+            await self.metrics_exporter.stop()
+            self.metrics_exporter = None
+
+    async def start_services(self):
+        """Фоновые сервисы: очередь исходящих сообщений, напоминания"""
+        await self.outbox.start()
+        await self.reminder_scheduler.start()
+
+    async def stop_services(self):
+        await self.reminder_scheduler.stop()
+        await self.outbox.stop()
+
+    async def close(self):
+        """Ресурсы процесса: пул рендера графиков, проверки реплик и пулы БД, сессия бота"""
+        if self.chart_service:
+            await self.chart_service.stop()
+        await self.db_manager.dispose()
+        await self.bot.session.close()
+
+    def create_webhook_server(self) -> "WebhookServer":
+        from .webhook import WebhookServer
+
+        webhook = self.config.webhook
+        return WebhookServer(
+            self.dp,
+            self.bot,
+            path=webhook.path,
+            host=webhook.host,
+            port=webhook.port,
+            secret_token=webhook.secret_token,
+            workers=webhook.workers,
+            queue_size=webhook.queue_size
+        )
+
+    async def run_webhook(self):
+        webhook = self.config.webhook
+        server = self.create_webhook_server()
+        REGISTRY.register_collector("webhook", stats_collector(
+            "healthy_webhook", lambda: server.stats, "Webhook server statistics"
+        ))
+        REGISTRY.register_collector("webhook_queue", gauge_collector(
+            "healthy_webhook_queue_depth", "Updates accepted by the webhook and not processed yet", lambda: server.queue_depth
+        ))
+
+        await self.dp.emit_startup(bot=self.bot, **self.dp.workflow_data)
+        await server.start()
+        try:
+            if webhook.url:
+                await self.bot.set_webhook(
+                    url=webhook.url.rstrip("/") + webhook.path,
+                    secret_token=webhook.secret_token,
+                    allowed_updates=self.dp.resolve_used_update_types(),
+                    drop_pending_updates=True
+                )
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+            await self.dp.emit_shutdown(bot=self.bot, **self.dp.workflow_data)
+
+    async def send_reminders(self, reminders: list[ReminderScheduleDomain]):
+        # Планировщик ждет места в очереди, а не теряет напоминания при переполнении
+        await self.outbox.put_many(
+            (reminder.tg_id, f"⏰ Напоминание: {reminder.habit_name}") for reminder in reminders
+        )
+
+    async def create_bot(self) -> Bot:
+        bot = create_bot(self.config)
+        bot.session.middleware(CommitWritesRequestMiddleware())
+        if self.tracer:
+            bot.session.middleware(TracingRequestMiddleware())
+        return bot
+
     async def create_dispatcher(self) -> Dispatcher:
-        dp = Dispatcher(storage=MemoryStorage())
+        dp = Dispatcher(storage=self.create_storage())
+        # Записи напоминаний сообщают планировщику: reminder_scheduler.reload(ids) / unschedule(ids)
+        dp["reminder_scheduler"] = self.reminder_scheduler
+        dp["outbox"] = self.outbox
+        dp["chart_service"] = self.chart_service
 
-        dp.update.middleware(DatabaseMiddleware(self.db_manager))
+        self.database_middleware = DatabaseMiddleware(self.db_manager, self.habit_catalog, self.user_profiles)
+        dp.update.middleware(self.database_middleware)
+        if self.tracer:
+            dp.update.outer_middleware(TracingMiddleware(self.tracer))
+        if self.query_auditor:
+            dp.update.outer_middleware(QueryAuditMiddleware(self.query_auditor))
 
         self.main_router.include_router(self.dialog_setup.router)
         dp.include_router(self.main_router)
-        setup_dialogs(dp)
+        # Общее хранилище file_id: по нему ChartService понимает, что график уже загружен
+        setup_dialogs(dp, media_id_storage=self.media_storage)
         return dp
 
+    def create_storage(self):
+        if self.config.tg_bot.fsm_storage == "memory":
+            return MemoryStorage()
+        return DatabaseStorage(self.db_manager)
+
     def register_handlers(self):
         @self.main_router.message(Command("start"))
         async def start_handler(message: Message, dialog_manager: DialogManager):
@@ -0,0 +1,34 @@
+from typing import Any
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType, Response
+
+from core.tracing.tracer import Tracer, span
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Внешний middleware апдейта: открывает трассу, в которой пишутся все спаны"""
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+
+    async def __call__(self, handler, event, data):
+        with self.tracer.trace("update", update_id=event.update_id, event_type=event.event_type):
+            return await handler(event, data)
+
+
+class TracingRequestMiddleware(BaseRequestMiddleware):
+    """Спан на каждый вызов Bot API внутри трассы"""
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        attributes: dict[str, Any] = {"telegram.method": method.__api_method__}
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is not None:
+            attributes["telegram.chat_id"] = chat_id
+        with span(f"bot {method.__api_method__}", "client", **attributes):
+            return await make_request(bot, method)
@@ -0,0 +1,45 @@
+"""
+Замок на запись SQLite не должен ждать сеть: сессия апдейта живет весь
+апдейт, и без фиксации перед вызовом Bot API (callback.answer, рендер
+окна после switch_to) все записи процесса стояли бы в очереди за задержкой
+Telegram. Перед каждым вызовом Bot API из обработчика записи апдейта
+фиксируются, и замок отпускается.
+"""
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType, Response
+
+from core.database.lazy_session import LazySession
+
+# Сессия апдейта и задача, которая его обрабатывает
+_update_session: ContextVar[Optional[tuple[LazySession, asyncio.Task]]] = ContextVar("update_session", default=None)
+
+
+@contextmanager
+def bind_update_session(session: LazySession) -> Iterator[None]:
+    token = _update_session.set((session, asyncio.current_task()))
+    try:
+        yield
+    finally:
+        _update_session.reset(token)
+
+
+class CommitWritesRequestMiddleware(BaseRequestMiddleware):
+    """Фиксирует записи апдейта перед вызовом Bot API"""
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        bound = _update_session.get()
+        # Задачи, запущенные из обработчика, наследуют контекст, но не владеют его транзакцией
+        if bound is not None and bound[1] is asyncio.current_task():
+            await bound[0].commit_writes()
+        return await make_request(bot, method)
@@ -0,0 +1,113 @@
+import asyncio
+import hmac
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+from .lanes import ChatLanes, update_chat_id
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+@dataclass
+class WebhookStats:
+    """Счетчики webhook-сервера"""
+    received: int = 0
+    rejected: int = 0
+    processed: int = 0
+    failed: int = 0
+
+
+class WebhookServer:
+    """
+    Прием апдейтов через webhook на aiohttp.
+
+    Запрос подтверждается сразу после постановки апдейта в очередь его чата
+    (ChatLanes): апдейты одного чата обрабатываются по одному в порядке
+    приема, разные чаты - параллельно, не более workers одновременно.
+    Если ожидающих апдейтов queue_size, сервер отвечает 503, и Telegram
+    повторит доставку позже (backpressure). По умолчанию апдейты уходят
+    в Dispatcher, on_update позволяет перенаправить их, например, по шардам.
+    """
+    def __init__(
+            self,
+            dp: Optional[Dispatcher],
+            bot: Bot,
+            path: str = "/webhook",
+            host: str = "0.0.0.0",
+            port: int = 8080,
+            secret_token: Optional[str] = None,
+            workers: int = 16,
+            queue_size: int = 1000,
+            on_update: Optional[Callable[[Update], Awaitable]] = None
+    ):
+        self.dp = dp
+        self.bot = bot
+        self.on_update = on_update or self._feed_update
+        self.path = path
+        self.host = host
+        self.port = port
+        self.secret_token = secret_token
+        self.workers = workers
+        self.queue_size = queue_size
+
+        self.stats = WebhookStats()
+        self.app = web.Application()
+        self.app.router.add_post(path, self.handle)
+        self._lanes = ChatLanes(self._process, max_active=workers)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._lanes.pending
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info("Webhook server listening on %s:%s%s", self.host, self.port, self.path)
+
+    async def stop(self, drain_timeout: float = 10.0):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        try:
+            await asyncio.wait_for(self._lanes.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Webhook stopped with %d unprocessed updates", await self._lanes.cancel())
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.secret_token and not hmac.compare_digest(
+                request.headers.get(SECRET_HEADER, ""), self.secret_token):
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except Exception as e:
+            logger.warning("Malformed webhook payload: %s", e)
+            return web.Response(status=400)
+
+        if self._lanes.pending >= self.queue_size:
+            self.stats.rejected += 1
+            return web.Response(status=503)
+
+        self._lanes.submit(update_chat_id(update), update)
+        self.stats.received += 1
+        return web.Response()
+
+    async def _feed_update(self, update: Update):
+        await self.dp.feed_update(self.bot, update)
+
+    async def _process(self, update: Update):
+        try:
+            await self.on_update(update)
+        except Exception:
+            self.stats.failed += 1
+            raise
+        self.stats.processed += 1
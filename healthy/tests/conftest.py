@@ -0,0 +1,79 @@
+import asyncio
+from datetime import time
+from types import SimpleNamespace
+from typing import Awaitable, Callable
+
+import pytest
+from sqlalchemy import event
+
+from config_reader import DBConfig
+from core.database.session_manager import DatabaseManagerSQLite
+from core.database.structures import Hint, Info, Reminder
+from core.gateways.usergateways import UserGateway
+
+
+@pytest.fixture
+def db_config(tmp_path) -> SimpleNamespace:
+    return SimpleNamespace(db=DBConfig(path=str(tmp_path / "test.db")))
+
+
+@pytest.fixture
+def with_database(db_config) -> Callable[[Callable[[DatabaseManagerSQLite], Awaitable]], object]:
+    """Запускает тест-корутину на файловой SQLite со схемой по миграциям"""
+    def run(test: Callable[[DatabaseManagerSQLite], Awaitable]):
+        async def main():
+            db_manager = DatabaseManagerSQLite(db_config)
+            await db_manager.initialize()
+            await db_manager.migrate()
+            try:
+                return await test(db_manager)
+            finally:
+                await db_manager.dispose()
+        return asyncio.run(main())
+    return run
+
+
+class StatementCounter:
+    """Запросы, ушедшие в движок"""
+    def __init__(self, engine):
+        self.statements: list[str] = []
+        self._engine = engine.sync_engine
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self) -> "StatementCounter":
+        event.listen(self._engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self._engine, "before_cursor_execute", self._record)
+        return False
+
+
+SEED_TG_ID = 1000
+
+
+async def seed_tracked_habits(db_manager, catalog: int, habits: int, relapses: int) -> dict:
+    """Каталог с info и hint у каждой привычки, пользователь SEED_TG_ID с напоминаниями и рецидивами"""
+    async with db_manager.session() as session:
+        gateway = UserGateway(session)
+        catalog_ids = []
+        for index in range(catalog):
+            habit = await gateway.add_admin_habit(name=f"habit-{index}", cost_per_unit=100 + index)
+            session.add_all([
+                Info(name="info", description="Описание", habit_id=habit.id),
+                Hint(name="hint", description="Подсказка", habit_id=habit.id),
+            ])
+            catalog_ids.append(habit.id)
+        user = await gateway.create_user(SEED_TG_ID, "user", "User", "Europe/Moscow")
+        user_habit_ids = []
+        for habit_id in catalog_ids[:habits]:
+            user_habit = await gateway.add_user_habit(user.id, habit_id)
+            session.add(Reminder(reminder_type="daily", scheduled_time=time(9), user_habit_id=user_habit.id))
+            user_habit_ids.append(user_habit.id)
+        await session.flush()
+        for user_habit_id in user_habit_ids:
+            for _ in range(relapses):
+                await gateway.record_relapse(user_habit_id)
+    return {"user_id": user.id, "catalog_ids": catalog_ids, "user_habit_ids": user_habit_ids}
@@ -0,0 +1,44 @@
+from core.cache.catalog import HabitCatalogCache
+from core.cache.profiles import UserProfileCache
+from core.gateways.cached import CachedUserGateway
+from core.gateways.usergateways import UserGateway
+
+
+def test_catalog_write_in_another_process_invalidates_the_cache(with_database):
+    async def test(db_manager):
+        catalog = HabitCatalogCache(version_check_interval=0)
+
+        def gateway(session) -> CachedUserGateway:
+            return CachedUserGateway(session, catalog, UserProfileCache(10), db_manager.primary_session_factory)
+
+        async with db_manager.session() as session:
+            assert await gateway(session).get_all_habits() == []
+        version = catalog.version
+
+        # Запись в обход кэша этого процесса - как из другого шарда или импорта каталога
+        async with db_manager.session() as session:
+            await UserGateway(session).add_admin_habit("habit", 100)
+
+        async with db_manager.session() as session:
+            habits = await gateway(session).get_all_habits()
+        assert [habit.name for habit in habits] == ["habit"]
+        assert catalog.version == version + 1
+
+        async with db_manager.session() as session:
+            await gateway(session).get_all_habits()
+        assert catalog.version == version + 1
+        assert catalog.stats.misses == 2
+
+    with_database(test)
+
+
+def test_version_check_is_throttled(with_database):
+    async def test(db_manager):
+        catalog = HabitCatalogCache(version_check_interval=3600)
+        async with db_manager.session() as session:
+            gateway = CachedUserGateway(session, catalog, UserProfileCache(10))
+            await gateway.get_all_habits()
+            await UserGateway(session).add_admin_habit("habit", 100)
+            assert await gateway.get_all_habits() == []
+
+    with_database(test)
@@ -0,0 +1,53 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from aiogram_dialog.context.media_storage import MediaIdStorage
+
+from config_reader import ChartsConfig, Config, DBConfig, ShardingConfig, TgBot
+from core.database.dto import UserHabitStatsDomain
+from services.charts.service import ChartService
+from services.telegram import sharding
+from services.telegram.sharding import ShardSupervisor
+
+
+class EmptyHistoryGateway:
+    async def get_relapse_buckets(self, user_habit_id, bucket, since):
+        return []
+
+    async def get_relapse_history(self, user_habit_id, limit, before=None):
+        return []
+
+
+def _render_in_shard(config, index, source, in_flight, run_services, max_in_flight):
+    """Подменяет воркер шарда: рисует график и отдает путь (или None) через очередь шарда"""
+    async def render():
+        service = ChartService(MediaIdStorage(), cache_dir=config.charts.cache_dir)
+        habit = UserHabitStatsDomain(
+            id=1, user_id=1, habit_id=1, habit_name="habit", start_date=datetime.utcnow() - timedelta(days=10),
+            last_relapse=None, current_streak=10, longest_streak=10, relapse_count=0, saved_money=0
+        )
+        try:
+            chart = await service.get_chart(habit, EmptyHistoryGateway())
+        finally:
+            await service.stop()
+        return chart.path if chart else None
+
+    source.put(asyncio.run(render()))
+
+
+def test_chart_renders_in_a_shard_process(tmp_path, monkeypatch):
+    config = Config(
+        tg_bot=TgBot(token="123456:TEST", admin_ids=[]),
+        db=DBConfig(),
+        sharding=ShardingConfig(workers=1),
+        charts=ChartsConfig(cache_dir=str(tmp_path))
+    )
+    monkeypatch.setattr(sharding, "_shard_main", _render_in_shard)
+    supervisor = ShardSupervisor(config)
+    supervisor._spawn(0)
+    path = supervisor.queues[0].get(timeout=60)
+    supervisor.processes[0].join(timeout=30)
+
+    assert path is not None
+    assert os.path.getsize(path) > 0
@@ -0,0 +1,46 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.gateways.loaders import UpdateLoaders
+from core.gateways.usergateways import UserGateway
+from services.telegram.dialog_state import STATE_VERSION, VERSION_KEY
+from services.telegram.getters import DialogGetters
+
+
+def dialog_manager(loaders, dialog_data, chart_service=None):
+    return SimpleNamespace(
+        middleware_data={"loaders": loaders, "chart_service": chart_service},
+        dialog_data=dialog_data,
+    )
+
+
+@pytest.mark.parametrize("dialog_data", [
+    {},
+    {"habit_id": 1},  # состояние до смены STATE_VERSION
+    {"habit_id": "1", VERSION_KEY: STATE_VERSION},
+])
+def test_habit_detail_without_stored_habit_renders_placeholder(dialog_data):
+    loaders = SimpleNamespace(habit_stats=None)
+
+    data = asyncio.run(DialogGetters.habit_detail_getter(dialog_manager(loaders, dialog_data)))
+
+    assert data["stats"] is None
+    assert data["habit_name"] == "Не выбрано"
+
+
+def test_deleted_habit_renders_placeholder_without_chart(with_database):
+    async def test(db_manager):
+        async with db_manager.session() as session:
+            manager = dialog_manager(
+                UpdateLoaders(UserGateway(session)),
+                {"habit_id": 404, VERSION_KEY: STATE_VERSION},
+                chart_service=SimpleNamespace(get_chart=None),
+            )
+            return await DialogGetters.habit_stats_getter(manager)
+
+    data = with_database(test)
+    assert data["stats"] is None
+    assert data["relapse_count"] == 0
+    assert "chart" not in data
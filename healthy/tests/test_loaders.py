@@ -0,0 +1,91 @@
+import asyncio
+from types import SimpleNamespace
+
+from core.gateways.loaders import UpdateLoaders
+
+
+class CountingGateway:
+    def __init__(self):
+        self.calls: list[list[int]] = []
+
+    async def get_habits_by_ids(self, habit_ids):
+        return []
+
+    async def get_habit_stats_by_ids(self, user_habit_ids):
+        self.calls.append(list(user_habit_ids))
+        return [SimpleNamespace(id=habit_id) for habit_id in user_habit_ids if habit_id < 10]
+
+
+def test_concurrent_loads_are_batched_and_cached():
+    gateway = CountingGateway()
+
+    async def main():
+        loaders = UpdateLoaders(gateway)
+        first = await loaders.habit_stats.load_many([1, 2, 2, 11])
+        again = await loaders.habit_stats.load(1)
+        return first, again
+
+    first, again = asyncio.run(main())
+    assert [stats.id if stats else None for stats in first] == [1, 2, 2, None]
+    assert again is first[0]
+    assert gateway.calls == [[1, 2, 11]]
+
+
+def test_primed_value_replaces_cleared_entry():
+    gateway = CountingGateway()
+
+    async def main():
+        loaders = UpdateLoaders(gateway)
+        await loaders.habit_stats.load(1)
+        fresh = SimpleNamespace(id=1, relapse_count=1)
+        loaders.habit_stats.clear(1)
+        loaders.habit_stats.prime(1, fresh)
+        return fresh, await loaders.habit_stats.load(1)
+
+    fresh, loaded = asyncio.run(main())
+    assert loaded is fresh
+    assert gateway.calls == [[1]]
+
+
+def test_clear_while_batch_is_queued_resolves_waiter():
+    gateway = CountingGateway()
+
+    async def main():
+        loaders = UpdateLoaders(gateway)
+        pending = loaders.habit_stats.load(1)
+        loaders.habit_stats.clear(1)
+        return await asyncio.wait_for(pending, timeout=1)
+
+    assert asyncio.run(main()).id == 1
+    assert gateway.calls == [[1]]
+
+
+def test_load_after_clear_during_batch_reads_again():
+    gateway = CountingGateway()
+    started = asyncio.Event()
+    release = asyncio.Event()
+    values = iter(["before", "after"])
+
+    async def get_habit_stats_by_ids(user_habit_ids):
+        gateway.calls.append(list(user_habit_ids))
+        value = next(values)
+        if value == "before":
+            started.set()
+            await release.wait()
+        return [SimpleNamespace(id=habit_id, value=value) for habit_id in user_habit_ids]
+
+    gateway.get_habit_stats_by_ids = get_habit_stats_by_ids
+
+    async def main():
+        loaders = UpdateLoaders(gateway)
+        stale = loaders.habit_stats.load(1)
+        await started.wait()
+        # Запись между выборкой и ее результатом
+        loaders.habit_stats.clear(1)
+        fresh = loaders.habit_stats.load(1)
+        release.set()
+        return await stale, await fresh
+
+    stale, fresh = asyncio.run(main())
+    assert (stale.value, fresh.value) == ("before", "after")
+    assert gateway.calls == [[1], [1]]
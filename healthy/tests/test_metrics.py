@@ -0,0 +1,51 @@
+from dataclasses import dataclass, field
+
+from core.metrics.collectors import stats_collector
+from core.metrics.exposition import render_prometheus
+from core.metrics.registry import GAUGE_FIELD, MetricsRegistry
+
+
+@dataclass
+class Stats:
+    sent: int = 0
+    latency_total: float = 0.0
+    depth: int = field(default=0, metadata=GAUGE_FIELD)
+
+    @property
+    def latency_avg(self) -> float:
+        return self.latency_total / self.sent if self.sent else 0.0
+
+
+def families(text: str) -> dict[str, str]:
+    """TYPE по имени семейства"""
+    return {line.split()[2]: line.split()[3] for line in text.splitlines() if line.startswith("# TYPE")}
+
+
+def samples(text: str) -> set[str]:
+    return {line.split("{")[0].split()[0] for line in text.splitlines() if line and not line.startswith("#")}
+
+
+def test_stats_fields_export_as_counters_and_gauges():
+    registry = MetricsRegistry()
+    registry.register_collector("stats", stats_collector("app", lambda: Stats(sent=4, latency_total=2.0, depth=3)))
+    text = render_prometheus(registry)
+
+    assert families(text) == {
+        "app_sent_total": "counter",
+        "app_latency_total": "counter",
+        "app_depth": "gauge",
+        "app_latency_avg": "gauge",
+    }
+    assert "app_sent_total 4" in text.splitlines()
+    assert "app_latency_avg 0.5" in text.splitlines()
+
+
+def test_counter_type_line_matches_sample_names():
+    registry = MetricsRegistry()
+    registry.counter("app_errors", "Errors", ("kind",)).inc(("db",))
+    registry.counter("app_retries_total", "Retries").inc()
+    text = render_prometheus(registry)
+
+    assert families(text) == {"app_errors_total": "counter", "app_retries_total": "counter"}
+    assert samples(text) == {"app_errors_total", "app_retries_total"}
+    assert "# HELP app_errors_total Errors" in text.splitlines()
@@ -0,0 +1,57 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import inspect, insert
+
+from core.database.migrations import runner
+from core.database.session_manager import DatabaseManagerSQLite
+from core.database.structures import Base, Habit, RelapseHistory, User, UserHabit
+from core.gateways.usergateways import UserGateway
+
+
+def _schema(connection) -> dict:
+    inspector = inspect(connection)
+    return {
+        table: (
+            {column["name"] for column in inspector.get_columns(table)},
+            {index["name"] for index in inspector.get_indexes(table)},
+        )
+        for table in inspector.get_table_names() if table != "schema_version"
+    }
+
+
+def test_migrations_create_the_model_schema(with_database):
+    async def test(db_manager):
+        async with db_manager.engine.connect() as conn:
+            return await conn.run_sync(_schema)
+
+    migrated = with_database(test)
+    expected = {
+        table.name: ({column.name for column in table.columns}, {index.name for index in table.indexes})
+        for table in Base.metadata.sorted_tables
+    }
+    assert migrated == expected
+
+
+def test_habit_stats_backfill_matches_live_recompute(db_config):
+    async def main():
+        db_manager = DatabaseManagerSQLite(db_config)
+        await db_manager.initialize()
+        try:
+            await runner.migrate(db_manager.engine, target=1)
+            start = datetime.utcnow() - timedelta(days=30)
+            async with db_manager.engine.begin() as conn:
+                await conn.execute(insert(User).values(id=1, tg_id=100, first_name="User", timezone="Europe/Moscow"))
+                await conn.execute(insert(Habit).values(id=1, name="habit", cost_per_unit=100))
+                await conn.execute(insert(UserHabit).values(id=1, user_id=1, habit_id=1, start_date=start, saved_money=0))
+                await conn.execute(insert(RelapseHistory).values([
+                    {"user_habit_id": 1, "relapse_time": start + timedelta(days=days)} for days in (3, 4, 12)
+                ]))
+            await db_manager.migrate()
+            async with db_manager.session() as session:
+                return await UserGateway(session).check_habit_stats(0, 100)
+        finally:
+            await db_manager.dispose()
+
+    check = asyncio.run(main())
+    assert (check.checked, check.mismatched) == (1, [])
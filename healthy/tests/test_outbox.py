@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+from aiogram.exceptions import TelegramNotFound, TelegramServerError
+from aiogram.methods import SendMessage
+
+from services.telegram.outbox import MessageOutbox
+
+METHOD = SendMessage(chat_id=1, text="text")
+
+
+class FakeBot:
+    def __init__(self, *errors: Exception):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+def run_outbox(bot: FakeBot, messages: int = 1, **kwargs) -> MessageOutbox:
+    async def main():
+        outbox = MessageOutbox(bot, backoff_base=0.001, chat_burst=10, **kwargs)
+        await outbox.start()
+        outbox.enqueue_many((1, f"message {i}") for i in range(messages))
+        await outbox.stop(drain_timeout=None)
+        return outbox
+    return asyncio.run(main())
+
+
+def test_permanent_error_is_not_retried():
+    bot = FakeBot(TelegramNotFound(METHOD, "chat not found"))
+    outbox = run_outbox(bot)
+    assert bot.calls == 1
+    assert (outbox.stats.sent, outbox.stats.dropped, outbox.stats.retried) == (0, 1, 0)
+
+
+def test_server_error_is_retried():
+    bot = FakeBot(TelegramServerError(METHOD, "bad gateway"), TelegramServerError(METHOD, "bad gateway"))
+    outbox = run_outbox(bot)
+    assert bot.calls == 3
+    assert (outbox.stats.sent, outbox.stats.retried) == (1, 2)
+
+
+def test_stop_without_timeout_drains_queue():
+    outbox = run_outbox(FakeBot(), messages=20, global_rate=1000, chat_rate=1000)
+    assert outbox.stats.sent == 20
+    assert outbox.queue_depth == 0
+
+
+def test_put_waits_for_free_space():
+    async def main():
+        outbox = MessageOutbox(FakeBot(), max_queue_size=1)
+        await outbox.put(1, "first")
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(outbox.put(1, "second"), timeout=0.05)
+        assert outbox.stats.dropped == 0
+
+        await outbox.start()
+        await asyncio.wait_for(outbox.put(1, "third"), timeout=1)
+        await outbox.stop(drain_timeout=None)
+        assert outbox.stats.sent == 2
+
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+from core.cache.catalog import HabitCatalogCache
+from core.cache.profiles import UserProfileCache
+from core.database.replicas import REPLICA_SESSION
+from core.gateways.cached import CachedUserGateway
+from core.gateways.usergateways import UserGateway
+
+from .conftest import StatementCounter
+
+
+def test_profiles_read_from_a_replica_are_not_cached(with_database):
+    async def test(db_manager):
+        profiles = UserProfileCache(10)
+        async with db_manager.session() as session:
+            await UserGateway(session).create_user(100, "user", "User", "Europe/Moscow")
+
+        async with db_manager.session_factory(info={REPLICA_SESSION: True}) as session:
+            profile = await CachedUserGateway(session, HabitCatalogCache(), profiles).get_user_profile(100)
+        assert profile.user.tg_id == 100
+        assert profiles.get(100) is None
+
+        async with db_manager.session() as session:
+            await CachedUserGateway(session, HabitCatalogCache(), profiles).get_user_profile(100)
+        assert profiles.get(100) is not None
+
+    with_database(test)
+
+
+def test_habit_stats_of_a_cached_profile_skip_the_user_lookup(with_database):
+    async def test(db_manager):
+        profiles = UserProfileCache(10)
+        async with db_manager.session() as session:
+            gateway = CachedUserGateway(session, HabitCatalogCache(), profiles)
+            habit = await gateway.add_admin_habit(name="habit", cost_per_unit=10)
+            user = await gateway.create_user(100, "user", "User", "Europe/Moscow")
+        async with db_manager.session() as session:
+            gateway = CachedUserGateway(session, HabitCatalogCache(), profiles)
+            await gateway.get_user_profile(100)
+            with StatementCounter(db_manager.engine) as counter:
+                assert await gateway.get_user_habit_stats(100) == []
+            assert counter.statements == []
+
+            await gateway.add_user_habit(user.id, habit.id)
+        async with db_manager.session() as session:
+            expected = await UserGateway(session).get_user_habit_stats(100)
+            with StatementCounter(db_manager.engine) as counter:
+                stats = await CachedUserGateway(session, HabitCatalogCache(), profiles).get_user_habit_stats(100)
+
+        assert [s.id for s in stats] == [s.id for s in expected] and len(stats) == 1
+        assert len(counter.statements) == 1
+        assert "users" not in counter.statements[0]
+
+    with_database(test)
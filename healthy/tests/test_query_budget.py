@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from environs import Env
+
+from config_reader import env_optional_int
+from core.database.query_audit import QueryBudget, audit_engine, audit_queries
+from core.gateways.loaders import UpdateLoaders
+from core.gateways.usergateways import UserGateway
+from services.telegram.dialog_state import store_id, store_ids
+from services.telegram.getters import DialogGetters
+
+from .conftest import SEED_TG_ID, seed_tracked_habits
+
+# Запросов на вызов; чтения каталога - привычки плюс selectin info и hints
+GATEWAY_CALLS = {
+    "create_user": (QueryBudget(statements=1), lambda g, ids: g.create_user(SEED_TG_ID, "user", "User", "Asia/Omsk")),
+    "get_user_profile": (QueryBudget(statements=2), lambda g, ids: g.get_user_profile(SEED_TG_ID)),
+    "get_user_habit_stats": (QueryBudget(statements=1), lambda g, ids: g.get_user_habit_stats(SEED_TG_ID)),
+    "get_habit_stats": (QueryBudget(statements=1), lambda g, ids: g.get_habit_stats(ids["user_habit_ids"][0])),
+    "get_habit_stats_by_ids": (
+        QueryBudget(statements=1), lambda g, ids: g.get_habit_stats_by_ids(ids["user_habit_ids"])
+    ),
+    "get_relapse_buckets": (
+        QueryBudget(statements=1),
+        lambda g, ids: g.get_relapse_buckets(ids["user_habit_ids"][0], "day", datetime.utcnow() - timedelta(days=30))
+    ),
+    "get_habits_by_ids": (QueryBudget(statements=3), lambda g, ids: g.get_habits_by_ids(ids["catalog_ids"])),
+}
+
+
+@pytest.mark.parametrize("name", GATEWAY_CALLS)
+def test_gateway_call_within_budget(with_database, name):
+    budget, call = GATEWAY_CALLS[name]
+
+    async def test(db_manager):
+        ids = await seed_tracked_habits(db_manager, catalog=5, habits=3, relapses=2)
+        audit_engine(db_manager.engine)
+        async with db_manager.session() as session:
+            with audit_queries(name, budget):
+                await call(UserGateway(session), ids)
+
+    with_database(test)
+
+
+def test_loaders_batch_keys_into_one_statement_each(with_database):
+    async def test(db_manager):
+        ids = await seed_tracked_habits(db_manager, catalog=5, habits=3, relapses=2)
+        audit_engine(db_manager.engine)
+        async with db_manager.session() as session:
+            loaders = UpdateLoaders(UserGateway(session))
+            with audit_queries("habit_stats", QueryBudget(statements=1)):
+                stats = await loaders.habit_stats.load_many(ids["user_habit_ids"] * 2)
+            # Привычки каталога - сам список плюс selectin info и hints
+            with audit_queries("habits", QueryBudget(statements=3)):
+                habits = await loaders.habits.load_many(ids["catalog_ids"])
+            with audit_queries("cached", QueryBudget(statements=0)):
+                await loaders.habit_stats.load(ids["user_habit_ids"][0])
+                await loaders.habits.load(ids["catalog_ids"][0])
+        assert [s.id for s in stats] == ids["user_habit_ids"] * 2
+        assert [h.id for h in habits] == ids["catalog_ids"]
+
+    with_database(test)
+
+
+def test_getters_within_update_budget(with_database):
+    async def test(db_manager):
+        ids = await seed_tracked_habits(db_manager, catalog=5, habits=3, relapses=2)
+        audit_engine(db_manager.engine)
+        async with db_manager.session() as session:
+            gateway = UserGateway(session)
+            dialog_data = {}
+            store_id(dialog_data, "habit_id", ids["user_habit_ids"][0])
+            store_ids(dialog_data, "admin_habit_ids", ids["catalog_ids"])
+            manager = SimpleNamespace(
+                middleware_data={"read_gateway": gateway, "loaders": UpdateLoaders(gateway)},
+                dialog_data=dialog_data,
+                event=SimpleNamespace(from_user=SimpleNamespace(id=SEED_TG_ID, full_name="User")),
+            )
+            with audit_queries("user_habits_getter", QueryBudget(statements=1)):
+                habits = await DialogGetters.user_habits_getter(manager)
+            with audit_queries("habit_detail_getter", QueryBudget(statements=1)):
+                detail = await DialogGetters.habit_detail_getter(manager)
+            with audit_queries("admin_habits_getter", QueryBudget(statements=3)):
+                admin = await DialogGetters.admin_habits_getter(manager)
+        assert habits["habits_count"] == 3
+        assert detail["relapse_count"] == 2
+        assert admin["habits_count"] == 5
+
+    with_database(test)
+
+
+@pytest.mark.parametrize("value, expected", [(None, 10), ("7", 7), ("none", None), ("", None)])
+def test_statement_budget_can_be_disabled_from_env(monkeypatch, value, expected):
+    if value is None:
+        monkeypatch.delenv("QUERY_AUDIT_UPDATE_STATEMENTS", raising=False)
+    else:
+        monkeypatch.setenv("QUERY_AUDIT_UPDATE_STATEMENTS", value)
+    assert env_optional_int(Env(), "QUERY_AUDIT_UPDATE_STATEMENTS", 10) == expected
@@ -0,0 +1,145 @@
+import asyncio
+import time as t
+from datetime import datetime, time, timedelta
+
+import pytz
+from sqlalchemy import update
+
+from core.database.structures import Reminder
+from core.gateways.usergateways import UserGateway
+from services.reminders.scheduler import ReminderScheduler, next_fire_at
+
+
+async def seed_reminder(db_manager) -> int:
+    async with db_manager.session() as session:
+        gateway = UserGateway(session)
+        habit = await gateway.add_admin_habit(name="habit", cost_per_unit=10)
+        user = await gateway.create_user(100, "user", "User", "Europe/Moscow")
+        user_habit = await gateway.add_user_habit(user.id, habit.id)
+        reminder = Reminder(reminder_type="daily", scheduled_time=time(9), user_habit_id=user_habit.id)
+        session.add(reminder)
+        await session.flush()
+        return reminder.id
+
+
+def test_fired_reminder_is_scheduled_for_next_day(with_database):
+    async def test(db_manager):
+        reminder_id = await seed_reminder(db_manager)
+        fired = []
+
+        async def on_fire(reminders):
+            fired.extend(reminder.id for reminder in reminders)
+
+        scheduler = ReminderScheduler(db_manager, on_fire)
+        await scheduler._fire_due([reminder_id])
+
+        assert fired == [reminder_id]
+        assert scheduler._due_at[reminder_id] > t.time() + 3600
+
+    with_database(test)
+
+
+def test_failed_fire_is_retried(with_database):
+    async def test(db_manager):
+        reminder_id = await seed_reminder(db_manager)
+
+        async def on_fire(reminders):
+            raise RuntimeError("Bot API is down")
+
+        scheduler = ReminderScheduler(db_manager, on_fire)
+        await scheduler._fire_due([reminder_id])
+
+        assert scheduler._due_at[reminder_id] <= t.time() + 30
+
+    with_database(test)
+
+
+async def set_reminder(db_manager, reminder_id: int, **values):
+    async with db_manager.session() as session:
+        await session.execute(update(Reminder).where(Reminder.id == reminder_id).values(**values))
+
+
+async def fire_nothing(reminders):
+    pass
+
+
+def test_reload_reschedules_changed_time(with_database):
+    async def test(db_manager):
+        reminder_id = await seed_reminder(db_manager)
+        scheduler = ReminderScheduler(db_manager, fire_nothing)
+        await scheduler.reload([reminder_id])
+        moscow = pytz.timezone("Europe/Moscow")
+        assert scheduler._due_at[reminder_id] == next_fire_at(time(9), moscow, t.time())
+
+        await set_reminder(db_manager, reminder_id, scheduled_time=time(21, 30))
+        await scheduler.reload([reminder_id])
+
+        assert scheduler._due_at[reminder_id] == next_fire_at(time(21, 30), moscow, t.time())
+        assert scheduler._pop_due(t.time() + 2 * 86400) == [reminder_id]
+
+    with_database(test)
+
+
+def test_reload_unschedules_deactivated(with_database):
+    async def test(db_manager):
+        reminder_id = await seed_reminder(db_manager)
+        scheduler = ReminderScheduler(db_manager, fire_nothing)
+        await scheduler.reload([reminder_id])
+
+        await set_reminder(db_manager, reminder_id, is_active=False)
+        await scheduler.reload([reminder_id])
+
+        assert len(scheduler) == 0
+        assert scheduler._pop_due(t.time() + 2 * 86400) == []
+
+    with_database(test)
+
+
+def test_unschedule_during_fire_is_not_rescheduled(with_database):
+    async def test(db_manager):
+        reminder_id = await seed_reminder(db_manager)
+        scheduler = ReminderScheduler(db_manager, fire_nothing)
+
+        async def on_fire(reminders):
+            scheduler.unschedule([reminder_id])
+
+        scheduler.on_fire = on_fire
+        await scheduler._fire_due([reminder_id])
+
+        assert len(scheduler) == 0
+
+    with_database(test)
+
+
+def test_new_earlier_reminder_wakes_sleeping_scheduler(with_database):
+    async def test(db_manager):
+        reminder_id = await seed_reminder(db_manager)
+        fired = asyncio.Event()
+        fired_ids = []
+
+        async def on_fire(reminders):
+            fired_ids.extend(reminder.id for reminder in reminders)
+            fired.set()
+
+        scheduler = ReminderScheduler(db_manager, on_fire, batch_window=0.1, max_sleep=300)
+        await scheduler.start()
+        try:
+            # Спит до 9:00 следующего дня; новое напоминание - через пару секунд
+            soon = datetime.now(pytz.timezone("Europe/Moscow")) + timedelta(seconds=2)
+            async with db_manager.session() as session:
+                reminder = Reminder(
+                    reminder_type="daily", scheduled_time=soon.time().replace(microsecond=0),
+                    user_habit_id=(await session.get(Reminder, reminder_id)).user_habit_id
+                )
+                session.add(reminder)
+                await session.flush()
+                new_id = reminder.id
+            await asyncio.sleep(0.05)
+            await scheduler.reload([new_id])
+            await asyncio.wait_for(fired.wait(), timeout=5)
+        finally:
+            await scheduler.stop()
+
+        assert fired_ids == [new_id]
+
+    with_database(test)
@@ -0,0 +1,85 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from core.database.lazy_session import LazySession, ReadSession
+from core.database.structures import Habit, User
+
+
+def _user(tg_id: int) -> dict:
+    return {"tg_id": tg_id, "first_name": "User", "timezone": "UTC", "registration_date": datetime.now()}
+
+
+def test_scalar_dml_takes_write_lock(with_database):
+    async def test(db_manager):
+        async with db_manager.session_factory() as session:
+            user_id = await session.scalar(insert(User).values(_user(1)).returning(User.id))
+            assert user_id is not None
+            assert session.sync_session.holds_write_lock
+            assert session.sync_session.write_lock.locked()
+            await session.commit()
+            assert not session.sync_session.holds_write_lock
+            assert not session.sync_session.write_lock.locked()
+
+    with_database(test)
+
+
+def test_flush_takes_write_lock_until_rollback(with_database):
+    async def test(db_manager):
+        async with db_manager.session_factory() as session:
+            session.add(Habit(name="habit", cost_per_unit=10))
+            await session.flush()
+            assert session.sync_session.write_lock.locked()
+            await session.rollback()
+            assert not session.sync_session.write_lock.locked()
+
+    with_database(test)
+
+
+def test_writer_reads_while_pool_is_held_by_waiting_writers(with_database, db_config):
+    db_config.db.sqlite_pool_size = 2
+
+    async def test(db_manager):
+        async def queued_writer(tg_id: int):
+            async with db_manager.session() as session:
+                await session.execute(select(User.id))
+                await session.execute(insert(User).values(_user(tg_id)))
+
+        async with db_manager.session() as writer:
+            await writer.execute(insert(User).values(_user(1)))
+            # Оба соединения пула заняты сессиями, которые ждут замок на запись
+            waiting = [asyncio.create_task(queued_writer(tg_id)) for tg_id in (2, 3)]
+            await asyncio.sleep(0.1)
+            async with db_manager.read_session() as reader:
+                await asyncio.wait_for(reader.execute(select(User.id)), timeout=5)
+        await asyncio.wait_for(asyncio.gather(*waiting), timeout=5)
+
+        async with db_manager.read_session() as reader:
+            assert len((await reader.scalars(select(User.id))).all()) == 3
+
+    with_database(test)
+
+
+def test_read_session_switches_to_primary_after_write(with_database):
+    async def test(db_manager):
+        primary = LazySession(db_manager.session_factory)
+        reads = ReadSession(LazySession(db_manager.read_session_factory), primary)
+        assert reads.bind is db_manager.read_engine
+
+        await primary.execute(insert(User).values(_user(1)))
+        assert reads.bind is db_manager.engine
+        assert await reads.scalar(select(User.tg_id)) == 1
+        await primary.finalize()
+
+    with_database(test)
+
+
+def test_primary_reads_release_connection_after_statement(with_database):
+    async def test(db_manager):
+        async with db_manager.primary_session_factory() as session:
+            await session.scalars(select(Habit))
+            assert not session.in_transaction()
+            assert db_manager.read_engine.pool.checkedout() == 0
+
+    with_database(test)
@@ -0,0 +1,74 @@
+import asyncio
+
+from aiogram.types import Update
+
+from benchmarks.updates import message_update
+from config_reader import Config, DBConfig, ShardingConfig, TgBot
+from services.telegram.lanes import ChatLanes
+from services.telegram.sharding import ShardSupervisor
+
+
+def create_supervisor(queue_size: int) -> ShardSupervisor:
+    config = Config(
+        tg_bot=TgBot(token="123456:TEST", admin_ids=[]),
+        db=DBConfig(),
+        sharding=ShardingConfig(workers=1, queue_size=queue_size)
+    )
+    return ShardSupervisor(config)
+
+
+def test_stop_does_not_block_on_a_dead_shard_with_a_full_queue():
+    supervisor = create_supervisor(queue_size=2)
+    process = supervisor._ctx.Process(target=int)
+    process.start()
+    process.join()
+    supervisor.processes[0] = process
+    supervisor.in_flight[0].value = 3
+    for chat_id in range(2):
+        assert supervisor.route(Update.model_validate(message_update(chat_id, "/start")))
+    assert not supervisor.route(Update.model_validate(message_update(2, "/start")))
+
+    asyncio.run(asyncio.wait_for(supervisor.stop(timeout=1), timeout=10))
+    assert supervisor.lost == 5
+    assert supervisor.in_flight[0].value == 0
+
+
+def test_route_wait_blocks_until_the_shard_queue_has_room():
+    supervisor = create_supervisor(queue_size=1)
+
+    async def main():
+        assert supervisor.route(Update.model_validate(message_update(1, "/start")))
+        waiting = asyncio.create_task(supervisor.route_wait(Update.model_validate(message_update(1, "text"))))
+        await asyncio.sleep(0.2)
+        assert not waiting.done()
+        first = await asyncio.to_thread(supervisor.queues[0].get, timeout=1)
+        await asyncio.wait_for(waiting, timeout=2)
+        second = await asyncio.to_thread(supervisor.queues[0].get, timeout=1)
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert (Update.model_validate_json(first).message.text, Update.model_validate_json(second).message.text) == (
+        "/start", "text"
+    )
+    for executor in supervisor._put_executors:
+        executor.shutdown()
+
+
+def test_lanes_wait_below_wakes_when_updates_are_processed():
+    release = asyncio.Event()
+
+    async def process(update):
+        await release.wait()
+
+    async def main():
+        lanes = ChatLanes(process)
+        for chat_id in range(3):
+            lanes.submit(chat_id, Update.model_validate(message_update(chat_id, "text")))
+        waiting = asyncio.create_task(lanes.wait_below(3))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        release.set()
+        await asyncio.wait_for(waiting, timeout=1)
+        return lanes.pending
+
+    assert asyncio.run(main()) < 3
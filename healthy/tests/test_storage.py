@@ -0,0 +1,58 @@
+import asyncio
+import pickle
+from datetime import datetime
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from services.telegram.storage import DatabaseStorage, dump_data, load_data
+
+KEY = StorageKey(bot_id=1, chat_id=100, user_id=100)
+
+
+def test_dump_data_round_trip():
+    small = {"habit_id": 1}
+    large = {"ids": list(range(500))}
+    assert dump_data(small)[:1] == b"j"
+    assert dump_data(large)[:1] == b"z"
+    assert load_data(dump_data(small)) == small
+    assert load_data(dump_data(large)) == large
+
+
+def test_non_json_data_is_rejected():
+    with pytest.raises(TypeError):
+        dump_data({"at": datetime.now()})
+    with pytest.raises(ValueError):
+        load_data(b"p" + pickle.dumps({"habit_id": 1}))
+
+
+def test_set_data_rejects_non_json_data(with_database):
+    async def test(db_manager):
+        storage = DatabaseStorage(db_manager)
+        with pytest.raises(TypeError):
+            await storage.set_data(KEY, {"at": datetime.now()})
+        assert await storage.get_data(KEY) == {}
+        await storage.close()
+
+    with_database(test)
+
+
+def test_cancelled_flush_keeps_batch_for_close(with_database):
+    async def test(db_manager):
+        storage = DatabaseStorage(db_manager, flush_interval=60)
+        await storage.set_state(KEY, "DialogSG:MAIN_MENU")
+        await storage.set_data(KEY, {"habit_id": 1})
+
+        flush = asyncio.create_task(storage.flush())
+        while storage._dirty:
+            await asyncio.sleep(0)
+        flush.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flush
+        await storage.close()
+
+        reopened = DatabaseStorage(db_manager)
+        assert await reopened.get_state(KEY) == "DialogSG:MAIN_MENU"
+        assert await reopened.get_data(KEY) == {"habit_id": 1}
+
+    with_database(test)
@@ -0,0 +1,109 @@
+import asyncio
+import time as t
+from types import SimpleNamespace
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import GetMe
+from aiogram.types import User as TelegramUser
+from sqlalchemy import func, select
+
+from core.cache.catalog import HabitCatalogCache
+from core.cache.profiles import UserProfileCache
+from core.database.structures import User
+from core.gateways.usergateways import UserGateway
+from services.telegram.telegram import DatabaseMiddleware
+from services.telegram.transactions import CommitWritesRequestMiddleware
+
+API_LATENCY = 0.3
+
+
+class SlowSession(BaseSession):
+    """Bot API с задержкой сети; на время запроса запоминает состояние замка"""
+    def __init__(self, write_lock: asyncio.Lock):
+        super().__init__()
+        self.write_lock = write_lock
+        self.locked_during_request = []
+
+    async def make_request(self, bot, method, timeout=None):
+        self.locked_during_request.append(self.write_lock.locked())
+        await asyncio.sleep(API_LATENCY)
+        return TelegramUser(id=1, is_bot=True, first_name="bot")
+
+    async def stream_content(self, *args, **kwargs):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+def test_write_lock_is_not_held_across_bot_api_calls(with_database):
+    async def test(db_manager):
+        write_lock = db_manager.session_factory.kw["write_lock"]
+        bot_session = SlowSession(write_lock)
+        bot_session.middleware(CommitWritesRequestMiddleware())
+        bot = Bot("123456:TEST", session=bot_session)
+        middleware = DatabaseMiddleware(db_manager, HabitCatalogCache(), UserProfileCache(10))
+        held = []
+
+        async def handler(event, data):
+            await data["user_gateway"].create_user(100, "user", "User", "Europe/Moscow")
+            await bot(GetMe())
+            # Вторая запись апдейта - новой транзакцией после вызова API
+            await data["user_gateway"].create_user(101, "user", "User", "Europe/Moscow")
+
+        async def other_writer():
+            await asyncio.sleep(API_LATENCY / 3)
+            started = t.perf_counter()
+            async with db_manager.session() as session:
+                await UserGateway(session).create_user(200, "other", "Other", "UTC")
+            held.append(t.perf_counter() - started)
+
+        await asyncio.gather(
+            middleware(handler, SimpleNamespace(event_type="message"), {}),
+            other_writer()
+        )
+        async with db_manager.session() as session:
+            users = await session.scalar(select(func.count()).select_from(User))
+        return bot_session.locked_during_request, held[0], users, middleware.stats
+
+    locked, waited, users, stats = with_database(test)
+    assert locked == [False]
+    # Другая запись не ждет ответа Telegram
+    assert waited < API_LATENCY / 2
+    assert users == 3
+    assert stats.db_updates == 1
+
+
+def test_primary_session_is_finalized_when_read_session_fails_to_close(with_database):
+    async def test(db_manager):
+        write_lock = db_manager.session_factory.kw["write_lock"]
+        primary_session_factory = db_manager.primary_session_factory
+
+        def read_session_factory():
+            session = primary_session_factory()
+
+            async def close():
+                raise ConnectionError("replica went away")
+
+            session.close = close
+            return session
+
+        db_manager.read_session_factory = read_session_factory
+        middleware = DatabaseMiddleware(db_manager, HabitCatalogCache(), UserProfileCache(10))
+
+        async def handler(event, data):
+            await data["read_gateway"].get_user_by_tg_id(100)
+            await data["user_gateway"].create_user(100, "user", "User", "Europe/Moscow")
+
+        try:
+            await middleware(handler, SimpleNamespace(event_type="message"), {})
+        except ConnectionError:
+            pass
+        else:
+            raise AssertionError("read session error was swallowed")
+        assert not write_lock.locked()
+        async with db_manager.session() as session:
+            return await session.scalar(select(func.count()).select_from(User))
+
+    assert with_database(test) == 1
@@ -0,0 +1,56 @@
+from core.database.lazy_session import LazySession
+from core.database.structures import User
+from core.gateways.usergateways import UserGateway
+from sqlalchemy import func, select
+
+from .conftest import StatementCounter
+
+
+def test_create_user_inserts(with_database):
+    async def test(db_manager):
+        async with db_manager.session() as session:
+            user = await UserGateway(session).create_user(100, "user", "User", "Europe/Moscow")
+
+        assert user.tg_id == 100
+        assert user.timezone == "Europe/Moscow"
+        async with db_manager.session() as session:
+            assert await session.scalar(select(func.count()).select_from(User)) == 1
+
+    with_database(test)
+
+
+def test_create_user_through_lazy_session(with_database):
+    async def test(db_manager):
+        session = LazySession(db_manager.session_factory)
+        user = await UserGateway(session).create_user(100, "user", "User", "Europe/Moscow")
+        assert await session.finalize()
+        assert user.tg_id == 100
+
+    with_database(test)
+
+
+def test_create_user_reregister_updates_row(with_database):
+    async def test(db_manager):
+        async with db_manager.session() as session:
+            first = await UserGateway(session).create_user(100, "user", "User", "Europe/Moscow")
+        async with db_manager.session() as session:
+            second = await UserGateway(session).create_user(100, "renamed", "Renamed", "Asia/Omsk")
+
+        assert second.id == first.id
+        assert (second.username, second.first_name, second.timezone) == ("renamed", "Renamed", "Asia/Omsk")
+        async with db_manager.session() as session:
+            assert await session.scalar(select(func.count()).select_from(User)) == 1
+
+    with_database(test)
+
+
+def test_create_user_is_one_statement(with_database):
+    async def test(db_manager):
+        async with db_manager.session() as session:
+            await UserGateway(session).create_user(100, "user", "User", "Europe/Moscow")
+            with StatementCounter(db_manager.engine) as counter:
+                await UserGateway(session).create_user(100, "user", "User", "Asia/Omsk")
+
+        assert len(counter.statements) == 1, counter.statements
+
+    with_database(test)
@@ -0,0 +1,60 @@
+import asyncio
+import random
+
+from aiogram import Bot
+from aiohttp.test_utils import TestClient, TestServer
+
+from benchmarks.updates import message_update
+from services.telegram.webhook import WebhookServer
+
+
+def test_updates_of_a_chat_are_processed_in_arrival_order():
+    processed: dict[int, list[int]] = {}
+    active: dict[int, int] = {}
+
+    async def on_update(update):
+        chat_id = update.message.chat.id
+        active[chat_id] = active.get(chat_id, 0) + 1
+        assert active[chat_id] == 1, "two updates of one chat processed concurrently"
+        await asyncio.sleep(random.random() / 100)
+        processed.setdefault(chat_id, []).append(update.update_id)
+        active[chat_id] -= 1
+
+    async def main():
+        bot = Bot("123456:TEST")
+        server = WebhookServer(None, bot, workers=4, on_update=on_update)
+        payloads = [message_update(chat_id, "text") for _ in range(10) for chat_id in range(1, 6)]
+        async with TestClient(TestServer(server.app)) as client:
+            for payload in payloads:
+                response = await client.post(server.path, json=payload)
+                assert response.status == 200
+        await server.stop()
+        await bot.session.close()
+        return payloads, server
+
+    payloads, server = asyncio.run(main())
+    for chat_id, update_ids in processed.items():
+        assert update_ids == [p["update_id"] for p in payloads if p["message"]["chat"]["id"] == chat_id]
+    assert server.stats.processed == len(payloads)
+    assert server.queue_depth == 0
+
+
+def test_full_lanes_reject_with_503():
+    release = asyncio.Event()
+
+    async def on_update(update):
+        await release.wait()
+
+    async def main():
+        bot = Bot("123456:TEST")
+        server = WebhookServer(None, bot, queue_size=2, on_update=on_update)
+        async with TestClient(TestServer(server.app)) as client:
+            statuses = [(await client.post(server.path, json=message_update(1, "text"))).status for _ in range(3)]
+        release.set()
+        await server.stop()
+        await bot.session.close()
+        return statuses, server
+
+    statuses, server = asyncio.run(main())
+    assert statuses == [200, 200, 503]
+    assert (server.stats.processed, server.stats.rejected) == (2, 1)